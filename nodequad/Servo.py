@@ -1,5 +1,7 @@
 from pca9685 import PCA9685
 from math import radians
+from metrics import metrics, STAGE_SERVO
+from utime import ticks_us
 
 
 class Servo:
@@ -13,10 +15,13 @@ class Servo:
         self.pulse_min, self.pulse_max = pulse_min, pulse_max
         self.degrees = degrees
         self.offset = [[0, 0, 0] for i in range(4)]  # not shallow copy: [[0, 0, 0]] * 3
+        self.offset_version = 0  # bumped on every set_offset, compiled duty tables depend on it
         self.pca9685.freq(pulse_freq)
+        self._duties = [0] * 12  # frame buffer of set_angles, pwm index = 3 * leg_index + part_index
 
     def set_offset(self, offset):
         self.offset = offset
+        self.offset_version += 1
 
     def km_angle2pulse(self, km_angle, reverse):
         # return interp(correct * km_angle, [-90, 90], [pulse_min, pulse_max])  # 注意运动学定义的0°对应舵机90°位置
@@ -41,26 +46,44 @@ class Servo:
         duty = min(self.max_duty, max(self.min_duty, int(duty)))
         self.pca9685.duty(index, duty)
 
-    def set_angle(self, leg_index, part_index, km_angle):
-        # switch left, right pwm
-        if leg_index == 0:
-            pwm_index = 0 + part_index
-        elif leg_index == 1:
-            pwm_index = 3 + part_index
-        elif leg_index == 2:
-            pwm_index = 6 + part_index
-        elif leg_index == 3:
-            pwm_index = 9 + part_index
-        else:
-            raise ValueError
-
+    def angle2duty(self, leg_index, part_index, km_angle):
+        """kinematics angle (degree) of one joint -> PCA9685 duty, calibration offset applied"""
         km_angle_corrected = km_angle + self.offset[leg_index][part_index]
         inverse = -1 if part_index == 1 else 1  # compensate for kinematics model
         inverse = inverse * -1 if leg_index in [1, 3] and part_index in [1, 2] else inverse  # compensate for model mirror
 
         pulse = min(max(int(self.km_angle2pulse(km_angle_corrected, inverse)), self.pulse_min), self.pulse_max)
+        return min(self.max_duty, max(self.min_duty, self._us2duty(pulse)))
+
+    def set_angle(self, leg_index, part_index, km_angle):
+        # switch left, right pwm
+        if leg_index not in (0, 1, 2, 3):
+            raise ValueError
+        pwm_index = 3 * leg_index + part_index
+
+        if metrics.enabled:
+            start = ticks_us()
+            duty = self.angle2duty(leg_index, part_index, km_angle)
+            metrics.record(STAGE_SERVO, start)
+        else:
+            duty = self.angle2duty(leg_index, part_index, km_angle)
+        self.pca9685.duty(pwm_index, duty)
+
+    def set_angles(self, frame):
+        """frame: joint angles of the 4 legs [[coxa, femur, tibia], ...] -> one i2c burst for all 12 channels"""
+        if metrics.enabled:
+            start = ticks_us()
+        duties = self._duties
+        for leg_index in range(4):
+            for part_index in range(3):
+                duties[3 * leg_index + part_index] = self.angle2duty(leg_index, part_index, frame[leg_index][part_index])
+        if metrics.enabled:
+            metrics.record(STAGE_SERVO, start)
+        self.pca9685.set_all_pwm(duties)
 
-        self.position(pwm_index, us=pulse)
+    def set_duties(self, table, frame_id):
+        """play frame 'frame_id' of a compiled duty table (12 duties per frame, see duty_table.py)"""
+        self.pca9685.set_all_pwm(memoryview(table)[12 * frame_id:12 * frame_id + 12])
 
 
 
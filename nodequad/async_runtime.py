@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio运行模式：web服务、步态帧、电量监测在同一个调度器中协作运行（无_thread，无共享状态竞争）
+"""
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+from utils import battery_monitor_loop
+import websocket
+from http_request import HttpRequest, STATUS_OK, STATUS_TIMEOUT
+from controller import HTTP_TIMEOUT_MS, HTTP_BUFFER_SIZE, WS_MAX_CLIENTS
+
+
+def sleep_ms(ms):
+    if hasattr(asyncio, 'sleep_ms'):
+        return asyncio.sleep_ms(ms)
+    return asyncio.sleep(ms / 1000)
+
+
+class AsyncRuntime:
+    """NodeQuad.tick + WebController routing driven by one asyncio event loop"""
+
+    def __init__(self, quadruped, host, port=80):
+        self.quadruped = quadruped
+        self.web_controller = quadruped.web_controller
+        self.host = host
+        self.port = port
+        self.scheduler = quadruped.scheduler
+        self.ws_clients = 0
+
+    async def handle_client(self, reader, writer):
+        """asyncio.start_server callback: one http request, or a websocket session after an upgrade"""
+        try:
+            request = HttpRequest(HTTP_BUFFER_SIZE)  # per connection, clients are served concurrently
+            try:
+                status = await asyncio.wait_for(request.aread(reader), HTTP_TIMEOUT_MS / 1000)
+            except asyncio.TimeoutError:
+                status = STATUS_TIMEOUT
+            if status != STATUS_OK:
+                chunks, upgraded = self.web_controller.response(status, 'text/plain', status), False
+            else:
+                accept_ws = self.ws_clients < WS_MAX_CLIENTS  # the same limit as the threaded WebController.loop
+                chunks, upgraded = self.web_controller.handle_request(request.head(), accept_ws, request)
+            for chunk in chunks:
+                writer.write(chunk)
+            await writer.drain()
+            if upgraded:
+                self.ws_clients += 1
+                try:
+                    await self.ws_session(reader, writer)
+                finally:
+                    self.ws_clients -= 1
+        except Exception:  # a dropped client, or whatever its request triggered: only this client ends
+            pass
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    async def ws_session(self, reader, writer):
+        while True:
+            opcode, payload = await websocket.arecv_frame(reader, HTTP_BUFFER_SIZE)
+            reply_opcode, reply = self.web_controller.handle_ws_frame(opcode, payload)
+            if reply_opcode is not None:
+                writer.write(websocket.encode_frame(reply, reply_opcode))
+                await writer.drain()
+            if reply_opcode == websocket.OP_CLOSE:
+                return
+
+    async def control_task(self):
+        """Gait/pose frames scheduled against an absolute deadline (FrameScheduler), not a fixed sleep after the work."""
+        self.scheduler.start()
+        while True:
+            self.quadruped.tick()
+            await sleep_ms(self.scheduler.delay_us() // 1000)
+            self.scheduler.frame_start()
+
+    async def battery_task(self, adc, led, low_voltage, period_ms=1000):
+        while True:
+            battery_monitor_loop(adc, led, low_voltage)
+            await sleep_ms(period_ms)
+
+    async def main(self, adc=None, led=None, low_voltage=10.2):
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        tasks = [asyncio.create_task(self.control_task())]
+        if adc is not None:
+            tasks.append(asyncio.create_task(self.battery_task(adc, led, low_voltage)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            server.close()
+
+    def run(self, adc=None, led=None, low_voltage=10.2):
+        asyncio.run(self.main(adc, led, low_voltage))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+批量运动学：对整条轨迹（N个足尖点）一次性求逆解/正解，用于离线编译步态表、可达性检查、工作空间扫描
+主机上使用NumPy，固件带ulab时使用ulab.numpy；结果与Leg.local_ik/local_fk一致
+"""
+try:
+    from ulab import numpy as np
+except ImportError:
+    try:
+        import numpy as np
+    except ImportError:
+        np = None  # batch kinematics unavailable, use Leg.local_ik per point
+from math import pi
+from setting import leg_joint1_2joint2, leg_joint2_2joint3, leg_joint3_2tip, leg_mount_x, leg_mount_y
+
+# world -> local rotation of each leg (Leg._local_conv) and its mounting position
+LOCAL_ROTATION_DEG = (45, 315, 225, 135)
+MOUNT_POSITION = ((leg_mount_x, leg_mount_y, 0), (-leg_mount_x, leg_mount_y, 0),
+                  (-leg_mount_x, -leg_mount_y, 0), (leg_mount_x, -leg_mount_y, 0))
+
+RAD2DEG = 180 / pi
+
+
+def available():
+    return np is not None
+
+
+def _and(a, b):
+    if hasattr(np, 'logical_and'):
+        return np.logical_and(a, b)
+    return (a * b) > 0
+
+
+def translate2local(points_world, leg_index):
+    """(N, 3) world-frame tips -> (N, 3) tips in the leg's local frame"""
+    theta = LOCAL_ROTATION_DEG[leg_index] * pi / 180
+    c, s = np.cos(theta), np.sin(theta)
+    x = points_world[:, 0] - MOUNT_POSITION[leg_index][0]
+    y = points_world[:, 1] - MOUNT_POSITION[leg_index][1]
+    local = np.zeros(points_world.shape)
+    local[:, 0] = x * c - y * s
+    local[:, 1] = x * s + y * c
+    local[:, 2] = points_world[:, 2]
+    return local
+
+
+def local_ik(points_local):
+    """
+    (N, 3) local tips -> ((N, 3) joint angles in degree, (N,) validity mask)
+    invalid rows (out of reach) hold clipped, meaningless angles
+    """
+    x0 = points_local[:, 0]
+    y0 = points_local[:, 1]
+    angles = np.zeros(points_local.shape)
+    angles[:, 0] = np.arctan2(x0, y0) * RAD2DEG
+
+    x = np.sqrt(x0 * x0 + y0 * y0) - leg_joint1_2joint2
+    y = -points_local[:, 2]  # Note: Z-axis Down
+    ar = np.arctan2(y, x)
+    lr2 = x * x + y * y
+    lr = np.sqrt(lr2)
+    c1 = (lr2 + leg_joint2_2joint3 ** 2 - leg_joint3_2tip ** 2) / (2 * leg_joint2_2joint3 * lr)
+    c2 = (lr2 - leg_joint2_2joint3 ** 2 + leg_joint3_2tip ** 2) / (2 * leg_joint3_2tip * lr)
+    valid = _and(abs(c1) <= 1, abs(c2) <= 1)
+    a1 = np.arccos(np.clip(c1, -1, 1))
+    a2 = np.arccos(np.clip(c2, -1, 1))
+    angles[:, 1] = (ar + a1) * RAD2DEG
+    angles[:, 2] = 90 - (a1 + a2) * RAD2DEG
+    return angles, valid
+
+
+def local_fk(joint_degree):
+    """(N, 3) joint angles in degree -> (N, 3) local tip positions"""
+    r0 = joint_degree[:, 0] / RAD2DEG
+    r1 = joint_degree[:, 1] / RAD2DEG
+    r12 = (joint_degree[:, 1] + joint_degree[:, 2] - 90) / RAD2DEG
+    reach = leg_joint1_2joint2 + leg_joint2_2joint3 * np.cos(r1) + leg_joint3_2tip * np.cos(r12)
+    tips = np.zeros(joint_degree.shape)
+    tips[:, 0] = reach * np.sin(r0)
+    tips[:, 1] = reach * np.cos(r0)
+    tips[:, 2] = -leg_joint2_2joint3 * np.sin(r1) - leg_joint3_2tip * np.sin(r12)
+    return tips
+
+
+def path_ik(path):
+    """gait path (nested lists or gait.PackedPath) -> per leg ((N, 3) joint angles, (N,) validity mask)"""
+    result = []
+    for leg_index in range(4):
+        points = np.array([path[frame_id][leg_index] for frame_id in range(len(path))])
+        result.append(local_ik(translate2local(points, leg_index)))
+    return result
@@ -1,11 +1,52 @@
 import json
-from setting import panel_html_str, calib_html_str
+import ustruct
+import websocket
+from metrics import metrics
+from http_request import HttpRequest, STATUS_OK
+from select import select
+from setting import panel_html_dir, calib_html_dir, pose_deadband
+from utils import load_panel_html
 from socket import socket, AF_INET, SOCK_STREAM, SOL_SOCKET, SO_REUSEADDR
 from gait import MODE_MOVE, MODE_POSE
-from gait import GAIT_TROT, GAIT_WALK, GAIT_GALLOP, GAIT_CREEP
+from gait import GAIT_TROT, GAIT_NAMES, gait_mode_by_name
 from gait import MOVE_STANDBY, MOVE_FORWARD, MOVE_BACKWARD, MOVE_LEFTSHIFT, MOVE_RIGHTSHIFT, MOVE_LEFTROTATE, \
     MOVE_RIGHTROTATE
 from utime import sleep_ms
+try:
+    from ucollections import namedtuple
+except ImportError:
+    from collections import namedtuple
+
+# joystick/button updates are posted here and only get a small JSON status back
+CONTROL_PATH = '/control'
+# persistent websocket channel for the same updates, see process_ws_frame
+WS_PATH = '/ws'
+WS_MAX_CLIENTS = 2
+# a request (headers + Content-Length body) must be complete within this time, then the client is dropped
+HTTP_TIMEOUT_MS = 500
+HTTP_BUFFER_SIZE = 2048
+# the response gets its own budget (s), not what the request left of HTTP_TIMEOUT_MS (the panel page is ~13 KB)
+HTTP_SEND_TIMEOUT = 1
+# per-stage frame timing (metrics.py): json, or a plain text table with ?text
+METRICS_PATH = '/metrics'
+# the registered gaits (built-in + gaits.json) the panel makes its gait buttons from
+GAITS_PATH = '/gaits'
+
+# one consistent set of remote control quantities, replaced as a whole (never modified) after each update
+Command = namedtuple('Command', ('seq', 'calibration', 'mode', 'gait_mode', 'moving_status', 'pose', 'pose_version',
+                                 'velocity', 'speed', 'stride', 'calibration_data'))
+
+# remote gait speed (cycle frequency) and stride (step length/height), percent of the gait's nominal values
+SPEED_MIN, SPEED_MAX = 25, 200
+STRIDE_MIN, STRIDE_MAX = 20, 100
+
+# joystick fields of a control update (panel_http.html: GetX/GetY, percent of the full deflection)
+JOY_FIELDS = ('joy.x', 'joy.y', 'joy.z')
+JOY_MIN, JOY_MAX = -100, 100
+
+# MOVE mode buttons as velocity commands (vx, vy, yaw_rate) in percent of the gait's full stride (PhaseGait)
+BUTTON_VELOCITY = {'STANDBY': (0, 0, 0), 'FORWARD': (100, 0, 0), 'BACKWARD': (-100, 0, 0), 'LEFTSHIFT': (0, -100, 0),
+                   'RIGHTSHIFT': (0, 100, 0), 'LEFTTURN': (0, 0, -100), 'RIGHTTURN': (0, 0, 100)}
 
 
 class WebController:
@@ -19,6 +60,31 @@ class WebController:
         self.rc_gait_mode = GAIT_TROT
         self.rc_moving_status = MOVE_STANDBY
         self.rc_pose = [0, 0, 0, 0, 0, 0]  # x, y, z, roll, pitch, yaw
+        self.rc_pose_version = 0  # bumped on every change of rc_pose (NodeQuad skips the pose pipeline otherwise)
+        self.pose_deadband = pose_deadband
+        self.rc_velocity = [0, 0, 0]  # MOVE mode: vx, vy, yaw_rate in percent, from the buttons or the joystick
+        self._velocity_from_joystick = False  # the joystick's centre only stops what the joystick started
+        self.rc_speed = 100
+        self.rc_stride = 100
+        self.http_request = HttpRequest(HTTP_BUFFER_SIZE)  # receive buffer of the threaded server, reused
+        # the rc_* fields above are the web thread's working state, the control loop only reads self.command
+        self.command = None
+        self._calibration_snapshot = None  # tuple copy of calibration_data, rebuilt when it changes
+        self._calibration_source = None
+        self.publish()
+
+    def publish(self):
+        """
+        snapshot the rc_* fields into a new Command and swap it in with one reference assignment:
+        a reader holding the previous Command keeps a consistent view, the next read gets the new one
+        """
+        if self._calibration_source is not self.calibration_data:
+            self._calibration_source = self.calibration_data
+            self._calibration_snapshot = tuple([tuple(joints) for joints in self.calibration_data])
+        seq = self.command.seq + 1 if self.command is not None else 0
+        self.command = Command(seq, self.rc_calibration, self.rc_mode, self.rc_gait_mode, self.rc_moving_status,
+                               tuple(self.rc_pose), self.rc_pose_version, tuple(self.rc_velocity),
+                               self.rc_speed, self.rc_stride, self._calibration_snapshot)
 
     @staticmethod
     def pose_cal(component, joystick_range, rotate_range):
@@ -29,6 +95,7 @@ class WebController:
         with open(json_path, 'r') as f:
             json_data = json.load(f)
             self.calibration_data = json_data['calibration']
+        self.publish()
         print("Load calibration data: {0}\n}".format(self.calibration_data))
 
     def save_calibration(self, json_path):
@@ -40,16 +107,104 @@ class WebController:
     def reset_rc_except_mode(self):
         self.rc_gait_mode = GAIT_TROT
         self.rc_moving_status = MOVE_STANDBY
-        self.rc_pose = [0, 0, 0, 0, 0, 0]
+        self.set_pose([0, 0, 0, 0, 0, 0])
+        self.rc_velocity = [0, 0, 0]
+        self._velocity_from_joystick = False
+
+    def set_pose(self, pose):
+        """update rc_pose in place, bump rc_pose_version only if a component actually changed"""
+        changed = False
+        for i in range(6):
+            if self.rc_pose[i] != pose[i]:
+                self.rc_pose[i] = pose[i]
+                changed = True
+        if changed:
+            self.rc_pose_version += 1
+
+    def filter_joystick(self, value, current):
+        """
+        deadband: joystick jitter within pose_deadband of the current value is ignored (center always passes)
+        value: an int already limited to JOY_MIN..JOY_MAX (clamp_int), never the raw remote value
+        """
+        if value == 0 or abs(value - current) > self.pose_deadband:
+            return value
+        return current
+
+    def set_velocity_joystick(self, ctrl_quantity):
+        """MOVE mode joystick: up = forward (vx), right = vy, joy.z = yaw_rate; centred it leaves a button command alone"""
+        # int8 binary frames reach +-127, json anything: limited to the percent range before the velocity command
+        joy = [self.clamp_int(ctrl_quantity.get(field, 0), JOY_MIN, JOY_MAX, 0)
+               for field in ('joy.y', 'joy.x', 'joy.z')]
+        if joy == [0, 0, 0] and not self._velocity_from_joystick:
+            return
+        self.rc_velocity = [self.filter_joystick(joy[i], self.rc_velocity[i]) for i in range(3)]
+        self._velocity_from_joystick = joy != [0, 0, 0]
 
     def process_panel(self, panel_req):
+        """control request as str -> False if its body is not a usable control object (nothing applied)"""
         try:
             header, _, json_string = panel_req.partition('\r\n\r\n')
             ctrl_quantity = json.loads(json_string)  # {'button': 'POSE', 'joy.x': 100, 'joy.x': 150, 'joy.z': 50}
         except:
             # print(panel_req)
-            return
-        
+            return False
+        return self.apply_checked(ctrl_quantity)
+
+    def process_body(self, request):
+        """process_panel for an HttpRequest: the json body is parsed from the receive buffer"""
+        try:
+            ctrl_quantity = request.body_json()
+        except ValueError:
+            return False
+        return self.apply_checked(ctrl_quantity)
+
+    def apply_checked(self, ctrl_quantity):
+        """apply_control for decoded remote json, False (nothing applied) if it does not pass checked_control"""
+        ctrl_quantity = self.checked_control(ctrl_quantity)
+        if ctrl_quantity is None:
+            return False
+        self.apply_control(ctrl_quantity)
+        return True
+
+    @staticmethod
+    def checked_control(ctrl_quantity):
+        """
+        decoded remote json -> the same dict with int joystick and calibration values,
+        None if it is not an object or a field has the wrong type (apply_control trusts its input)
+        """
+        if not isinstance(ctrl_quantity, dict) or not isinstance(ctrl_quantity.get('button', ''), str):
+            return None
+        try:
+            for field in JOY_FIELDS:
+                if field in ctrl_quantity:
+                    ctrl_quantity[field] = int(ctrl_quantity[field])
+            if 'calibration' in ctrl_quantity:
+                calibration = [int(value) for value in ctrl_quantity['calibration']]  # calibration.html sends strings
+                if len(calibration) != 12:
+                    return None
+                ctrl_quantity['calibration'] = calibration
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return ctrl_quantity
+
+    def process_ws_frame(self, opcode, payload):
+        """
+        binary frame: 2 x int8 joystick (joy.x, joy.y)
+        text frame: the same json object as the http body, e.g. {"button": "FORWARD"}
+        -> False if a text frame is not a usable control object (nothing applied)
+        """
+        if opcode == websocket.OP_BINARY and len(payload) == 2:
+            joy_x, joy_y = ustruct.unpack('bb', payload)
+            self.apply_control({'joy.x': joy_x, 'joy.y': joy_y})
+        elif opcode == websocket.OP_TEXT:
+            try:
+                ctrl_quantity = json.loads(bytes(payload).decode())
+            except:
+                return False
+            return self.apply_checked(ctrl_quantity)
+        return True
+
+    def apply_control(self, ctrl_quantity):
         button = ctrl_quantity['button'] if 'button' in ctrl_quantity.keys() else None
         joy_x = ctrl_quantity['joy.x'] if 'joy.x' in ctrl_quantity.keys() else self.rc_pose[3]
         joy_y = ctrl_quantity['joy.y'] if 'joy.y' in ctrl_quantity.keys() else self.rc_pose[4]
@@ -75,6 +230,10 @@ class WebController:
             else:
                 pass
         else:
+            if 'speed' in ctrl_quantity:
+                self.rc_speed = self.clamp_int(ctrl_quantity['speed'], SPEED_MIN, SPEED_MAX, self.rc_speed)
+            if 'stride' in ctrl_quantity:
+                self.rc_stride = self.clamp_int(ctrl_quantity['stride'], STRIDE_MIN, STRIDE_MAX, self.rc_stride)
             if button is not None and button in ['POSE', 'MOVE']:
                 self.rc_mode = self.get_mode(button)
                 self.reset_rc_except_mode()
@@ -82,20 +241,38 @@ class WebController:
             if self.rc_mode == MODE_MOVE:
                 if button in ['STANDBY', 'FORWARD', 'BACKWARD', 'LEFTSHIFT', 'RIGHTSHIFT', 'LEFTTURN', 'RIGHTTURN']:
                     self.rc_moving_status = self.get_moving_status(button)
-                elif button in ['TROT', 'WALK', 'GALLOP', 'CREEP']:
+                    self.rc_velocity = list(BUTTON_VELOCITY[button])
+                    self._velocity_from_joystick = False
+                elif button is not None and gait_mode_by_name(button) is not None:
                     self.rc_gait_mode = self.get_gait_mode(button)
                 else:
                     pass
+                if 'joy.x' in ctrl_quantity or 'joy.y' in ctrl_quantity:
+                    self.set_velocity_joystick(ctrl_quantity)
             elif self.rc_mode == MODE_POSE:
                 if button == 'STANDBY':
                     self.reset_rc_except_mode()
-                elif button in ['FORWARD', 'BACKWARD', 'LEFTSHIFT', 'RIGHTSHIFT', 'LEFTTURN', 'RIGHTTURN']:
+                pose = list(self.rc_pose)
+                if button in ['FORWARD', 'BACKWARD', 'LEFTSHIFT', 'RIGHTSHIFT', 'LEFTTURN', 'RIGHTTURN']:
                     shift_inc = self.get_shift_increment(button)
                     for i, shift in enumerate(shift_inc[:3]):
-                        self.rc_pose[i] = min(max(self.rc_pose[i] + shift, -30), 30)
-                self.rc_pose[3:] = [joy_x, joy_y, joy_z]
+                        pose[i] = min(max(pose[i] + shift, -30), 30)
+                joy = [self.clamp_int(value, JOY_MIN, JOY_MAX, pose[3 + i])
+                       for i, value in enumerate((joy_x, joy_y, joy_z))]
+                pose[3:] = [self.filter_joystick(joy[i], pose[3 + i]) for i in range(3)]
+                self.set_pose(pose)
             else:
                 pass
+        self.publish()
+
+    @staticmethod
+    def clamp_int(value, low, high, current):
+        """remote number (int or numeric string) limited to low..high, current if it is not a number"""
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return current
+        return min(max(value, low), high)
 
     @classmethod
     def get_mode(cls, button):
@@ -104,11 +281,10 @@ class WebController:
 
     @classmethod
     def get_gait_mode(cls, button):
-        transitions_gait_mode = {'TROT': GAIT_TROT,
-                                 'WALK': GAIT_WALK,
-                                 'GALLOP': GAIT_GALLOP,
-                                 'CREEP': GAIT_CREEP}
-        return transitions_gait_mode[button]
+        gait_mode = gait_mode_by_name(button)  # built-in and gaits.json gaits
+        if gait_mode is None:
+            raise KeyError(button)
+        return gait_mode
 
     @classmethod
     def get_moving_status(cls, button):
@@ -140,55 +316,151 @@ class WebController:
             raise ValueError
         return inc
 
-    def loop(self):
+    def status_json(self):
+        """Compact acknowledgement returned to control requests instead of the whole panel page."""
+        return json.dumps({'mode': self.rc_mode,
+                           'gait': self.rc_gait_mode,
+                           'status': self.rc_moving_status,
+                           'pose': self.rc_pose,
+                           'calibration': self.rc_calibration})
+
+    def gaits_json(self):
+        """gait buttons for the panel, in gait mode order"""
+        return json.dumps({'gaits': [{'id': gait_mode, 'name': GAIT_NAMES[gait_mode]} for gait_mode in sorted(GAIT_NAMES)],
+                           'current': self.rc_gait_mode})
+
+    @staticmethod
+    def parse_request_line(req):
+        """'POST /control HTTP/1.1\r\n...' -> ('POST', '/control')"""
+        request_line = req.split('\r\n', 1)[0].split(' ')
+        if len(request_line) < 2:
+            return None, None
+        return request_line[0], request_line[1]
+
+    @staticmethod
+    def response(body, content_type='text/html', status='200 OK', headers=''):
+        """-> (header, body) bytes of a complete http response, headers: extra 'Name: value\r\n' lines"""
+        body = body.encode()
+        header = 'HTTP/1.1 {0}\r\nContent-Type: {1}\r\nContent-Length: {2}\r\n{3}Connection: close\r\n\r\n'.format(
+            status, content_type, len(body), headers)
+        return header.encode(), body
+
+    def handle_request(self, req, accept_ws=True, request=None):
+        """
+        Route one http request -> (byte chunks to send, whether the connection became a websocket)
+        request: the HttpRequest req (its head) came from, control bodies are then parsed in place
+        """
+        method, path = self.parse_request_line(req)
+
+        if path is None or path.find('favicon.ico') > -1:  # Filter
+            return (), False
+        elif path == WS_PATH:
+            key = websocket.handshake_key(req)
+            if key is not None and not accept_ws:
+                return self.response('Busy', 'text/plain', '503 Service Unavailable'), False
+            elif key is not None:
+                return (websocket.handshake_response(key).encode(),), True
+            else:
+                return self.response('Bad Request', 'text/plain', '400 Bad Request'), False
+        elif path.split('?', 1)[0] == METRICS_PATH and method == 'GET':
+            if path.find('text') > -1:
+                return self.response(metrics.text(), 'text/plain'), False
+            return self.response(metrics.json(), 'application/json'), False
+        elif path == GAITS_PATH and method == 'GET':
+            return self.response(self.gaits_json(), 'application/json'), False
+        elif path == CONTROL_PATH:
+            # Parse Request and Process Remote Control Panel Input from Client, answer with a tiny ack
+            if request is not None:
+                applied = self.process_body(request)
+            else:
+                applied = self.process_panel(req)
+            if not applied:
+                return self.response('Bad Request', 'text/plain', '400 Bad Request'), False
+            return self.response(self.status_json(), 'application/json'), False
+        elif method == 'POST':
+            # only CONTROL_PATH takes control input, the pages and status endpoints are read-only
+            if path.split('?', 1)[0] in ('/', GAITS_PATH, METRICS_PATH) or path.find('calibration_page') > -1:
+                return self.response('Method Not Allowed', 'text/plain', '405 Method Not Allowed', 'Allow: GET\r\n'), False
+            return self.response('Not Found', 'text/plain', '404 Not Found'), False
+        elif path.find('calibration_page') > -1:
+            return self.response(load_panel_html(calib_html_dir)), False
+        elif path == '/':
+            return self.response(load_panel_html(panel_html_dir)), False
+        else:
+            return self.response('Not Found', 'text/plain', '404 Not Found'), False
+
+    def handle_ws_frame(self, opcode, payload):
+        """Process one client frame -> (reply opcode, reply payload); an OP_CLOSE reply ends the session."""
+        if opcode == websocket.OP_CLOSE:
+            return websocket.OP_CLOSE, payload
+        elif opcode == websocket.OP_PING:
+            return websocket.OP_PONG, payload
+        elif opcode in (websocket.OP_TEXT, websocket.OP_BINARY):
+            if not self.process_ws_frame(opcode, payload):
+                return websocket.close_reply(websocket.CLOSE_INVALID_DATA)
+            return websocket.OP_TEXT, self.status_json()
+        return None, None
+
+    def serve_http(self, conn, accept_ws=True):
+        """Answer one http request; return True if the connection was upgraded to a websocket (kept open)."""
+        request = self.http_request
+        status = request.read(conn, HTTP_TIMEOUT_MS)
+        if status != STATUS_OK:  # malformed, too large or too slow
+            chunks, upgraded = self.response(status, 'text/plain', status), False
+        else:
+            chunks, upgraded = self.handle_request(request.head(), accept_ws, request)
+        conn.settimeout(HTTP_SEND_TIMEOUT)  # read() left the rest of its deadline on the socket
+        for chunk in chunks:
+            conn.sendall(chunk)
+        return upgraded
+
+    def serve_ws(self, conn):
+        """Handle one frame of a websocket client; return False once the client is gone."""
+        opcode, payload = websocket.recv_frame(conn, HTTP_BUFFER_SIZE)
+        reply_opcode, reply = self.handle_ws_frame(opcode, payload)
+        if reply_opcode is not None:
+            websocket.send_frame(conn, reply, reply_opcode)
+        return reply_opcode != websocket.OP_CLOSE
+
+    def loop(self, port=80):
         # Setup Socket WebServer
         s = socket(AF_INET, SOCK_STREAM)
         s.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
-        s.bind((self.sta_ip, 80))
-        s.listen(1)
+        s.bind((self.sta_ip, port))
+        s.listen(2)
+        ws_clients = []
 
         # Main Loop
         while True:
             try:
-                # Accept request from clients
-                conn, addr = s.accept()
+                readable = select([s] + ws_clients, [], [])[0]
             except OSError:
-                    continue
-            req = conn.recv(1024).decode()  # req = str(conn.recv(1024))
-            
-            # Parse Request and Process Remote Control Panel Input from Client
-            self.process_panel(req)
-
-            # conn.sendall('HTTP/1.1 200 OK\nConnection: close\nServer: FireBeetle\nContent-Type: text/html\n\n'.encode())
-            if req.find('favicon.ico') > -1:  # Filter
-                conn.close()
                 continue
-            elif req.find('calibration_page') > -1:
-                try:
-                    conn.sendall(calib_html_str)
-                    conn.close()
-                except OSError:
-                    continue
-            else:
-                try:
-                    # Response and Close Socket
-                    conn.sendall(panel_html_str)
-                    conn.close()
-                except OSError:
-                    continue
+            for sock in readable:
+                if sock is s:
+                    try:
+                        # Accept request from clients
+                        conn, addr = s.accept()
+                    except OSError:
+                        continue
+                    upgraded = False
+                    try:
+                        # bounded by HTTP_TIMEOUT_MS: a stalled client must not freeze the loop
+                        upgraded = self.serve_http(conn, len(ws_clients) < WS_MAX_CLIENTS)
+                    except Exception:  # OSError, or whatever one bad request triggers: drop only this connection
+                        upgraded = False
+                    if upgraded:
+                        conn.settimeout(1)
+                        ws_clients.append(conn)
+                    else:
+                        conn.close()
+                else:
+                    try:
+                        alive = self.serve_ws(sock)
+                    except Exception:  # as above, the other clients and the thread stay up
+                        alive = False
+                    if not alive:
+                        ws_clients.remove(sock)
+                        sock.close()
 
             # print("Mode: ", self.rc_mode, "Gait:", self.rc_gait_mode, "Status: ", self.rc_moving_status, "Pose:", self.rc_pose)
-
-
-
-
-
-
-
-
-
-
-
-
-
-
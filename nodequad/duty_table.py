@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from array import array
+from leg import Leg
+
+
+class DutyTables:
+    """
+    步态轨迹(世界坐标足尖点) -> 每帧12个舵机的PCA9685 duty（已含校正偏置），首次使用时编译并缓存
+    播放时只需按帧索引写入，不再逐帧做坐标变换、逆解和脉宽换算
+    """
+
+    def __init__(self, servo, legs, cache_entries=8, cache_frames=96):
+        self.servo = servo
+        self.legs = legs
+        # LRU bounded like Gait.path_cache (gait_cache_entries, gait_cache_frames): one table per cached path fits
+        self.cache_entries = cache_entries
+        self.cache_frames = cache_frames
+        self.tables = {}  # key -> array('H'), 12 duties per frame
+        self._order = []  # keys, least recently used first
+        self.offset_version = servo.offset_version
+
+    def compile(self, path):
+        table = array('H', [0] * (12 * len(path)))
+        for frame_id in range(len(path)):
+            frame = path[frame_id]
+            for leg_index in range(4):
+                angles = Leg.local_ik(self.legs[leg_index].translate2local(frame[leg_index]))
+                for part_index in range(3):
+                    table[12 * frame_id + 3 * leg_index + part_index] = self.servo.angle2duty(leg_index, part_index, angles[part_index])
+        return table
+
+    def get(self, key, path):
+        """key: (gait_mode, move_status, gait_speed) the path was generated with"""
+        if self.offset_version != self.servo.offset_version:  # calibration changed
+            self.clear()
+            self.offset_version = self.servo.offset_version
+        table = self.tables.get(key)
+        if table is None:
+            table = self.compile(path)
+            self._insert(key, table)
+        elif self._order[-1] != key:  # called every frame: the playing table is normally the most recent already
+            self._order.remove(key)
+            self._order.append(key)
+        return table
+
+    def put(self, key, table):
+        """a table compiled earlier (path_store.py) against the current calibration"""
+        if self.offset_version != self.servo.offset_version:
+            self.clear()
+            self.offset_version = self.servo.offset_version
+        self._insert(key, table)
+
+    def _insert(self, key, table):
+        if key in self.tables:
+            self._order.remove(key)
+        self.tables[key] = table
+        self._order.append(key)
+        while self._order and (len(self._order) > self.cache_entries or self.cached_frames() > self.cache_frames):
+            del self.tables[self._order.pop(0)]
+
+    def clear(self):
+        self.tables.clear()
+        self._order = []
+
+    def cached_frames(self):
+        return sum([len(table) for table in self.tables.values()]) // 12
+
+    def memory_bytes(self):
+        """payload bytes held by the compiled tables"""
+        return sum([len(table) * table.itemsize for table in self.tables.values()])
+
+    def budget_bytes(self):
+        """most memory_bytes() can reach: cache_frames frames of 12 uint16 duties"""
+        return self.cache_frames * 24
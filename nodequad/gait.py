@@ -1,6 +1,11 @@
-from math import sin, cos, pi
+from array import array
 from setting import p1_x, p1_y, p1_z, p2_x, p2_y, p2_z, p3_x, p3_y, p3_z, p4_x, p4_y, p4_z
 from geometry import FastTransform
+from trajectory import GaitCycle
+try:
+    from ucollections import namedtuple
+except ImportError:
+    from collections import namedtuple
 
 
 GAIT_TROT = 0
@@ -20,6 +25,51 @@ MOVE_RIGHTSHIFT = 15
 MOVE_LEFTROTATE = 16
 MOVE_RIGHTROTATE = 17
 
+# declarative gait: one cycle of cycle_ms (slow_cycle_ms at gait_speed 1), swing fraction of the cycle,
+# offsets: cycle phase at which each leg (fr, br, bl, fl) starts its swing,
+# amplitude/lift: scale of Gait.amplitudeX / amplitudeZ, windows: (start, end) phases in which the body travels,
+# swing_profile/stance_profile: curves of trajectory.SWING_PROFILES / STANCE_PROFILES
+GaitSpec = namedtuple('GaitSpec', ('cycle_ms', 'slow_cycle_ms', 'swing', 'offsets', 'amplitude', 'lift', 'windows',
+                                   'swing_profile', 'stance_profile'))
+
+GAIT_SPECS = {
+    # diagonal pairs (fr+bl, br+fl) alternate
+    GAIT_TROT: GaitSpec(200, 400, 0.5, (0.0, 0.5, 0.0, 0.5), 1.0, 1.0, ((0.0, 0.5), (0.5, 1.0)), 'sine', 'cosine'),
+    # one leg at a time: fl, br, fr, bl
+    GAIT_WALK: GaitSpec(320, 1280, 0.25, (0.5, 0.25, 0.75, 0.0), 1.5, 1.0, ((0.0, 1.0),), 'sine', 'linear'),
+    # rotary gallop: fl, fr, br, bl
+    GAIT_GALLOP: GaitSpec(320, 1280, 0.25, (0.25, 0.5, 0.75, 0.0), 1.5, 1.0, ((0.0, 1.0),), 'sine', 'linear'),
+    # fr, bl, fl, br; the body only moves while all four feet are down (stages 1 and 4 of 6)
+    GAIT_CREEP: GaitSpec(720, 1440, 1 / 6, (0.0, 5 / 6, 2 / 6, 3 / 6), 2.0, 1.5, ((1 / 6, 2 / 6), (4 / 6, 5 / 6)),
+                         'sine', 'cosine'),
+}
+
+# remote button name of every gait mode, extended/overridden by gait_loader.load_gaits (gaits.json)
+GAIT_NAMES = {GAIT_TROT: 'TROT', GAIT_WALK: 'WALK', GAIT_GALLOP: 'GALLOP', GAIT_CREEP: 'CREEP'}
+
+
+def gait_mode_by_name(name):
+    """gait mode of a gait button name, None if there is no such gait"""
+    for gait_mode in GAIT_NAMES:
+        if GAIT_NAMES[gait_mode] == name:
+            return gait_mode
+    return None
+
+
+def register_gait(name, spec):
+    """add a gait (new gait mode after the highest one) or replace the spec of the gait with that name"""
+    gait_mode = gait_mode_by_name(name)
+    if gait_mode is None:
+        gait_mode = max(GAIT_NAMES) + 1
+        GAIT_NAMES[gait_mode] = name
+    GAIT_SPECS[gait_mode] = spec
+    return gait_mode
+
+# rough MicroPython (ESP32) heap cost of one path frame: outer list + 4 point lists (16B object + item block) + 12 boxed floats (16B)
+PATH_FRAME_BYTES = 352
+# the same frame as PackedPath: 12 float32
+PACKED_FRAME_BYTES = 48
+
 home_x = [p1_x, p2_x, p3_x, p4_x]
 home_y = [p1_y, p2_y, p3_y, p4_y]
 home_z = [p1_z, p2_z, p3_z, p4_z]
@@ -46,27 +96,174 @@ def right_rotate_path(path: list, rotation_num):
     return rotated_path
 
 
+class PackedPath:
+    """
+    Gait path as one flat array('f'), shape frames x 4 legs x 3 (x, y, z) world-frame tip positions.
+    path.data[path.offset(frame_id, leg_index) + axis]; path[frame_id] still gives the nested-list frame (allocates).
+    """
+
+    def __init__(self, path):
+        if isinstance(path, array):  # already flat (path_store.py), kept as is
+            self.num_frames = len(path) // 12
+            self.data = path
+            return
+        self.num_frames = len(path)
+        self.data = array('f', [0.0] * (12 * self.num_frames))
+        for frame_id in range(self.num_frames):
+            for leg_index in range(4):
+                point = path[frame_id][leg_index]
+                offset = 12 * frame_id + 3 * leg_index
+                self.data[offset] = point[0]
+                self.data[offset + 1] = point[1]
+                self.data[offset + 2] = point[2]
+
+    def __len__(self):
+        return self.num_frames
+
+    def __getitem__(self, frame_id):
+        return [self.point(frame_id, leg_index) for leg_index in range(4)]
+
+    @staticmethod
+    def offset(frame_id, leg_index):
+        return 12 * frame_id + 3 * leg_index
+
+    def point(self, frame_id, leg_index, out=None):
+        """tip position of one leg, written into 'out' (3-list) if given"""
+        offset = 12 * frame_id + 3 * leg_index
+        if out is None:
+            out = [0.0, 0.0, 0.0]
+        out[0] = self.data[offset]
+        out[1] = self.data[offset + 1]
+        out[2] = self.data[offset + 2]
+        return out
+
+
+_point_a = [0.0, 0.0, 0.0]  # sample_path scratch (control loop only)
+_point_b = [0.0, 0.0, 0.0]
+
+
+def sample_path(path, frame_id, frac, stride, out):
+    """
+    Resample a path between frame_id and the next frame (frac 0..1, linear) with the step offsets from home
+    scaled by 'stride': variable cadence and step length from the same normalized path, nothing regenerated.
+    path: nested lists or PackedPath; the 4 world-frame tips are written into out
+    """
+    next_id = frame_id + 1 if frame_id < len(path) - 1 else 0
+    packed = isinstance(path, PackedPath)
+    homes = (home_x, home_y, home_z)
+    for leg_index in range(4):
+        if packed:
+            a = path.point(frame_id, leg_index, _point_a)
+            b = path.point(next_id, leg_index, _point_b)
+        else:
+            a = path[frame_id][leg_index]
+            b = path[next_id][leg_index]
+        tip = out[leg_index]
+        for axis in range(3):
+            home = homes[axis][leg_index]
+            tip[axis] = home + (a[axis] + (b[axis] - a[axis]) * frac - home) * stride
+    return out
+
+
 class Gait:
     """步态生成"""
-    def __init__(self):
+    def __init__(self, cache_entries=8, cache_frames=96, packed=False):
         # gait constants
         self.amplitudeX, self.amplitudeY, self.amplitudeZ = 25, 15, 35
         # movement configuration
         self.frame_time_ms = 20
+        # LRU cache of generated paths (get_path), bounded by entry count and total frames
+        self.cache_entries = cache_entries
+        self.cache_frames = cache_frames
+        self.path_cache = {}
+        self._cache_order = []  # keys, least recently used first
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # get_path returns PackedPath instead of nested lists
+        self.packed = packed
+        self._cycles = {}  # GaitSpec -> its GaitCycle, compiled once per gait definition
+
+    def path_key(self, gait_mode, move_status, gait_speed=0):
+        return (gait_mode, move_status, gait_speed, self.amplitudeX, self.amplitudeY, self.amplitudeZ, self.frame_time_ms)
+
+    def get_path(self, gait_mode, move_status, gait_speed=0):
+        """gen_path through the LRU cache: a direction switch to a recently used path is a lookup."""
+        key = self.path_key(gait_mode, move_status, gait_speed)
+        path = self.path_cache.get(key)
+        if path is not None:
+            self.cache_hits += 1
+            self._cache_order.remove(key)
+            self._cache_order.append(key)
+            return path
+        self.cache_misses += 1
+        path = self.gen_path(gait_mode, move_status, gait_speed)
+        if self.packed:
+            path = PackedPath(path)
+        self._insert(key, path)
+        return path
+
+    def put_path(self, gait_mode, move_status, gait_speed, data):
+        """Cache a path stored earlier (path_store.py): data is its flat array('f') of tips, as in PackedPath."""
+        path = PackedPath(data)
+        if not self.packed:
+            path = [path[frame_id] for frame_id in range(len(path))]
+        self._insert(self.path_key(gait_mode, move_status, gait_speed), path)
+
+    def cached_paths(self):
+        """[(gait_mode, move_status, gait_speed, path)] in the cache, least recently used first"""
+        return [key[:3] + (self.path_cache[key],) for key in self._cache_order]
+
+    def _insert(self, key, path):
+        if key in self.path_cache:
+            self._cache_order.remove(key)
+        self.path_cache[key] = path
+        self._cache_order.append(key)
+        self._evict()
+
+    def _evict(self):
+        while self._cache_order and (len(self._cache_order) > self.cache_entries or self.cached_frames() > self.cache_frames):
+            del self.path_cache[self._cache_order.pop(0)]
+
+    def cached_frames(self):
+        return sum([len(path) for path in self.path_cache.values()])
+
+    def cache_memory_bytes(self):
+        """estimated heap held by the cached paths"""
+        return self.cached_frames() * (PACKED_FRAME_BYTES if self.packed else PATH_FRAME_BYTES)
+
+    def clear_cache(self):
+        self.path_cache.clear()
+        self._cache_order = []
+        self._cycles.clear()  # gait definitions may have changed too (gait_loader)
+
+    def warm_up(self, gait_modes=(GAIT_TROT, GAIT_WALK, GAIT_GALLOP, GAIT_CREEP),
+                move_statuses=(MOVE_STANDBY, MOVE_FORWARD, MOVE_BACKWARD, MOVE_LEFTSHIFT, MOVE_RIGHTSHIFT,
+                               MOVE_LEFTROTATE, MOVE_RIGHTROTATE), gait_speed=0):
+        """
+        Pre-generate paths in order until the cache limits are reached -> number of paths warmed up.
+        Stops at the first path that would evict one warmed up here, the rest are generated on first use.
+        """
+        entries = frames = 0
+        for gait_mode in gait_modes:
+            for move_status in move_statuses:
+                key = self.path_key(gait_mode, move_status, gait_speed)
+                path = self.path_cache.get(key)
+                if path is None:
+                    path = self.gen_path(gait_mode, move_status, gait_speed)
+                    if self.packed:
+                        path = PackedPath(path)
+                if entries + 1 > self.cache_entries or frames + len(path) > self.cache_frames:
+                    return entries
+                self._insert(key, path)
+                entries += 1
+                frames += len(path)
+        return entries
 
     def gen_path(self, gait_mode, move_status, gait_speed=0):
         """Generate gait trajectory under world frame."""
-        if gait_mode == GAIT_TROT:
-            path = self.trot_gait(move_status, gait_speed)
-        elif gait_mode == GAIT_WALK:
-            path = self.walk_gait(move_status, gait_speed)
-        elif gait_mode == GAIT_GALLOP:
-            path = self.gallop_gait(move_status, gait_speed)
-        elif gait_mode == GAIT_CREEP:
-            path = self.creep_gait(move_status, gait_speed)
-        else:
+        if gait_mode not in GAIT_SPECS:
             raise ValueError()
-        return path
+        return self.spec_path(GAIT_SPECS[gait_mode], move_status, gait_speed)
 
     def formated_path_status(self, fr_path_quad, br_path_quad, bl_path_quad, fl_path_quad, move_status):
         path_quad = [[fr_path_quad[path_id], br_path_quad[path_id], bl_path_quad[path_id], fl_path_quad[path_id]]
@@ -101,187 +298,14 @@ class Gait:
                            for points_set in corrected_path]
         return path_quad_world
 
-    def trot_gait(self, move_status, gait_speed=0):
-        """global"""
-        duration = 200 if gait_speed == 0 else 400
-        # total ticks divided into 2 stages, 'num_ticks' = ticks per stages
-        num_ticks = int(duration / self.frame_time_ms / 2)
-        # fr_path_quad = [[0.0, 0.0, 0.0]] * num_ticks * 2  # shallow copy
-        fr_path_quad = [[0.0, 0.0, 0.0] for i in range(num_ticks*2)]
-
-        for stage_id in range(2):  # A cycle is divided into 2 stages
-            for tick_cnt in range(num_ticks):
-                interp_id = stage_id * num_ticks + tick_cnt
-                if stage_id == 0:
-                    fr_path_quad[interp_id][0] = -self.amplitudeX * cos(pi * tick_cnt / num_ticks)
-                    fr_path_quad[interp_id][1] = 0.0
-                    fr_path_quad[interp_id][2] = abs(self.amplitudeZ) * sin(pi * tick_cnt / num_ticks) * -1
-                elif stage_id == 1:
-                    fr_path_quad[interp_id][0] = self.amplitudeX * cos(pi * tick_cnt / num_ticks)
-                    fr_path_quad[interp_id][1] = 0.0
-                    fr_path_quad[interp_id][2] = 0.0
-                else:
-                    pass
-
-        # Deep copy
-        br_path_quad = [[point[0], point[1], point[2]] for point in right_rotate_path(fr_path_quad, num_ticks)]
-        bl_path_quad = [[point[0], point[1], point[2]] for point in fr_path_quad]
-        fl_path_quad = [[point[0], point[1], point[2]] for point in br_path_quad]
-
-        path_quad_world = self.formated_path_status(fr_path_quad, br_path_quad, bl_path_quad, fl_path_quad, move_status)
-
-        return path_quad_world
-
-    def walk_gait(self, move_status, gait_speed=0):
-        duration = 4 * 4 * self.frame_time_ms if gait_speed == 0 else 1280
-        # total ticks divided into 4 stages, 'num_ticks' = ticks per stages
-        num_ticks = int(duration / self.frame_time_ms / 4)
-        fl_path_quad = [[0.0, 0.0, 0.0] for i in range(num_ticks*4)]
-
-        for stage_id in range(4):  # A cycle is divided into 4 stages
-            for tick_cnt in range(num_ticks):
-                interp_id = stage_id * num_ticks + tick_cnt
-                if stage_id == 0:
-                    fl_path_quad[interp_id][0] = -self.amplitudeX * cos(pi * tick_cnt / num_ticks) * 1.5
-                    fl_path_quad[interp_id][1] = 0.0
-                    fl_path_quad[interp_id][2] = abs(self.amplitudeZ) * sin(pi * tick_cnt / num_ticks) * -1
-                elif stage_id == 1:
-                    fl_path_quad[interp_id][0] = (self.amplitudeX - self.amplitudeX * 2 * (tick_cnt / num_ticks) / 3)  * 1.5
-                    fl_path_quad[interp_id][1] = 0.0
-                    fl_path_quad[interp_id][2] = 0.0
-                elif stage_id == 2:
-                    fl_path_quad[interp_id][0] = (self.amplitudeX - self.amplitudeX * 2 * ((num_ticks + tick_cnt) / num_ticks) / 3) * 1.5
-                    fl_path_quad[interp_id][1] = 0.0
-                    fl_path_quad[interp_id][2] = 0.0
-                elif stage_id == 3:
-                    fl_path_quad[interp_id][0] = (self.amplitudeX - self.amplitudeX * 2 * ((2 * num_ticks + tick_cnt) / num_ticks) / 3) * 1.5
-                    fl_path_quad[interp_id][1] = 0.0
-                    fl_path_quad[interp_id][2] = 0.0
-                else:
-                    pass
-
-        fr_path_quad = [[point[0], point[1], point[2]] for point in right_rotate_path(fl_path_quad, num_ticks * 2)]
-        br_path_quad = [[point[0], point[1], point[2]] for point in right_rotate_path(fl_path_quad, num_ticks * 1)]
-        bl_path_quad = [[point[0], point[1], point[2]] for point in right_rotate_path(fl_path_quad, num_ticks * 3)]
-
-        path_quad_world = self.formated_path_status(fr_path_quad, br_path_quad, bl_path_quad, fl_path_quad, move_status)
-
-        return path_quad_world
-
-    def gallop_gait(self, move_status, gait_speed=0):
-        duration = 4 * 4 * self.frame_time_ms if gait_speed == 0 else 1280
-        # total ticks divided into 4 stages, 'num_ticks' = ticks per stages
-        num_ticks = int(duration / self.frame_time_ms / 4)
-        fl_path_quad = [[0.0, 0.0, 0.0] for i in range(num_ticks*4)]
-
-        for stage_id in range(4):  # A cycle is divided into 4 stages
-            for tick_cnt in range(num_ticks):
-                interp_id = stage_id * num_ticks + tick_cnt
-                if stage_id == 0:
-                    fl_path_quad[interp_id][0] = -self.amplitudeX * cos(pi * tick_cnt / num_ticks) * 1.5
-                    fl_path_quad[interp_id][1] = 0.0
-                    fl_path_quad[interp_id][2] = abs(self.amplitudeZ) * sin(pi * tick_cnt / num_ticks) * -1
-                elif stage_id == 1:
-                    fl_path_quad[interp_id][0] = (self.amplitudeX - self.amplitudeX * 2 * (tick_cnt / num_ticks) / 3) * 1.5
-                    fl_path_quad[interp_id][1] = 0.0
-                    fl_path_quad[interp_id][2] = 0.0
-                elif stage_id == 2:
-                    fl_path_quad[interp_id][0] = (self.amplitudeX - self.amplitudeX * 2 * ((num_ticks + tick_cnt) / num_ticks) / 3) * 1.5
-                    fl_path_quad[interp_id][1] = 0.0
-                    fl_path_quad[interp_id][2] = 0.0
-                elif stage_id == 3:
-                    fl_path_quad[interp_id][0] = (self.amplitudeX - self.amplitudeX * 2 * ((2 * num_ticks + tick_cnt) / num_ticks) / 3) * 1.5
-                    fl_path_quad[interp_id][1] = 0.0
-                    fl_path_quad[interp_id][2] = 0.0
-                else:
-                    pass
-
-        # Rotary Gallop (Not Transverse Gallop)
-        fr_path_quad = [[point[0], point[1], point[2]] for point in right_rotate_path(fl_path_quad, num_ticks * 1)]
-        br_path_quad = [[point[0], point[1], point[2]] for point in right_rotate_path(fl_path_quad, num_ticks * 2)]
-        bl_path_quad = [[point[0], point[1], point[2]] for point in right_rotate_path(fl_path_quad, num_ticks * 3)]
-
-        path_quad_world = self.formated_path_status(fr_path_quad, br_path_quad, bl_path_quad, fl_path_quad, move_status)
-
-        return path_quad_world
-
-    def creep_gait(self, move_status, gait_speed=0):
-        """global"""
-        duration = 720 if gait_speed == 0 else 1440
-        # total ticks divided into 6 stages, 'num_ticks' = ticks per stages
-        num_ticks = int(duration / self.frame_time_ms / 6)
-        fr_path_quad, bl_path_quad = [[0.0, 0.0, 0.0] for i in range(num_ticks*6)], [[0.0, 0.0, 0.0] for i in range(num_ticks*6)]
-
-        for stage_id in range(6):  # A cycle is divided into 2 stages
-            for tick_cnt in range(num_ticks):
-                interp_id = stage_id * num_ticks + tick_cnt
-                if stage_id == 0:
-                    # home-amplitude到home+amplitude
-                    fr_path_quad[interp_id][0] = -self.amplitudeX * cos(pi * tick_cnt / num_ticks) * 2.0
-                    fr_path_quad[interp_id][1] = 0.0
-                    fr_path_quad[interp_id][2] = abs(self.amplitudeZ) * sin(pi * tick_cnt / num_ticks) * -1.5
-                    # 保持home
-                    bl_path_quad[interp_id][0] = 0.0
-                    bl_path_quad[interp_id][1] = 0.0
-                    bl_path_quad[interp_id][2] = 0.0
-                elif stage_id == 1:
-                    # home+amplitude到home
-                    fr_path_quad[interp_id][0] = self.amplitudeX * cos(pi / 2 * tick_cnt / num_ticks) * 2.0
-                    fr_path_quad[interp_id][1] = 0.0
-                    fr_path_quad[interp_id][2] = 0.0
-                    # home往后到home-amplitude
-                    bl_path_quad[interp_id][0] = -self.amplitudeX * sin(pi / 2 * tick_cnt / num_ticks) * 2.0
-                    bl_path_quad[interp_id][1] = 0.0
-                    bl_path_quad[interp_id][2] = 0.0
-                elif stage_id == 2:
-                    # 维持home
-                    fr_path_quad[interp_id][0] = 0.0
-                    fr_path_quad[interp_id][1] = 0.0
-                    fr_path_quad[interp_id][2] = 0.0
-                    # home-amplitude到home+amplitude
-                    bl_path_quad[interp_id][0] = -self.amplitudeX * cos(pi * tick_cnt / num_ticks) * 2.0
-                    bl_path_quad[interp_id][1] = 0.0
-                    bl_path_quad[interp_id][2] = abs(self.amplitudeZ) * sin(pi * tick_cnt / num_ticks) * -1.5
-                elif stage_id == 3:
-                    # 维持home
-                    fr_path_quad[interp_id][0] = 0.0
-                    fr_path_quad[interp_id][1] = 0.0
-                    fr_path_quad[interp_id][2] = 0.0
-                    # 维持home+amplitude
-                    bl_path_quad[interp_id][0] = self.amplitudeX * 2.0
-                    bl_path_quad[interp_id][1] = 0.0
-                    bl_path_quad[interp_id][2] = 0.0
-                elif stage_id == 4:
-                    # home到home-amplitude
-                    fr_path_quad[interp_id][0] = -self.amplitudeX * sin(pi / 2 * tick_cnt / num_ticks) * 2.0
-                    fr_path_quad[interp_id][1] = 0.0
-                    fr_path_quad[interp_id][2] = 0.0
-                    # home+amplitude到home
-                    bl_path_quad[interp_id][0] = self.amplitudeX * cos(pi / 2 * tick_cnt / num_ticks) * 2.0
-                    bl_path_quad[interp_id][1] = 0.0
-                    bl_path_quad[interp_id][2] = 0.0
-                elif stage_id == 5:
-                    # 维持home-amplitude
-                    fr_path_quad[interp_id][0] = -self.amplitudeX * 2.0
-                    fr_path_quad[interp_id][1] = 0.0
-                    fr_path_quad[interp_id][2] = 0.0
-                    # 维持home
-                    bl_path_quad[interp_id][0] = 0.0
-                    bl_path_quad[interp_id][1] = 0.0
-                    bl_path_quad[interp_id][2] = 0.0
-                else:
-                    pass
-
-        fl_path_quad = [[point[0], point[1], point[2]] for point in left_rotate_path(fr_path_quad, int(len(fr_path_quad) / 2))]
-        br_path_quad = [[point[0], point[1], point[2]] for point in left_rotate_path(bl_path_quad, int(len(bl_path_quad) / 2))]
-
-        path_quad_world = self.formated_path_status(fr_path_quad, br_path_quad, bl_path_quad, fl_path_quad, move_status)
-
-        return path_quad_world
-
-
-
-
-
-
-
+    def spec_path(self, spec, move_status, gait_speed=0):
+        """one cycle of a declarative gait (GaitSpec) sampled every frame_time_ms, world frame"""
+        duration = spec.cycle_ms if gait_speed == 0 else spec.slow_cycle_ms
+        num_frames = int(duration / self.frame_time_ms) if move_status != MOVE_STANDBY else 0  # standby: one home frame
+        cycle = self._cycles.get(spec)
+        if cycle is None:
+            cycle = self._cycles[spec] = GaitCycle(spec)
+        stride = self.amplitudeX * spec.amplitude
+        height = abs(self.amplitudeZ) * spec.lift
+        leg_paths = cycle.leg_paths(num_frames, stride, height)  # fr, br, bl, fl
+        return self.formated_path_status(leg_paths[0], leg_paths[1], leg_paths[2], leg_paths[3], move_status)
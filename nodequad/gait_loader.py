@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+步态定义文件(gaits.json)：校验并编译为GaitSpec，注册到gait.GAIT_SPECS / GAIT_NAMES（遥控面板按此动态生成步态按钮）
+编译结果以二进制形式缓存在flash上(gaits.bin)，JSON文件未改变时启动只读取缓存，不再解析和校验JSON
+"""
+import json
+import ustruct
+from binascii import crc32
+from gait import GaitSpec, register_gait
+from trajectory import SWING_PROFILES, STANCE_PROFILES, GaitCycle
+from utils import replace_file
+
+CACHE_MAGIC = b'NQG1'
+CACHE_HEADER = '<4sIH'  # magic, checksum of the json file (+ amplitudes), number of gaits
+# name, cycle_ms, slow_cycle_ms, swing, 4 offsets, amplitude, lift, swing/stance profile, number of windows
+CACHE_RECORD = '<16sHHf4fff8s8sB'
+CACHE_WINDOW = '<ff'
+NAME_LENGTH = 16
+
+# remote buttons a gait must not be named after
+RESERVED_NAMES = ('MOVE', 'POSE', 'STANDBY', 'FORWARD', 'BACKWARD', 'LEFTSHIFT', 'RIGHTSHIFT', 'LEFTTURN', 'RIGHTTURN',
+                  'CALIBRATESTART', 'CALIBRATESAVE', 'CALIBRATEPAGE')
+
+
+def compile_gait(definition, amplitude_x, amplitude_z):
+    """
+    one gaits.json entry -> (name, GaitSpec), ValueError if it is not a valid gait
+    {"name": "TROT", "cycle_ms": 200, "duty_factor": 0.5, "offsets": [fr, br, bl, fl], "stride": 25, "swing_height": 35}
+    optional: "slow_cycle_ms" (2 x cycle_ms), "body_windows" ([[0, 1]]), "swing_profile" ("sine"),
+    "stance_profile" ("linear"); stride (half step length) and swing_height in mm
+    """
+    if not isinstance(definition, dict):
+        raise ValueError("gait definitions are json objects, got {0!r}".format(definition))
+    try:
+        name = str(definition['name']).upper()
+        cycle_ms = int(definition['cycle_ms'])
+        slow_cycle_ms = int(definition.get('slow_cycle_ms', 2 * cycle_ms))
+        duty_factor = float(definition['duty_factor'])
+        offsets = tuple([float(offset) for offset in definition['offsets']])
+        stride = float(definition['stride'])
+        swing_height = float(definition['swing_height'])
+        windows = tuple([(float(start), float(end)) for start, end in definition.get('body_windows', [[0.0, 1.0]])])
+        swing_profile = definition.get('swing_profile', 'sine')
+        stance_profile = definition.get('stance_profile', 'linear')
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("gait {0}: missing or malformed field ({1})".format(definition.get('name'), e))
+    if not name or len(name) > NAME_LENGTH or name in RESERVED_NAMES:
+        raise ValueError("gait {0}: name must be 1..{1} characters and not a remote button".format(name, NAME_LENGTH))
+    if not 0 < cycle_ms < 65536 or not 0 < slow_cycle_ms < 65536:
+        raise ValueError("gait {0}: cycle_ms out of range".format(name))
+    if not 0 < duty_factor < 1:
+        raise ValueError("gait {0}: duty_factor (stance share of the cycle) must be between 0 and 1".format(name))
+    if len(offsets) != 4 or not all([0 <= offset < 1 for offset in offsets]):
+        raise ValueError("gait {0}: offsets must be 4 cycle phases (fr, br, bl, fl) in [0, 1)".format(name))
+    if stride < 0 or swing_height < 0:
+        raise ValueError("gait {0}: stride and swing_height must not be negative".format(name))
+    last_end = 0.0
+    for start, end in windows:
+        if not last_end <= start < end <= 1:
+            raise ValueError("gait {0}: body_windows must be sorted, non-overlapping ranges in [0, 1]".format(name))
+        last_end = end
+    if not windows:
+        raise ValueError("gait {0}: body_windows is empty".format(name))
+    if swing_profile not in SWING_PROFILES or stance_profile not in STANCE_PROFILES:
+        raise ValueError("gait {0}: profiles are {1} (swing) and {2} (stance)".format(
+            name, sorted(SWING_PROFILES), sorted(STANCE_PROFILES)))
+    spec = GaitSpec(cycle_ms, slow_cycle_ms, 1 - duty_factor, offsets, stride / amplitude_x, swing_height / amplitude_z,
+                    windows, swing_profile, stance_profile)
+    if min(GaitCycle(spec).travel) <= 0:
+        raise ValueError("gait {0}: a leg's stance does not overlap any body window".format(name))
+    return name, spec
+
+
+def pack_spec(name, spec):
+    """one compiled gait as a cache record followed by its windows"""
+    record = ustruct.pack(CACHE_RECORD, name.encode(), spec.cycle_ms, spec.slow_cycle_ms, spec.swing,
+                          spec.offsets[0], spec.offsets[1], spec.offsets[2], spec.offsets[3], spec.amplitude,
+                          spec.lift, spec.swing_profile.encode(), spec.stance_profile.encode(), len(spec.windows))
+    return record + b''.join([ustruct.pack(CACHE_WINDOW, start, end) for start, end in spec.windows])
+
+
+def write_cache(cache_path, checksum, gaits):
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(ustruct.pack(CACHE_HEADER, CACHE_MAGIC, checksum, len(gaits)))
+        for name, spec in gaits:
+            f.write(pack_spec(name, spec))
+    replace_file(tmp_path, cache_path)
+
+
+def read_cache(cache_path, checksum):
+    """-> [(name, GaitSpec)] compiled for this checksum, None if the cache is missing or stale"""
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    try:
+        return _parse_cache(data, checksum)
+    except Exception:  # corrupt beyond the checks below: recompile from the json file
+        return None
+
+
+def _parse_cache(data, checksum):
+    pos = ustruct.calcsize(CACHE_HEADER)
+    if len(data) < pos:
+        return None
+    magic, cached_checksum, count = ustruct.unpack_from(CACHE_HEADER, data, 0)
+    if magic != CACHE_MAGIC or cached_checksum != checksum:
+        return None
+    gaits = []
+    record_size, window_size = ustruct.calcsize(CACHE_RECORD), ustruct.calcsize(CACHE_WINDOW)
+    for i in range(count):
+        if pos + record_size > len(data):
+            return None  # cut off
+        record = ustruct.unpack_from(CACHE_RECORD, data, pos)
+        pos += record_size
+        if pos + record[12] * window_size > len(data):
+            return None
+        windows = []
+        for j in range(record[12]):
+            windows.append(ustruct.unpack_from(CACHE_WINDOW, data, pos))
+            pos += window_size
+        name = record[0].rstrip(b'\x00').decode()
+        swing_profile, stance_profile = record[10].rstrip(b'\x00').decode(), record[11].rstrip(b'\x00').decode()
+        if swing_profile not in SWING_PROFILES or stance_profile not in STANCE_PROFILES:
+            return None
+        gaits.append((name, GaitSpec(record[1], record[2], record[3], record[4:8], record[8], record[9],
+                                     tuple(windows), swing_profile, stance_profile)))
+    if pos != len(data):
+        return None
+    return gaits
+
+
+def load_gaits(json_path, cache_path=None, amplitude_x=25, amplitude_z=35):
+    """
+    register the gaits of json_path (replacing built-in gaits of the same name) -> ([(gait_mode, name)], source)
+    source: 'cache' (compiled gaits read from cache_path), 'json' (parsed, cache rewritten) or None (no file)
+    ValueError/KeyError/TypeError if the json file is not valid, nothing is registered then
+    """
+    try:
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return [], None  # only the built-in gaits
+    # the compiled scale factors depend on the amplitudes too
+    checksum = crc32(ustruct.pack('<ff', amplitude_x, amplitude_z), crc32(raw)) & 0xffffffff
+    gaits = read_cache(cache_path, checksum) if cache_path else None
+    source = 'cache'
+    if gaits is None:
+        source = 'json'
+        gaits = [compile_gait(definition, amplitude_x, amplitude_z) for definition in json.loads(raw)['gaits']]
+        if cache_path:
+            try:
+                write_cache(cache_path, checksum, gaits)
+            except OSError as e:
+                print("Gait cache not written: {0}".format(e))
+    loaded = [(register_gait(name, spec), name) for name, spec in gaits]
+    return loaded, source
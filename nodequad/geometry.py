@@ -11,51 +11,65 @@ COS10 = cos(10 * pi / 180)  # 0.9962
 
 
 class FastTransform:
+    """rotations about z; 'dest' may be a preallocated 3-list (or src_point3d itself) to avoid allocating"""
+
     @staticmethod
-    def rotate45(src_point3d):
-        dest = [0.0, 0.0, 0.0]
-        dest[0] = src_point3d[0] * COS45 - src_point3d[1] * SIN45
-        dest[1] = src_point3d[0] * SIN45 + src_point3d[1] * COS45
+    def rotate45(src_point3d, dest=None):
+        x, y = src_point3d[0], src_point3d[1]
+        if dest is None:
+            dest = [0.0, 0.0, 0.0]
+        dest[0] = x * COS45 - y * SIN45
+        dest[1] = x * SIN45 + y * COS45
         dest[2] = src_point3d[2]
         return dest
 
     @staticmethod
-    def rotate135(src_point3d):
-        dest = [0.0, 0.0, 0.0]
-        dest[0] = src_point3d[0] * -COS45 - src_point3d[1] * SIN45
-        dest[1] = src_point3d[0] * SIN45 + src_point3d[1] * -COS45
+    def rotate135(src_point3d, dest=None):
+        x, y = src_point3d[0], src_point3d[1]
+        if dest is None:
+            dest = [0.0, 0.0, 0.0]
+        dest[0] = x * -COS45 - y * SIN45
+        dest[1] = x * SIN45 + y * -COS45
         dest[2] = src_point3d[2]
         return dest
 
     @staticmethod
-    def rotate225(src_point3d):
-        dest = [0.0, 0.0, 0.0]
-        dest[0] = src_point3d[0] * -COS45 - src_point3d[1] * -SIN45
-        dest[1] = src_point3d[0] * -SIN45 + src_point3d[1] * -COS45
+    def rotate225(src_point3d, dest=None):
+        x, y = src_point3d[0], src_point3d[1]
+        if dest is None:
+            dest = [0.0, 0.0, 0.0]
+        dest[0] = x * -COS45 - y * -SIN45
+        dest[1] = x * -SIN45 + y * -COS45
         dest[2] = src_point3d[2]
         return dest
 
     @staticmethod
-    def rotate315(src_point3d):
-        dest = [0.0, 0.0, 0.0]
-        dest[0] = src_point3d[0] * COS45 - src_point3d[1] * -SIN45
-        dest[1] = src_point3d[0] * -SIN45 + src_point3d[1] * COS45
+    def rotate315(src_point3d, dest=None):
+        x, y = src_point3d[0], src_point3d[1]
+        if dest is None:
+            dest = [0.0, 0.0, 0.0]
+        dest[0] = x * COS45 - y * -SIN45
+        dest[1] = x * -SIN45 + y * COS45
         dest[2] = src_point3d[2]
         return dest
 
     @staticmethod
-    def rotate90(src_point3d):
-        dest = [0.0, 0.0, 0.0]
-        dest[0] = src_point3d[0] * 0 - src_point3d[1] * 1
-        dest[1] = src_point3d[0] * 1 + src_point3d[1] * 0
+    def rotate90(src_point3d, dest=None):
+        x, y = src_point3d[0], src_point3d[1]
+        if dest is None:
+            dest = [0.0, 0.0, 0.0]
+        dest[0] = x * 0 - y * 1
+        dest[1] = x * 1 + y * 0
         dest[2] = src_point3d[2]
         return dest
 
     @staticmethod
-    def rotate270(src_point3d):
-        dest = [0.0, 0.0, 0.0]
-        dest[0] = src_point3d[0] * 0 - src_point3d[1] * -1
-        dest[1] = src_point3d[0] * -1 + src_point3d[1] * 0
+    def rotate270(src_point3d, dest=None):
+        x, y = src_point3d[0], src_point3d[1]
+        if dest is None:
+            dest = [0.0, 0.0, 0.0]
+        dest[0] = x * 0 - y * -1
+        dest[1] = x * -1 + y * 0
         dest[2] = src_point3d[2]
         return dest
 
@@ -121,6 +135,25 @@ def pose2tran(pos, orn, inv_order=False):
     return Tpt
 
 
+def rotation_matrix(orn, out=None):
+    """3x3 rotation part of pose2tran (Rz*Ry*Rx, row-major), each sin/cos evaluated once; 'out' may be a preallocated 9-list"""
+    sr, cr = sin(orn[0]), cos(orn[0])
+    sp, cp = sin(orn[1]), cos(orn[1])
+    sy, cy = sin(orn[2]), cos(orn[2])
+    if out is None:
+        out = [0.0] * 9
+    out[0] = cy * cp
+    out[1] = cy * sp * sr - sy * cr
+    out[2] = cy * sp * cr + sy * sr
+    out[3] = sy * cp
+    out[4] = sy * sp * sr + cy * cr
+    out[5] = sy * sp * cr - cy * sr
+    out[6] = -sp
+    out[7] = cp * sr
+    out[8] = cp * cr
+    return out
+
+
 def inv_tran(Titi):
     """finding the inverse of the homogeneous transformation matrix"""
     Titf = [0.0] * 16  # 4 * 4
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+增量式HTTP请求解析：数据直接读入预分配的bytearray，按Content-Length收完整个body，整个请求有超时限制
+"""
+import json
+from utime import ticks_ms, ticks_diff
+
+STATUS_OK = '200 OK'
+STATUS_BAD_REQUEST = '400 Bad Request'
+STATUS_TIMEOUT = '408 Request Timeout'
+STATUS_TOO_LARGE = '413 Payload Too Large'
+
+try:
+    json.loads(memoryview(b'0'))
+    _JSON_FROM_BUFFER = True  # MicroPython parses any buffer in place
+except TypeError:
+    _JSON_FROM_BUFFER = False  # CPython wants bytes/str
+
+
+def _recv_into(conn, view):
+    if hasattr(conn, 'recv_into'):  # CPython
+        return conn.recv_into(view)
+    return conn.readinto(view)  # MicroPython socket
+
+
+class HttpRequest:
+    """one request at a time: read()/feed() it, then method, path, header(), body and body_json()"""
+
+    def __init__(self, size=2048):
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.reset()
+
+    def reset(self):
+        self.length = 0  # bytes received
+        self.head_end = -1  # end of the header block (index after the blank line), -1 until received
+        self.head_bytes = b''  # copy of the header block (small), the body is never copied
+        self._scanned = 0  # bytes already searched for the blank line
+        self.body_end = -1  # head_end + Content-Length
+        self.method = None
+        self.path = None
+
+    def complete(self):
+        return self.body_end >= 0 and self.length >= self.body_end
+
+    def feed(self, data):
+        """append received bytes -> None while incomplete, else a status (STATUS_OK or an error)"""
+        if self.length + len(data) > len(self.buf):
+            return STATUS_TOO_LARGE
+        self.buf[self.length:self.length + len(data)] = data
+        self.length += len(data)
+        return self._parse()
+
+    def _parse(self):
+        if self.head_end < 0:
+            # only the newly received bytes (+3 for a split separator) are searched
+            scan_from = max(self._scanned - 3, 0)
+            end = bytes(self.view[scan_from:self.length]).find(b'\r\n\r\n')
+            self._scanned = self.length
+            if end < 0:
+                return STATUS_TOO_LARGE if self.length >= len(self.buf) else None
+            self.head_end = scan_from + end + 4
+            self.head_bytes = bytes(self.view[:self.head_end])
+            request_line = self.head_bytes[:self.head_bytes.find(b'\r\n')].split(b' ')
+            if len(request_line) < 3:
+                return STATUS_BAD_REQUEST
+            self.method = request_line[0].decode()
+            self.path = request_line[1].decode()
+            content_length = self.header(b'content-length')
+            try:
+                content_length = int(content_length) if content_length is not None else 0
+            except ValueError:
+                return STATUS_BAD_REQUEST
+            if content_length < 0:
+                return STATUS_BAD_REQUEST
+            self.body_end = self.head_end + content_length
+            if self.body_end > len(self.buf):
+                return STATUS_TOO_LARGE
+        return STATUS_OK if self.complete() else None
+
+    def read(self, conn, timeout_ms=500):
+        """receive one request from a blocking socket; the whole request must arrive within timeout_ms"""
+        self.reset()
+        start = ticks_ms()
+        while True:
+            remaining = timeout_ms - ticks_diff(ticks_ms(), start)
+            if remaining <= 0:
+                return STATUS_TIMEOUT
+            conn.settimeout(remaining / 1000)
+            try:
+                n = _recv_into(conn, self.view[self.length:])
+            except OSError:  # timeout (socket.timeout is an OSError) or reset
+                return STATUS_TIMEOUT
+            if not n:
+                return STATUS_BAD_REQUEST  # closed before the request was complete
+            self.length += n
+            status = self._parse()
+            if status is not None:
+                return status
+
+    async def aread(self, reader):
+        """receive one request from an asyncio stream (wrap in asyncio.wait_for for the timeout)"""
+        self.reset()
+        while True:
+            data = await reader.read(len(self.buf) - self.length)
+            if not data:
+                return STATUS_BAD_REQUEST
+            status = self.feed(data)
+            if status is not None:
+                return status
+
+    def header(self, name):
+        """value of header 'name' (lower case bytes) as bytes, None if missing"""
+        head = self.head_bytes
+        pos = head.lower().find(b'\r\n' + name + b':')
+        if pos < 0:
+            return None
+        start = pos + len(name) + 3
+        return head[start:head.find(b'\r\n', start)].strip()
+
+    def head(self):
+        """request line and headers as str (websocket handshake, routing by the str based handlers)"""
+        return self.head_bytes.decode()
+
+    def body(self):
+        """memoryview of the body inside the receive buffer (valid until the next read)"""
+        return self.view[self.head_end:self.body_end]
+
+    def body_json(self):
+        """json of the body, ValueError if malformed"""
+        body = self.body()
+        return json.loads(body if _JSON_FROM_BUFFER else bytes(body))
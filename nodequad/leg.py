@@ -1,6 +1,8 @@
 from math import sin, cos, pi, atan2, sqrt, acos
 from setting import *
 from geometry import FastTransform
+from metrics import metrics, STAGE_TRANSFORM, STAGE_IK
+from utime import ticks_us
 
 
 class Leg:
@@ -30,14 +32,21 @@ class Leg:
             self._tip_pos_local = (p4_x, p4_y, p4_z)
         self._tip_pos = self.translate2world(self._tip_pos_local)
         self.initial_tip_pos_local = self._tip_pos_local
+        self.joint_angles = Leg.local_ik(self._tip_pos_local)  # last solved joint angles
+        self._packed_tip = [0.0, 0.0, 0.0]  # world target of move_tip_packed, reused every frame
+        self._local_buf = [0.0, 0.0, 0.0]  # translate2local_into output of move_tip*
+        self._world_buf = [0.0, 0.0, 0.0]  # translate2world_into output of move_tip_local
 
     @staticmethod
     def local_ik(local_tip_pose):
-        angles = [0.0] * 3
+        return Leg.local_ik_into(local_tip_pose, [0.0] * 3)
 
+    @staticmethod
+    def local_ik_into(local_tip_pose, angles, offset=0):
+        """local_ik writing the joint angles into angles[offset:offset + 3] (list or array('f')) instead of a new list"""
         x = local_tip_pose[0]
         y = local_tip_pose[1]
-        angles[0] = atan2(x, y) * 180 / pi
+        angles[offset] = atan2(x, y) * 180 / pi
 
         x = sqrt(x ** 2 + y ** 2) - leg_joint1_2joint2
         y = -local_tip_pose[2]  # Note: Z-axis Down
@@ -46,8 +55,8 @@ class Leg:
         lr = sqrt(lr2)
         a1 = acos((lr2 + leg_joint2_2joint3 ** 2 - leg_joint3_2tip ** 2) / (2 * leg_joint2_2joint3 * lr))
         a2 = acos((lr2 - leg_joint2_2joint3 ** 2 + leg_joint3_2tip ** 2) / (2 * leg_joint3_2tip * lr))
-        angles[1] = (ar + a1) * 180 / pi
-        angles[2] = 90 - ((a1 + a2) * 180 / pi)
+        angles[offset + 1] = (ar + a1) * 180 / pi
+        angles[offset + 2] = 90 - ((a1 + a2) * 180 / pi)
 
         return angles
 
@@ -71,37 +80,86 @@ class Leg:
 
     def translate2local(self, world_point):
         """coordinate translation: world to local"""
-        return self._local_conv([world_point[i] - self.mount_position[i] for i in range(3)])
+        return self.translate2local_into(world_point, [0.0, 0.0, 0.0])
+
+    def translate2local_into(self, world_point, out):
+        """translate2local into a caller-owned 3-list"""
+        if metrics.enabled:
+            start = ticks_us()
+        out[0] = world_point[0] - self.mount_position[0]
+        out[1] = world_point[1] - self.mount_position[1]
+        out[2] = world_point[2] - self.mount_position[2]
+        self._local_conv(out, out)
+        if metrics.enabled:
+            metrics.record(STAGE_TRANSFORM, start)
+        return out
 
     def translate2world(self, local_point):
         """coordinate translation: local to world"""
-        return [self._world_conv(local_point)[i] + self.mount_position[i] for i in range(3)]
-
-    def __move(self, target_point_local):
-        """servo/hardware interface"""
-        angles = Leg.local_ik(target_point_local)
-        for joint_index in range(3):
-            self.servo.set_angle(self.leg_index, joint_index, angles[joint_index])
-
-    def move_tip(self, target_point_world):
+        return self.translate2world_into(local_point, [0.0, 0.0, 0.0])
+
+    def translate2world_into(self, local_point, out):
+        """translate2world into a caller-owned 3-list (out must not be local_point)"""
+        self._world_conv(local_point, out)
+        out[0] += self.mount_position[0]
+        out[1] += self.mount_position[1]
+        out[2] += self.mount_position[2]
+        return out
+
+    def __move(self, target_point_local, sync=True):
+        """servo/hardware interface. sync=False only solves joint_angles, the caller writes all legs at once (Servo.set_angles)"""
+        if metrics.enabled:
+            start = ticks_us()
+            Leg.local_ik_into(target_point_local, self.joint_angles)
+            metrics.record(STAGE_IK, start)
+        else:
+            Leg.local_ik_into(target_point_local, self.joint_angles)  # updated in place, see NodeQuad._frame_angles
+        if sync:
+            for joint_index in range(3):
+                self.servo.set_angle(self.leg_index, joint_index, self.joint_angles[joint_index])
+
+    def move_tip(self, target_point_world, sync=True):
         """word coordiante system (default)"""
         if target_point_world == self._tip_pos:
             return
-        dest_local = self.translate2local(target_point_world)
+        dest_local = self.translate2local_into(target_point_world, self._local_buf)
         # logging info
-        self.__move(dest_local)
+        self.__move(dest_local, sync)
         self._tip_pos = target_point_world
         self._tip_pos_local = dest_local
 
-    def move_tip_local(self, target_point_local):
+    def move_tip_packed(self, path_data, offset, sync=True):
+        """world coordinate target read in place from a flat array('f') path (gait.PackedPath.data)"""
+        tip = self._packed_tip
+        if self._tip_pos is tip and tip[0] == path_data[offset] and tip[1] == path_data[offset + 1] \
+                and tip[2] == path_data[offset + 2]:
+            return
+        tip[0] = path_data[offset]
+        tip[1] = path_data[offset + 1]
+        tip[2] = path_data[offset + 2]
+        dest_local = self.translate2local_into(tip, self._local_buf)
+        self.__move(dest_local, sync)
+        self._tip_pos = tip
+        self._tip_pos_local = dest_local
+
+    def move_tip_local(self, target_point_local, sync=True):
         """api: leg moving"""
         if target_point_local == self._tip_pos_local:
             return
-        dest_world = self.translate2world(target_point_local)
-        self.__move(target_point_local)
+        dest_world = self.translate2world_into(target_point_local, self._world_buf)
+        self.__move(target_point_local, sync)
         self._tip_pos = dest_world
         self._tip_pos_local = target_point_local
 
+    def tip_position(self):
+        """world-frame tip position of the last move (None after forget_tip)"""
+        return self._tip_pos
+
+    def forget_tip(self):
+        """servo driven without this instance (duty tables), the cached tip position is no longer valid"""
+        self._tip_pos = None
+        self._tip_pos_local = None
+
     def move_joints_directly(self, target_joint_angles):
         """直接驱动腿部关节角，不会改变腿实例的运动学变量/属性，在舵机校正阶段使用"""
         for joint_index in range(3):
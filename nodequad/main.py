@@ -38,6 +38,13 @@ if __name__ == '__main__':
     adc.atten(ADC.ATTN_11DB)  # range of 3.3v
     adc.width(ADC.WIDTH_12BIT)  # 12bit accuracy
     led = Pin(pin_red, Pin.OUT)
+
+    if async_runtime:
+        # web server, gait frames and battery monitor as tasks of one asyncio scheduler
+        from async_runtime import AsyncRuntime
+        print("************Welcome to NodeQuad!************")
+        AsyncRuntime(quadruped, wlan_ip).run(adc, led, low_voltage)
+
     timer = Timer(1)
     timer.init(period=1000, mode=Timer.PERIODIC, callback=lambda t: battery_monitor_loop(adc, led, low_voltage))
     
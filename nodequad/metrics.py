@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+可选的耗时统计：每个阶段累计次数/总耗时/最大耗时(ticks_us)，并在预分配的环形缓冲区中保留最近的样本用于分位数
+关闭时(默认)各埋点只做一次 metrics.enabled 判断；开启后记录过程不分配内存（报告时才排序）
+"""
+import json
+from array import array
+from utime import ticks_us, ticks_diff
+from setting import metrics_enabled, metrics_ring_size
+
+STAGE_FRAME = 0  # NodeQuad.tick, everything below included
+STAGE_WAIT = 1  # FrameScheduler.wait in NodeQuad.main_loop
+STAGE_GAIT = 2  # gait path switch / duty table lookup
+STAGE_POSE = 3  # map_rc_pose + pose filter + pose_transform
+STAGE_TRANSFORM = 4  # Leg.translate2local*
+STAGE_IK = 5  # Leg.local_ik_into via Leg.move_tip*
+STAGE_SERVO = 6  # Servo angle -> duty (km_angle2pulse)
+STAGE_I2C = 7  # PCA9685 register writes
+STAGE_NAMES = ('frame', 'wait', 'gait', 'pose', 'transform', 'ik', 'servo', 'i2c')
+
+
+class Metrics:
+    """per-stage timing accumulators, stage ids are the STAGE_* constants"""
+
+    def __init__(self, ring_size=64, enabled=False):
+        self.enabled = enabled
+        self.ring_size = ring_size
+        num = len(STAGE_NAMES)
+        self.count = [0] * num
+        self.total_us = [0] * num
+        self.max_us = [0] * num
+        self.ring = [array('l', [0] * ring_size) for i in range(num)]  # last ring_size samples of each stage
+        self.ring_pos = [0] * num  # next slot of each ring
+        self.ring_len = [0] * num  # valid samples in each ring
+
+    def reset(self):
+        for stage in range(len(STAGE_NAMES)):
+            self.count[stage] = 0
+            self.total_us[stage] = 0
+            self.max_us[stage] = 0
+            self.ring_pos[stage] = 0
+            self.ring_len[stage] = 0
+
+    def record(self, stage, start):
+        """close a sample opened with start = ticks_us()"""
+        elapsed = ticks_diff(ticks_us(), start)
+        self.count[stage] += 1
+        self.total_us[stage] += elapsed
+        if elapsed > self.max_us[stage]:
+            self.max_us[stage] = elapsed
+        pos = self.ring_pos[stage]
+        self.ring[stage][pos] = elapsed
+        self.ring_pos[stage] = pos + 1 if pos + 1 < self.ring_size else 0
+        if self.ring_len[stage] < self.ring_size:
+            self.ring_len[stage] += 1
+
+    def stats(self):
+        result = {'enabled': self.enabled}
+        for stage in range(len(STAGE_NAMES)):
+            count = self.count[stage]
+            samples = sorted(self.ring[stage][:self.ring_len[stage]])
+            result[STAGE_NAMES[stage]] = {
+                'count': count,
+                'total_us': self.total_us[stage],
+                'mean_us': self.total_us[stage] // count if count else 0,
+                'max_us': self.max_us[stage],
+                'p50_us': samples[len(samples) // 2] if samples else 0,
+                'p99_us': samples[(len(samples) * 99) // 100] if samples else 0}
+        return result
+
+    def json(self):
+        return json.dumps(self.stats())
+
+    def text(self):
+        stats = self.stats()
+        lines = ['enabled {0}'.format(int(self.enabled)),
+                 '{0:10s} {1:>8s} {2:>10s} {3:>8s} {4:>8s} {5:>8s} {6:>8s}'.format(
+                     'stage', 'count', 'total_us', 'mean_us', 'p50_us', 'p99_us', 'max_us')]
+        for name in STAGE_NAMES:
+            s = stats[name]
+            lines.append('{0:10s} {1:8d} {2:10d} {3:8d} {4:8d} {5:8d} {6:8d}'.format(
+                name, s['count'], s['total_us'], s['mean_us'], s['p50_us'], s['p99_us'], s['max_us']))
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics(metrics_ring_size, metrics_enabled)
@@ -1,6 +1,6 @@
 import json
 from leg import Leg
-from gait import Gait
+from gait import Gait, sample_path
 from Servo import Servo
 from utime import sleep_ms
 from geometry import *
@@ -8,7 +8,19 @@ from gait import MODE_MOVE, MODE_POSE
 from gait import GAIT_TROT
 from gait import MOVE_STANDBY
 from controller import WebController
-from setting import calibration_path
+from scheduler import FrameScheduler
+from duty_table import DutyTables
+from transition import GaitTransition, match_phase
+from pose_filter import PoseFilter
+from phase_gait import PhaseGait
+from gait_loader import load_gaits
+from path_store import store_checksum, read_store, write_store
+from metrics import metrics, STAGE_FRAME, STAGE_WAIT, STAGE_GAIT, STAGE_POSE
+from utime import ticks_us
+from setting import calibration_path, gaits_path, gaits_cache_path, path_store_path, gait_cache_entries, gait_cache_frames, gait_cache_warm_up, gait_path_packed
+from setting import gait_transition_frames
+from setting import pose_smoothing, pose_smoothing_hz, pose_max_linear_speed, pose_max_angular_speed
+from setting import gait_continuous, gait_accel, gait_yaw_accel, gait_scale_rate
 from math import pi
 
 
@@ -29,20 +41,51 @@ class NodeQuad:
         self.servo = Servo(i2c, address, pulse_min, pulse_max, pulse_freq)
         # kinematics
         self.legs = [Leg(self.servo, i) for i in range(4)]
+        self._frame_angles = [leg.joint_angles for leg in self.legs]  # the legs solve into these lists in place
         # gait
-        self.gait = Gait()
+        self.gait = Gait(gait_cache_entries, gait_cache_frames, gait_path_packed)
         self.gait_mode = GAIT_TROT  # 0-Trot 1-Walk 2-Pace 3-Creep
-        self.gait_path = self.gait.gen_path(self.gait_mode, self.moving_status)
+        self.gait_speed = 0
+        self.gait_path = self.gait.get_path(self.gait_mode, self.moving_status, self.gait_speed)
+        self.gait_path_key = (self.gait_mode, self.moving_status, self.gait_speed)  # what gait_path was generated with
+        # precompiled per-frame servo duties of the gait paths
+        self.duty_tables = DutyTables(self.servo, self.legs, gait_cache_entries, gait_cache_frames)
+        self.use_duty_tables = True
+        self._legs_stale = True  # legs' cached tip positions not backed by the servos (not driven yet / duty table playback)
+        # continuous velocity gait (phase clock), used instead of the paths when use_phase_gait
+        self.phase_gait = PhaseGait(self.gait.amplitudeX, self.gait.amplitudeZ, gait_accel, gait_yaw_accel, self.gait_mode)
+        self.use_phase_gait = gait_continuous
         self.path_step_beginid = 0
         self.path_step_id = 0
+        # runtime cadence/stride: the path is resampled at a fractional position instead of being regenerated
+        self.gait_cadence = 1.0  # path frames per tick (cycle frequency factor)
+        self.gait_stride = 1.0  # step offsets from home scaled by this
+        self.path_step_frac = 0.0  # position between path_step_id and the next frame
+        self._sample_tips = [[[0.0, 0.0, 0.0] for i in range(4)] for j in range(2)]  # alternate (Leg.move_tip keeps its target)
+        self._sample_flip = 0
+        # blending into a new gait/direction/mode from the current tip positions
+        self.transition = GaitTransition(gait_transition_frames)
+        self._pose_rotation = [0.0] * 9  # rotation_matrix buffer of pose_transform
+        self.pose_change_detection = True  # POSE mode: only rerun the pose pipeline when rc_pose changed
+        self._pose_version = None  # rc_pose_version the legs currently hold (None: recompute on the next frame)
+        # smooth 50 Hz body motion from the remote's sparse pose samples
+        self.pose_filter = PoseFilter(pose_smoothing_hz, pose_max_linear_speed, pose_max_angular_speed)
+        self.use_pose_filter = pose_smoothing
+        # fixed-rate frame timing (deadline based)
+        self.scheduler = FrameScheduler(self.gait.frame_time_ms)
         # web controller
         self.web_controller = WebController(sta_ip)
-
-        # other setting
-        self.faster = False  # 通过减少采样点来提高移动速度（预留）
+        self.command = self.web_controller.command  # remote command snapshot this frame works on
+        self.command_seq = self.command.seq
     
-    def init(self):
+    def init(self, warm_up=gait_cache_warm_up):
         self.load_calibration(calibration_path)
+        self.load_gaits(gaits_path, gaits_cache_path)
+        if path_store_path:
+            self.load_path_store(path_store_path)
+        elif warm_up:
+            # every direction of the current gait (as far as gait_cache_frames allows): direction switches find them
+            self.gait.warm_up((self.gait_mode,), gait_speed=self.gait_speed)
         print("NodeQuad init done.")
         
     def load_calibration(self, json_path):
@@ -52,6 +95,39 @@ class NodeQuad:
             self.servo.set_offset(calibration_data)
         print("Load calibration data: {0}\n".format(calibration_data))
         
+    def load_gaits(self, json_path, cache_path):
+        try:
+            loaded, source = load_gaits(json_path, cache_path, self.gait.amplitudeX, self.gait.amplitudeZ)
+        except (ValueError, KeyError, TypeError) as e:
+            # a broken gaits.json must not keep the robot from booting
+            print("Gaits not loaded, built-in gaits kept: {0}\n".format(e))
+            return
+        if loaded:
+            # gait modes may have new specs now: drop everything built from the old ones
+            self.gait.clear_cache()
+            self.duty_tables.clear()
+            self.gait_path = self.gait.get_path(self.gait_mode, self.moving_status, self.gait_speed)
+            self.phase_gait.set_gait(self.gait_mode)
+        print("Load gaits ({0}): {1}\n".format(source, [name for gait_mode, name in loaded]))
+
+    def load_path_store(self, store_path):
+        """paths and duty tables of the current gait from flash, generated and written back if missing or stale"""
+        checksum = store_checksum(self.gait, self.servo)
+        count = read_store(store_path, checksum, self.gait, self.duty_tables)
+        source = 'flash'
+        if count is None:
+            source = 'generated'
+            # every direction of the current gait (as far as gait_cache_frames allows), stored with their duty tables
+            self.gait.warm_up((self.gait_mode,), gait_speed=self.gait_speed)
+            try:
+                count = write_store(store_path, checksum, self.gait, self.duty_tables)
+            except OSError as e:
+                count = len(self.gait.cached_paths())
+                print("Gait path store not written: {0}".format(e))
+        self.gait_path = self.gait.get_path(self.gait_mode, self.moving_status, self.gait_speed)
+        print("Load gait paths ({0}): {1} paths, {2} of {3} duty bytes\n".format(
+            source, count, self.duty_tables.memory_bytes(), self.duty_tables.budget_bytes()))
+
     def save_calibration(self, json_path):
         with open(json_path, 'w') as f:
             json_dict = {'calibration': self.servo.offset}
@@ -59,34 +135,137 @@ class NodeQuad:
         print("Save calibration data: {0}\n".format(self.servo.offset))
 
     def update_iscalibration(self):
-        if self.calibration != self.web_controller.rc_calibration:
-            self.calibration = self.web_controller.rc_calibration
+        if self.calibration != self.command.calibration:
+            self.calibration = self.command.calibration
+
+    def current_tips_world(self):
+        """where the tips are now (world frame): transition output, IK-tracked leg state, or the last played path frame"""
+        if self.transition.active():
+            return self.transition.current
+        if not self._legs_stale and all([leg.tip_position() is not None for leg in self.legs]):
+            return [leg.tip_position() for leg in self.legs]
+        return self.gait_path[(self.path_step_id - 1) % len(self.gait_path)]
+
+    def switch_path(self):
+        """Load the path of the current gait/direction, keep the cycle phase and blend into it from the current tips."""
+        if metrics.enabled:
+            start = ticks_us()
+        start_tips = self.current_tips_world()
+        old_len = len(self.gait_path)
+        self.gait_path = self.gait.get_path(self.gait_mode, self.moving_status, self.gait_speed)
+        self.gait_path_key = (self.gait_mode, self.moving_status, self.gait_speed)
+        self.path_step_id = match_phase(self.path_step_id, old_len, len(self.gait_path))
+        self.transition.begin(start_tips)
+        if metrics.enabled:
+            metrics.record(STAGE_GAIT, start)
 
     def update_gait_mode(self):
-        if self.web_controller.rc_gait_mode != self.gait_mode:
-            self.gait_mode = self.web_controller.rc_gait_mode
-            self.path_step_id = 0  # in potential!
+        if self.command.gait_mode != self.gait_mode:
+            self.gait_mode = self.command.gait_mode
+            if self.use_phase_gait:
+                self.transition.begin(self.current_tips_world())  # new leg phase offsets: blend into them
+                self.phase_gait.set_gait(self.gait_mode)
+            else:
+                self.switch_path()
         else:
             pass  # 避免每次都重新计算轨迹以节约计算资源
 
     def update_moving_status(self):
-        if self.web_controller.rc_moving_status != self.moving_status:  #  and self.path_step_id == self.path_step_beginid:
-            self.moving_status = self.web_controller.rc_moving_status
-            self.gait_path = self.gait.gen_path(self.gait_mode, self.moving_status)
-            self.path_step_id = 0  # in potential!
+        if self.command.moving_status != self.moving_status:  #  and self.path_step_id == self.path_step_beginid:
+            self.moving_status = self.command.moving_status
+            if not self.use_phase_gait:  # the phase gait follows command.velocity instead
+                self.switch_path()
+
+    def update_gait_scale(self):
+        """move the cadence/stride factors toward command.speed/stride (percent) at gait_scale_rate per second"""
+        step = gait_scale_rate * self.scheduler.period_us / 1000000
+        scales = [self.gait_cadence, self.gait_stride]
+        for i, target in enumerate((self.command.speed / 100, self.command.stride / 100)):
+            if abs(target - scales[i]) <= step:
+                scales[i] = target
+            else:
+                scales[i] += step if target > scales[i] else -step
+        if scales[0] != self.gait_cadence or scales[1] != self.gait_stride:
+            self.gait_cadence, self.gait_stride = scales
+            self.phase_gait.set_scale(self.gait_cadence, self.gait_stride)
+
+    def path_tips(self):
+        """world-frame tips at the current path position, resampled unless on a frame at the nominal stride"""
+        if self.path_step_frac == 0.0 and self.gait_stride == 1.0:
+            return self.gait_path[self.path_step_id]
+        self._sample_flip ^= 1
+        return sample_path(self.gait_path, self.path_step_id, self.path_step_frac, self.gait_stride,
+                           self._sample_tips[self._sample_flip])
+
+    def advance_path(self):
+        """next path position: gait_cadence frames on; at the nominal cadence and stride whole frames only"""
+        position = self.path_step_id + self.path_step_frac + self.gait_cadence
+        step_id = int(position)
+        nominal = self.gait_cadence == 1.0 and self.gait_stride == 1.0
+        self.path_step_frac = 0.0 if nominal else position - step_id  # back on whole frames (duty tables)
+        self.path_step_id = step_id % len(self.gait_path)
 
     def update_mode(self):
-        if self.mode != self.web_controller.rc_mode:
-            self.mode = self.web_controller.rc_mode
+        if self.mode != self.command.mode:
+            start_tips = self.current_tips_world()
+            self.mode = self.command.mode
             self.path_step_id = 0
+            self.path_step_frac = 0.0
+            self._pose_version = None
+            self.pose_filter.reset()  # the body starts from the neutral pose
+            self.phase_gait.reset()
+            if self.mode == MODE_MOVE:
+                self.transition.begin(start_tips)  # from the body pose back onto the gait path
             
+    def map_rc_velocity(self):
+        """command.velocity (percent of the full stride) -> PhaseGait velocity command"""
+        velocity = self.command.velocity
+        speed = self.phase_gait.max_speed() / 100
+        self.phase_gait.set_velocity(velocity[0] * speed, velocity[1] * speed,
+                                     velocity[2] * self.phase_gait.max_yaw_rate() / 100)
+
+    def step_phase_gait(self):
+        """MOVE frame of the phase clock gait: tips computed for the current phase, no path"""
+        if metrics.enabled:
+            start = ticks_us()
+        self.map_rc_velocity()
+        self.phase_gait.advance(self.scheduler.period_us / 1000000)
+        tips = self.phase_gait.tips()
+        if metrics.enabled:
+            metrics.record(STAGE_GAIT, start)
+        if self.transition.active():
+            tips = self.transition.blend(tips)
+        self.move_legs_tips(tips, local=False)
+
     def map_rc_pose(self):
-        trans = self.web_controller.rc_pose[:3]
-        orns = [orn * 15 / 100 * pi/180 for orn in self.web_controller.rc_pose[3:]]
+        trans = self.command.pose[:3]
+        orns = [orn * 15 / 100 * pi/180 for orn in self.command.pose[3:]]
         return trans, orns
 
     def pose_transform(self, pos_tuple, orn_tuple):
         """
+        body pose -> local tip positions, same result as pose_transform_matrix with the matrices fused:
+        tip_local = Rz(leg) * (R^T * (tip - pos) - mount), R = rotation_matrix(orn) (one set of sin/cos per call)
+        :param pos_tuple: (x, y, z)  orn_tuple: (roll, pitch, yaw)
+        :return: 4 new [x, y, z] lists (Leg.move_tip_local keeps a reference to its target)
+        """
+        r = rotation_matrix(orn_tuple, self._pose_rotation)
+        target_pos_local = []
+        for leg in self.legs:
+            tip = leg.initial_tip_pos_local
+            dx = tip[0] - pos_tuple[0]
+            dy = tip[1] - pos_tuple[1]
+            dz = tip[2] - pos_tuple[2]
+            # undo the body orientation (R^T), then coxa offset and mount rotation
+            body2tip = [r[0] * dx + r[3] * dy + r[6] * dz,
+                        r[1] * dx + r[4] * dy + r[7] * dz,
+                        r[2] * dx + r[5] * dy + r[8] * dz]
+            target_pos_local.append(leg.translate2local_into(body2tip, body2tip))
+        return target_pos_local
+
+    def pose_transform_matrix(self, pos_tuple, orn_tuple):
+        """
+        homogeneous-matrix formulation of pose_transform (reference, see tools/bench_pose_transform.py)
         :param pos_tuple: (x, y, z)  orn_tuple: (roll, pitch, yaw)
         :return:
         """
@@ -142,68 +321,119 @@ class NodeQuad:
 
     def move_legs_tips(self, target_pos, local=True):
         # print(target_pos)
+        if self._legs_stale:
+            for leg in self.legs:
+                leg.forget_tip()
+            self._legs_stale = False
         for leg_index in range(4):
             if local:
-                self.legs[leg_index].move_tip_local(target_pos[leg_index])
+                self.legs[leg_index].move_tip_local(target_pos[leg_index], sync=False)
             else:
-                self.legs[leg_index].move_tip(target_pos[leg_index])
+                self.legs[leg_index].move_tip(target_pos[leg_index], sync=False)
+        # all 12 joints in one i2c burst
+        self.servo.set_angles(self._frame_angles)
+
+    def move_legs_tips_packed(self, path, frame_id):
+        """world-frame targets of one frame of a PackedPath, read without building point lists"""
+        if self._legs_stale:
+            for leg in self.legs:
+                leg.forget_tip()
+            self._legs_stale = False
+        for leg_index in range(4):
+            self.legs[leg_index].move_tip_packed(path.data, path.offset(frame_id, leg_index), sync=False)
+        self.servo.set_angles(self._frame_angles)
 
     def move_legs_joints(self, target_joint_angles):
-        for leg_index in range(4):
-            self.legs[leg_index].move_joints_directly(target_joint_angles[leg_index])
+        self.servo.set_angles(target_joint_angles)
+
+    def tick(self):
+        """一帧控制：处理遥控量并驱动舵机（帧间隔由self.scheduler控制）"""
+        if metrics.enabled:
+            start = ticks_us()
+            self._tick()
+            metrics.record(STAGE_FRAME, start)
+        else:
+            self._tick()
+
+    def _tick(self):
+        # for debug
+        # print("is calibrating: ", self.calibration)
+        # print("mode: ", self.mode, "gait mode: ", self.gait_mode, "moving status: ",self.moving_status , "path id: ", self.path_step_id)
+        # one atomic read per frame: every update_* below sees the same remote command
+        self.command = self.web_controller.command
+        self.command_seq = self.command.seq
+        was_calibrating = self.calibration
+        self.update_iscalibration()
+
+        if self.calibration == 1:  # calibration mode
+            # print("in nodequad main loop calibrating: ", self.calibration)
+            self.servo.set_offset(self.command.calibration_data)
+            self.move_legs_joints(self.command.calibration_data)  # direct joint
+            return
+        elif was_calibrating == 1:
+            self.save_calibration(calibration_path)
+            self._pose_version = None  # joints were driven directly
+            self.calibration = 0  # 从calibration模式切换至normal模式不是也不应采取RC遥控的方式：校正结束自动切换
+
+        # normal mode
+        self.update_mode()
+        if self.mode == MODE_MOVE:  # MOVE
+            self.update_gait_mode()
+            self.update_moving_status()
+            self.update_gait_scale()
+
+            if self.use_phase_gait:
+                self.step_phase_gait()
+                return
+            if self.transition.active():
+                self.move_legs_tips(self.transition.blend(self.path_tips()), local=False)
+            elif self.path_step_frac != 0.0 or self.gait_stride != 1.0:
+                self.move_legs_tips(self.path_tips(), local=False)  # resampled: per-frame IK
+            elif self.use_duty_tables:
+                # compiled on first use of this path, then just index and write
+                if metrics.enabled:
+                    start = ticks_us()
+                table = self.duty_tables.get(self.gait_path_key, self.gait_path)
+                if metrics.enabled:
+                    metrics.record(STAGE_GAIT, start)
+                self.servo.set_duties(table, self.path_step_id)
+                self._legs_stale = True
+            elif self.gait.packed:
+                self.move_legs_tips_packed(self.gait_path, self.path_step_id)
+            else:
+                target_pos_world = self.gait_path[self.path_step_id]
+                #print(target_pos_world)
+                self.move_legs_tips(target_pos_world, local=False)
+            self.advance_path()
+        elif self.mode == MODE_POSE:  # POSE
+            # Body姿态 -> 目标足尖坐标
+            if self.pose_change_detection:
+                if self._pose_version == self.command.pose_version and \
+                        (not self.use_pose_filter or self.pose_filter.settled()):
+                    return  # same pose as the last frame, the servos already hold it
+                self._pose_version = self.command.pose_version
+            if metrics.enabled:
+                start = ticks_us()
+            x_y_z, roll_pitch_yaw = self.map_rc_pose()   # Joystick Mapping and process
+            if self.use_pose_filter:
+                x_y_z, roll_pitch_yaw = self.pose_filter.update(x_y_z, roll_pitch_yaw, self.scheduler.period_us / 1000000)
+            # print(x_y_z, roll_pitch_yaw)
+            target_pos_local = self.pose_transform(x_y_z, roll_pitch_yaw)  # Transform
+            if metrics.enabled:
+                metrics.record(STAGE_POSE, start)
+            # print(target_pos_local)
+            self.move_legs_tips(target_pos_local, local=True)  # IK -> joint
+        else:
+            raise ValueError("Unexpected Mode")
 
     def main_loop(self):
         """主线程：所有对遥控量的再处理都放在这里"""
+        self.scheduler.start()
         while True:
-            # for debug
-            # print("is calibrating: ", self.calibration)
-            # print("mode: ", self.mode, "gait mode: ", self.gait_mode, "moving status: ",self.moving_status , "path id: ", self.path_step_id)
-            self.update_iscalibration()
-
-            if self.calibration == 0:  # normal mode
-                self.update_mode()
-                if self.mode == MODE_MOVE:  # MOVE
-                    self.update_gait_mode()
-                    self.update_moving_status()
-
-                    target_pos_world = self.gait_path[self.path_step_id]
-                    #print(target_pos_world)
-                    self.path_step_id = self.path_step_id + 1 if self.path_step_id < len(self.gait_path) - 1 else 0
-                    self.move_legs_tips(target_pos_world, local=False)
-                    sleep_ms(15)  # 舵机响应时间
-                elif self.mode == MODE_POSE:  # POSE
-                    # Body姿态 -> 目标足尖坐标
-                    x_y_z, roll_pitch_yaw = self.map_rc_pose()   # Joystick Mapping and process
-                    # print(x_y_z, roll_pitch_yaw)
-                    target_pos_local = self.pose_transform(x_y_z, roll_pitch_yaw)  # Transform
-                    # print(target_pos_local)
-                    self.move_legs_tips(target_pos_local, local=True)  # IK -> joint
-                else:
-                    raise ValueError("Unexpected Mode")
-
-            elif self.calibration == 1:  # calibration mode
-                while self.calibration:
-                    self.update_iscalibration()
-                    # print("in nodequad main loop calibrating: ", self.calibration)
-                    self.servo.set_offset(self.web_controller.calibration_data)
-                    self.move_legs_joints(self.web_controller.calibration_data)  # direct joint
-                    sleep_ms(50)
-                self.save_calibration(calibration_path)
-                self.calibration = 0  # 从calibration模式切换至normal模式不是也不应采取RC遥控的方式：校正结束自动切换
+            self.tick()
+            if metrics.enabled:
+                start = ticks_us()
+                self.scheduler.wait()
+                metrics.record(STAGE_WAIT, start)
             else:
-                pass
-
-            
-
-
-
-
-
-
-
-
-
-
-
-
-
+                self.scheduler.wait()  # 按绝对截止时间等待下一帧，吸收IK与I2C耗时的波动
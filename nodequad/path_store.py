@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+步态轨迹与舵机duty表的flash缓存(paths.bin)：启动时直接读入已生成的轨迹和已编译的duty表（array原样读写）
+文件带有几何参数、舵机参数、校正值和步态定义的校验值，任何一项改变时才重新生成并写回
+"""
+import ustruct
+from array import array
+from binascii import crc32
+from gait import GAIT_SPECS, GAIT_NAMES, PackedPath
+from gait_loader import pack_spec
+from utils import replace_file
+from setting import leg_mount_x, leg_mount_y, leg_joint1_2joint2, leg_joint2_2joint3, leg_joint3_2tip
+from setting import standby_z, other_x, other_y
+
+STORE_MAGIC = b'NQP1'
+STORE_HEADER = '<4sIH'  # magic, checksum (store_checksum), number of paths
+# gait_mode, move_status, gait_speed, frames; then frames x 12 float32 tips and frames x 12 uint16 duties, both in
+# the board's native byte order (only the board that wrote the file reads it back, the checksum is per robot anyway)
+STORE_RECORD = '<BBBH'
+
+
+def store_checksum(gait, servo):
+    """crc32 of everything the stored paths and duties are computed from"""
+    checksum = crc32(ustruct.pack('<8f', leg_mount_x, leg_mount_y, leg_joint1_2joint2, leg_joint2_2joint3,
+                                  leg_joint3_2tip, standby_z, other_x, other_y))
+    checksum = crc32(ustruct.pack('<4f', servo.pulse_min, servo.pulse_max, servo.period, servo.degrees), checksum)
+    checksum = crc32(ustruct.pack('<12f', *[offset for leg_offset in servo.offset for offset in leg_offset]), checksum)
+    checksum = crc32(ustruct.pack('<4f', gait.amplitudeX, gait.amplitudeY, gait.amplitudeZ, gait.frame_time_ms),
+                     checksum)
+    for gait_mode in sorted(GAIT_SPECS):
+        checksum = crc32(pack_spec(GAIT_NAMES[gait_mode], GAIT_SPECS[gait_mode]), checksum)
+    return checksum & 0xffffffff
+
+
+def write_store(store_path, checksum, gait, duty_tables):
+    """the gait's cached paths and their duty tables (compiled here if missing) -> store_path, number of paths"""
+    paths = gait.cached_paths()
+    tmp_path = store_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(ustruct.pack(STORE_HEADER, STORE_MAGIC, checksum, len(paths)))
+        for gait_mode, move_status, gait_speed, path in paths:
+            packed = path if isinstance(path, PackedPath) else PackedPath(path)
+            f.write(ustruct.pack(STORE_RECORD, gait_mode, move_status, gait_speed, len(packed)))
+            f.write(packed.data)
+            f.write(duty_tables.get((gait_mode, move_status, gait_speed), path))
+    replace_file(tmp_path, store_path)  # a power loss while writing leaves the old file (or none), never part of one
+    return len(paths)
+
+
+def read_store(store_path, checksum, gait, duty_tables):
+    """stored paths and duty tables -> gait's path cache and duty_tables, number of paths (None: missing or stale)"""
+    try:
+        with open(store_path, 'rb') as f:
+            records = _read_records(f, checksum)
+    except Exception:  # missing, or corrupt beyond the checks in _read_records
+        return None
+    if records is None:
+        return None
+    # only a completely read file reaches the caches
+    for gait_mode, move_status, gait_speed, tips, duties in records:
+        gait.put_path(gait_mode, move_status, gait_speed, tips)
+        duty_tables.put((gait_mode, move_status, gait_speed), duties)
+    return len(records)
+
+
+def _read_records(f, checksum):
+    """[(gait_mode, move_status, gait_speed, tips, duties)], None if the file is stale or cut off"""
+    header = f.read(ustruct.calcsize(STORE_HEADER))
+    if len(header) != ustruct.calcsize(STORE_HEADER):
+        return None
+    magic, stored_checksum, count = ustruct.unpack(STORE_HEADER, header)
+    if magic != STORE_MAGIC or stored_checksum != checksum:
+        return None
+    record_size = ustruct.calcsize(STORE_RECORD)
+    records = []
+    for i in range(count):
+        record = f.read(record_size)
+        if len(record) != record_size:
+            return None
+        gait_mode, move_status, gait_speed, frames = ustruct.unpack(STORE_RECORD, record)
+        tips = f.read(48 * frames)
+        duties = f.read(24 * frames)
+        if len(tips) != 48 * frames or len(duties) != 24 * frames:
+            return None
+        records.append((gait_mode, move_status, gait_speed, array('f', tips), array('H', duties)))
+    if f.read(1):
+        return None  # trailing bytes: not what write_store wrote
+    return records
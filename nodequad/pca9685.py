@@ -1,15 +1,33 @@
 # -*- coding: utf-8 -*-
 
 import ustruct
-import time
+from utime import sleep_us, ticks_us
+from metrics import metrics, STAGE_I2C
+
+LED0_ON_L = 0x06  # first channel register, 4 bytes (ON_L, ON_H, OFF_L, OFF_H) per channel
+NUM_CHANNELS = 16
 
 
 class PCA9685:
     def __init__(self, i2c, address=0x40):
         self.i2c = i2c
         self.address = address
+        self._burst = bytearray(4 * NUM_CHANNELS)  # preallocated buffer for set_all_pwm
+        self._burst_view = memoryview(self._burst)
+        self._dirty = bytearray(NUM_CHANNELS)
+        self._last = [-1] * NUM_CHANNELS  # last duty written per channel, -1 = unknown
+        self.merge_gap = 0  # set_all_pwm: clean channels allowed inside one burst to join two dirty runs
+        self.writes_skipped = 0  # channel writes avoided because the duty did not change
         self.reset()
 
+    def invalidate(self, index=None):
+        """Forget the cached duty (of one channel or all), forcing the next write."""
+        if index is None:
+            for i in range(NUM_CHANNELS):
+                self._last[i] = -1
+        else:
+            self._last[index] = -1
+
     def _write(self, address, value):
         self.i2c.writeto_mem(self.address, address, bytearray([value]))
 
@@ -17,6 +35,7 @@ class PCA9685:
         return self.i2c.readfrom_mem(self.address, address, 1)[0]
 
     def reset(self):
+        self.invalidate()  # the chip's registers no longer match what was written
         self._write(0x00, 0x00)  # Mode1
 
     def freq(self, freq=None):
@@ -27,7 +46,7 @@ class PCA9685:
         self._write(0x00, (old_mode & 0x7F) | 0x10)  # Mode 1, sleep
         self._write(0xfe, prescale)  # Prescale
         self._write(0x00, old_mode)  # Mode 1
-        time.sleep_us(5)
+        sleep_us(5)
         self._write(0x00, old_mode | 0xa1)  # Mode 1, autoincrement on
 
     def pwm(self, index, on=None, off=None):
@@ -35,7 +54,63 @@ class PCA9685:
             data = self.i2c.readfrom_mem(self.address, 0x06 + 4 * index, 4)
             return ustruct.unpack('<HH', data)
         data = ustruct.pack('<HH', on, off)
-        self.i2c.writeto_mem(self.address, 0x06 + 4 * index, data)
+        self._last[index] = -1  # raw on/off, not a cached duty (also if the write below fails)
+        if metrics.enabled:
+            start = ticks_us()
+            self.i2c.writeto_mem(self.address, 0x06 + 4 * index, data)
+            metrics.record(STAGE_I2C, start)
+        else:
+            self.i2c.writeto_mem(self.address, 0x06 + 4 * index, data)
+
+    def set_all_pwm(self, values, start=0):
+        """
+        Write the duty (OFF count, ON at 0) of consecutive channels from 'start' using auto-increment
+        bursts (see freq(): Mode 1 |= 0x20). Only channels whose duty changed are sent: each contiguous
+        run of dirty channels (joined across up to merge_gap clean ones) is one i2c transaction.
+        The cached duties of a run are updated once its transaction succeeded.
+        """
+        buf, dirty, last = self._burst, self._dirty, self._last
+        num = len(values)
+        for i in range(num):
+            if not 0 <= values[i] <= 4095:
+                raise ValueError("Out of range")  # before anything is written or cached
+        for i in range(num):
+            value = values[i]
+            if value == 0:
+                ustruct.pack_into('<HH', buf, 4 * i, 0, 4096)
+            elif value == 4095:
+                ustruct.pack_into('<HH', buf, 4 * i, 4096, 0)
+            else:
+                ustruct.pack_into('<HH', buf, 4 * i, 0, value)
+            dirty[i] = value != last[start + i]
+
+        if metrics.enabled:
+            t0 = ticks_us()
+        written = 0
+        i = 0
+        while i < num:
+            if not dirty[i]:
+                i += 1
+                continue
+            run_end = j = i + 1
+            while j < num:
+                if dirty[j]:
+                    run_end = j + 1
+                elif j - run_end + 1 > self.merge_gap:
+                    break
+                j += 1
+            try:
+                self.i2c.writeto_mem(self.address, LED0_ON_L + 4 * (start + i), self._burst_view[4 * i:4 * run_end])
+            except OSError:
+                self.invalidate()  # unknown what reached the chip: rewrite everything next time
+                raise
+            for k in range(i, run_end):
+                last[start + k] = values[k]
+            written += run_end - i
+            i = run_end
+        self.writes_skipped += num - written
+        if metrics.enabled:
+            metrics.record(STAGE_I2C, t0)
 
     def duty(self, index, value=None, invert=False):
         if value is None:
@@ -52,11 +127,15 @@ class PCA9685:
             raise ValueError("Out of range")
         if invert:
             value = 4095 - value
+        if value == self._last[index]:
+            self.writes_skipped += 1
+            return
         if value == 0:
-            self.pwm(index, 0, 4096)
+            self.pwm(index, 0, 4096)  # leaves _last[index] at -1 if the write fails
         elif value == 4095:
             self.pwm(index, 4096, 0)
         else:
             self.pwm(index, 0, value)
+        self._last[index] = value
 
 
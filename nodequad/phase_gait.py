@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+相位时钟步态：由连续的速度指令(vx, vy, yaw_rate)与相位时钟按需计算每条腿当前的足尖位置（每腿O(1)，不生成整周期轨迹）
+"""
+from math import sqrt
+from gait import GAIT_TROT, GAIT_SPECS
+from gait import home_x, home_y, home_z
+from trajectory import GaitCycle
+
+# below this fraction of the full stride the step height shrinks with the stride (no lifting while standing)
+LIFT_RAMP = 0.25
+
+
+class PhaseGait:
+    """
+    tip = home + d * stroke, lifted by height * step height, (stroke, height) from the gait's GaitCycle
+    (swing curve, then stance following the body travel). d is each leg's half stride,
+    (v + yaw_rate x r_leg) * stride_time, so a direction change is just a new d on the next frame.
+    """
+
+    def __init__(self, amplitude_x=25, amplitude_z=35, accel=1000.0, yaw_accel=4.0, gait_mode=GAIT_TROT):
+        """accel: mm/s^2, yaw_accel: rad/s^2 (limits of the commanded velocity, smooth feet on joystick steps)"""
+        self.amplitude_x = amplitude_x
+        self.amplitude_z = amplitude_z
+        self.cadence = 1.0  # phase increment factor: cycle duration = spec.cycle_ms / cadence
+        self.stride_scale = 1.0  # step length and height relative to the gait's amplitude
+        self.accel = accel
+        self.yaw_accel = yaw_accel
+        self.phase = 0.0  # cycle phase 0..1
+        self.target = [0.0, 0.0, 0.0]  # commanded vx, vy (mm/s), yaw_rate (rad/s, positive turns right)
+        self.velocity = [0.0, 0.0, 0.0]  # acceleration limited command the feet follow
+        self.stride = [[0.0, 0.0] for i in range(4)]  # d per leg
+        self.lift_scale = 0.0
+        # two sets of output lists, used alternately: Leg.move_tip compares against the previous frame's list
+        self._tips = [[[home_x[i], home_y[i], home_z[i]] for i in range(4)] for j in range(2)]
+        self._flip = 0
+        self.set_gait(gait_mode)
+
+    def set_gait(self, gait_mode):
+        """switch the duty pattern (the phase clock keeps running)"""
+        self.gait_mode = gait_mode
+        self.spec = GAIT_SPECS[gait_mode]
+        self.cycle = GaitCycle(self.spec)
+        self.set_scale(self.cadence, self.stride_scale)
+
+    def set_scale(self, cadence, stride_scale):
+        """cycle frequency and step size relative to the gait spec, takes effect on the next frame"""
+        self.cadence = cadence
+        self.stride_scale = stride_scale
+        self.stride_limit = self.amplitude_x * self.spec.amplitude * stride_scale
+        self.lift_height = self.amplitude_z * self.spec.lift * stride_scale
+        # half stride per unit velocity: d travels 2|d| while the body covers 'travel' of a cycle
+        self.stride_time = self.cycle.travel[0] * self.spec.cycle_ms / cadence / 2000
+        self._update_stride()
+
+    def max_speed(self):
+        """mm/s at full stride"""
+        return self.stride_limit / self.stride_time
+
+    def max_yaw_rate(self):
+        """rad/s at full stride of the farthest leg"""
+        return self.max_speed() / max([sqrt(home_x[i] ** 2 + home_y[i] ** 2) for i in range(4)])
+
+    def reset(self):
+        """stand still at phase 0 (velocity and command zeroed)"""
+        self.phase = 0.0
+        for i in range(3):
+            self.target[i] = self.velocity[i] = 0.0
+        self._update_stride()
+
+    def set_velocity(self, vx, vy, yaw_rate):
+        self.target[0] = vx
+        self.target[1] = vy
+        self.target[2] = yaw_rate
+
+    def advance(self, dt):
+        """one frame of dt seconds: velocity toward the command (acceleration limited), phase clock forward"""
+        velocity, target = self.velocity, self.target
+        for i in range(3):
+            limit = (self.accel if i < 2 else self.yaw_accel) * dt
+            velocity[i] += min(max(target[i] - velocity[i], -limit), limit)
+        self._update_stride()
+        self.phase = (self.phase + dt * 1000 * self.cadence / self.spec.cycle_ms) % 1.0
+
+    def _update_stride(self):
+        vx, vy, yaw_rate = self.velocity
+        longest = 0.0
+        for leg_index in range(4):
+            d = self.stride[leg_index]
+            # velocity of the body point above the foot: v + yaw_rate x r (z points down)
+            d[0] = (vx - yaw_rate * home_y[leg_index]) * self.stride_time
+            d[1] = (vy + yaw_rate * home_x[leg_index]) * self.stride_time
+            longest = max(longest, sqrt(d[0] * d[0] + d[1] * d[1]))
+        if longest > self.stride_limit:  # faster than the gait can step: keep the direction, clamp the stride
+            scale = self.stride_limit / longest
+            for d in self.stride:
+                d[0] *= scale
+                d[1] *= scale
+            longest = self.stride_limit
+        self.lift_scale = min(longest / (LIFT_RAMP * self.stride_limit), 1.0) if self.stride_limit > 0 else 0.0
+
+    def tip(self, leg_index, out):
+        """world-frame tip of one leg at the current phase, written into out"""
+        stroke, height = self.cycle.leg_state(leg_index, self.phase)
+        d = self.stride[leg_index]
+        out[0] = home_x[leg_index] + d[0] * stroke
+        out[1] = home_y[leg_index] + d[1] * stroke
+        out[2] = home_z[leg_index] - self.lift_height * self.lift_scale * height
+        return out
+
+    def tips(self):
+        """world-frame tips of all legs (valid until the call after next)"""
+        self._flip ^= 1
+        tips = self._tips[self._flip]
+        for leg_index in range(4):
+            self.tip(leg_index, tips[leg_index])
+        return tips
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from math import pi
+
+
+class PoseFilter:
+    """
+    身体姿态平滑：遥控量(5 Hz阶跃)在每个控制帧上经临界阻尼二阶滤波 + 速度限幅，得到连续的50 Hz姿态
+    natural_hz=0时为纯限速(slew rate limiter)；状态在构造时分配，update不新建列表
+    """
+
+    def __init__(self, natural_hz=4.0, max_linear_speed=150.0, max_angular_speed=60.0, tolerance=1e-3):
+        """max_linear_speed: mm/s, max_angular_speed: degree/s"""
+        self.omega = 2 * pi * natural_hz
+        self.max_speed = [max_linear_speed] * 3 + [max_angular_speed * pi / 180] * 3
+        self.tolerance = tolerance
+        self.value = [0.0] * 6  # filtered x, y, z (mm), roll, pitch, yaw (rad)
+        self.velocity = [0.0] * 6
+        self.target = [0.0] * 6
+        self.pos = [0.0] * 3  # views of value handed to pose_transform
+        self.orn = [0.0] * 3
+        self._settled = True
+
+    def reset(self, pos=(0, 0, 0), orn=(0, 0, 0)):
+        for i in range(3):
+            self.value[i] = self.target[i] = pos[i]
+            self.value[3 + i] = self.target[3 + i] = orn[i]
+        for i in range(6):
+            self.velocity[i] = 0.0
+        self._split()
+        self._settled = True
+
+    def settled(self):
+        """value reached the last target and stopped (nothing left to send to the servos)"""
+        return self._settled
+
+    def update(self, pos, orn, dt):
+        """one control frame of dt seconds toward the target pose, returns the filtered (pos, orn)"""
+        target = self.target
+        for i in range(3):
+            target[i] = pos[i]
+            target[3 + i] = orn[i]
+        omega = self.omega
+        settled = True
+        for i in range(6):
+            error = target[i] - self.value[i]
+            limit = self.max_speed[i]
+            if omega > 0:
+                # critically damped: a = w^2 * e - 2 * w * v (semi-implicit Euler)
+                v = self.velocity[i] + (omega * omega * error - 2 * omega * self.velocity[i]) * dt
+            else:
+                v = error / dt  # reach the target this frame unless the speed limit says otherwise
+            if v > limit:
+                v = limit
+            elif v < -limit:
+                v = -limit
+            step = v * dt
+            if (error >= 0 and step > error) or (error < 0 and step < error):
+                step = error  # no overshoot past the target
+                v = error / dt
+            self.value[i] += step
+            self.velocity[i] = v
+            if abs(target[i] - self.value[i]) > self.tolerance or abs(v) * dt > self.tolerance:
+                settled = False
+        if settled:
+            for i in range(6):
+                self.value[i] = target[i]
+                self.velocity[i] = 0.0
+        self._settled = settled
+        self._split()
+        return self.pos, self.orn
+
+    def _split(self):
+        for i in range(3):
+            self.pos[i] = self.value[i]
+            self.orn[i] = self.value[3 + i]
+
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from utime import ticks_us, ticks_add, ticks_diff, sleep_us
+
+
+class FrameScheduler:
+    """
+    固定帧率调度：以绝对时刻(ticks_us)为截止时间，而不是在计算完成后再固定sleep
+    overrun时 catch_up=False 跳过错过的帧（对齐到下一个时间格），catch_up=True 立即补帧（最多max_catch_up帧）
+    """
+
+    def __init__(self, period_ms=20, catch_up=False, max_catch_up=3, hist_bins=8, hist_bin_us=500):
+        self.period_us = int(period_ms * 1000)
+        self.catch_up = catch_up
+        self.max_catch_up = max_catch_up
+        self.hist_bin_us = hist_bin_us
+        self.jitter_hist = [0] * hist_bins  # |actual period - nominal period| in bins of hist_bin_us, last bin open-ended
+        self.deadline = None
+        self.last_start = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.frame_cnt = 0
+        self.overrun_cnt = 0
+        self.skipped_cnt = 0
+        self.period_sum_us = 0
+        self.period_max_us = 0
+        for i in range(len(self.jitter_hist)):
+            self.jitter_hist[i] = 0
+
+    def set_period_ms(self, period_ms):
+        self.period_us = int(period_ms * 1000)
+
+    def start(self):
+        self.deadline = ticks_us()
+        self.last_start = None
+
+    def delay_us(self):
+        """Advance the deadline by one frame and return how long to wait for it (0 on overrun)."""
+        if self.deadline is None:
+            self.start()
+        now = ticks_us()
+        self.deadline = ticks_add(self.deadline, self.period_us)
+        late = ticks_diff(now, self.deadline)
+        if late < 0:
+            return -late
+        self.overrun_cnt += 1
+        missed = late // self.period_us
+        if self.catch_up and missed < self.max_catch_up:
+            return 0  # keep the grid, the next frames run back to back
+        # skip the missed frames, realign to the next slot of the grid
+        self.skipped_cnt += missed + 1
+        self.deadline = ticks_add(self.deadline, (missed + 1) * self.period_us)
+        return ticks_diff(self.deadline, now)
+
+    def frame_start(self):
+        """Record the start of a frame (period and jitter statistics)."""
+        now = ticks_us()
+        if self.last_start is not None:
+            period = ticks_diff(now, self.last_start)
+            self.period_sum_us += period
+            self.period_max_us = max(self.period_max_us, period)
+            bin_id = abs(period - self.period_us) // self.hist_bin_us
+            self.jitter_hist[min(bin_id, len(self.jitter_hist) - 1)] += 1
+        self.last_start = now
+        self.frame_cnt += 1
+
+    def wait(self):
+        """Blocking: sleep until the next deadline, then mark the frame start."""
+        delay = self.delay_us()
+        if delay > 0:
+            sleep_us(delay)
+        self.frame_start()
+
+    def mean_period_us(self):
+        return self.period_sum_us / (self.frame_cnt - 1) if self.frame_cnt > 1 else 0
+
+    def stats(self):
+        return {'frames': self.frame_cnt,
+                'period_us': self.period_us,
+                'mean_period_us': self.mean_period_us(),
+                'max_period_us': self.period_max_us,
+                'overrun': self.overrun_cnt,
+                'skipped': self.skipped_cnt,
+                'jitter_bin_us': self.hist_bin_us,
+                'jitter_hist': self.jitter_hist}
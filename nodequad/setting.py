@@ -2,7 +2,6 @@
 
 # from micropython import const
 from geometry import SIN10, COS10, SIN15, COS15, SIN30, COS30, SIN45, COS45
-from utils import load_panel_html
 
 # mounting position
 leg_mount_x = 50  # position in x direction of the fore and hind legs
@@ -35,14 +34,53 @@ wlan_sta = False
 wifissid = 'LeeSophia'
 wifipass = '******'
 
+# runtime: False - web server on _thread + blocking main loop, True - single asyncio scheduler (async_runtime.py)
+async_runtime = False
+
+# gait path cache (Gait.get_path) and duty table cache (DutyTables): max paths, max total frames, pre-generate the
+# current gait at init; the duty tables add 24 B/frame within the same limits (256 frames: 6 KB)
+# the defaults hold every direction of any built-in gait (creep: 7 paths, 217 frames)
+gait_cache_entries = 8
+gait_cache_frames = 256  # ~12 KB packed (gait_path_packed), ~90 KB of nested lists: use ~96 without packing
+gait_cache_warm_up = False
+# store gait paths as flat array('f') (48 B/frame) instead of nested lists (~352 B/frame)
+gait_path_packed = True
+# frames to blend from the current tips into a new gait/direction (0 = jump)
+gait_transition_frames = 8
+# POSE mode: joystick changes up to this many units (of -100..100) are ignored as jitter (0 = every change counts)
+pose_deadband = 2
+# POSE mode smoothing of the remote's pose steps (PoseFilter): critically damped natural frequency (Hz, 0 = pure
+# slew rate limit) and speed limits of the body in mm/s and degree/s
+pose_smoothing = True
+pose_smoothing_hz = 4.0
+pose_max_linear_speed = 150.0
+pose_max_angular_speed = 60.0
+
+# MOVE mode gait engine: False plays the precomputed paths of gait.py, True computes the tips from a phase clock and
+# the remote's continuous velocity (PhaseGait); acceleration limits of that velocity in mm/s^2 and rad/s^2
+gait_continuous = False
+gait_accel = 1000.0
+gait_yaw_accel = 4.0
+# rate (per second) at which the gait's cadence and stride factors follow the remote's speed/stride setting
+gait_scale_rate = 2.0
+
+# per-stage frame timing (metrics.py, served at /metrics), off by default; samples kept per stage for p50/p99
+metrics_enabled = False
+metrics_ring_size = 64
+
 # calibration data saved path
 calibration_path = "calibration.json"
 
-# html
+# gait definitions (gait_loader.py) and their compiled binary cache
+gaits_path = "gaits.json"
+gaits_cache_path = "gaits.bin"
+# generated gait paths + compiled duty tables of the current gait on flash (path_store.py), rebuilt when geometry,
+# calibration or gait definitions change (None: generate on first use, gait_cache_warm_up applies)
+path_store_path = "paths.bin"
+
+# html (read from flash when a page is requested, not held in RAM)
 panel_html_dir = 'panel_http.html'
-panel_html_str = load_panel_html(panel_html_dir)
 calib_html_dir = 'calibration.html'
-calib_html_str = load_panel_html(calib_html_dir)
 
 # movement constance
 standby_z = leg_joint3_2tip * COS10 - leg_joint2_2joint3 * SIN30
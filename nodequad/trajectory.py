@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+足端轨迹曲线库：摆动/支撑曲线的公式，以及导入时按单位相位采样成的查找表
+逐帧计算足端(PhaseGait)只查表插值，不调用三角函数；轨迹生成(leg_paths)结果会被缓存，直接用公式计算
+"""
+from array import array
+from math import sin, cos, pi
+
+LUT_SIZE = 64  # intervals per unit phase, tables hold LUT_SIZE + 1 samples (both ends)
+
+
+def _table(fn):
+    return array('f', [fn(i / LUT_SIZE) for i in range(LUT_SIZE + 1)])
+
+
+def lookup(table, s):
+    """table value at unit phase s (0..1), linear between samples"""
+    x = s * LUT_SIZE
+    i = int(x)
+    if i >= LUT_SIZE:
+        return table[LUT_SIZE]
+    if i < 0:
+        return table[0]
+    a = table[i]
+    return a + (table[i + 1] - a) * (x - i)
+
+
+# swing: (stroke, height) over the swing, stroke -1 -> 1 (back to front), height 0 -> 1 -> 0
+SWING_CURVES = {
+    # what gait.py always used: horizontal cosine, sine lift (foot leaves and lands with vertical velocity)
+    'sine': (lambda s: -cos(pi * s), lambda s: sin(pi * s)),
+    # zero velocity and acceleration at lift-off and touch-down
+    'cycloid': (lambda s: 2 * (s - sin(2 * pi * s) / (2 * pi)) - 1, lambda s: (1 - cos(2 * pi * s)) / 2),
+    # quintic Bezier, expanded: stroke control points (-1, -1, -1, 1, 1, 1), lift (0, 0, 1.6, 1.6, 0, 0), so both
+    # start and end at rest and the lift peaks at 1
+    'bezier': (lambda s: -1 + 2 * s * s * s * (10 - 15 * s + 6 * s * s), lambda s: 16 * s * s * (1 - s) * (1 - s)),
+}
+
+# stance: share of the body travel done within a travel window, 0 -> 1
+STANCE_CURVES = {
+    'linear': lambda t: t,
+    'cosine': lambda t: (1 - cos(pi * t)) / 2,
+}
+
+# the same curves as lookup tables
+SWING_PROFILES = {}
+for _name in SWING_CURVES:
+    SWING_PROFILES[_name] = (_table(SWING_CURVES[_name][0]), _table(SWING_CURVES[_name][1]))
+STANCE_PROFILES = {}
+for _name in STANCE_CURVES:
+    STANCE_PROFILES[_name] = _table(STANCE_CURVES[_name])
+
+
+class GaitCycle:
+    """
+    A gait spec (gait.GaitSpec) compiled against the curves: per-leg stroke/height at any cycle phase, O(1).
+    stroke: -1..1 along the step (times the stride), height: 0..1 (times the step height)
+    leg_state (every frame) interpolates the lookup tables, leg_paths (cached paths) evaluates the curves exactly
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.duty_swing = spec.swing
+        self.offsets = spec.offsets
+        self.swing_stroke, self.swing_height = SWING_PROFILES[spec.swing_profile]
+        self.stance_ease = STANCE_PROFILES[spec.stance_profile]
+        self.stroke_curve, self.height_curve = SWING_CURVES[spec.swing_profile]
+        self.stance_curve = STANCE_CURVES[spec.stance_profile]
+        self._swing_scale = LUT_SIZE / spec.swing  # leg phase -> swing table position
+        # windows (sorted, not overlapping) as (start, end, LUT_SIZE / width, travel before it, its share of the travel)
+        total = sum([end - start for start, end in spec.windows])
+        self._windows = []
+        done = 0.0
+        for start, end in spec.windows:
+            share = (end - start) / total
+            self._windows.append((start, end, LUT_SIZE / (end - start), done, share))
+            done += share
+        self.b0 = [0.0] * 4  # body travel at touch down, per leg
+        self.travel = [1.0] * 4  # body travel during a stance, per leg
+        for leg_index in range(4):
+            offset = spec.offsets[leg_index]
+            self.b0[leg_index] = self.body_travel(offset + spec.swing, True)
+            self.travel[leg_index] = self.body_travel(offset + 1.0, True) - self.b0[leg_index]
+
+    def body_travel(self, phase, exact=False):
+        """share of the body travel from phase 0 (unwrapped: +1 per cycle), from the table unless exact"""
+        cycles = int(phase)  # phase >= 0
+        phase -= cycles
+        for start, end, scale, done, share in self._windows:
+            if phase < end:
+                if phase <= start:
+                    return cycles + done
+                if exact:
+                    return cycles + done + share * self.stance_curve((phase - start) * scale / LUT_SIZE)
+                ease = self.stance_ease
+                x = (phase - start) * scale
+                i = int(x)
+                a = ease[i]
+                return cycles + done + share * (a + (ease[i + 1] - a) * (x - i))
+        return cycles + 1.0
+
+    def _body_travels(self, phases):
+        """body_travel(phase, True) of ascending phases in [0, 1), one pass over the windows"""
+        ease = self.stance_curve
+        windows = self._windows
+        travels = []
+        w = 0
+        for phase in phases:
+            while w < len(windows) and phase >= windows[w][1]:
+                w += 1
+            if w == len(windows):
+                travels.append(1.0)
+                continue
+            start, end, scale, done, share = windows[w]
+            travels.append(done if phase <= start else done + share * ease((phase - start) * scale / LUT_SIZE))
+        return travels
+
+    def leg_paths(self, num_frames, stride, height):
+        """
+        one cycle of every leg (fr, br, bl, fl) in num_frames equal phase steps as [stride * stroke, 0.0, -height * lift]
+        points; legs may share point lists, callers build new ones (Gait.formated_path_status)
+        """
+        swing = self.duty_swing
+        stroke_curve, height_curve = self.stroke_curve, self.height_curve
+        # the body travel only depends on the frame, and legs whose swings land on the same phases share those points
+        phases = [frame_id / num_frames for frame_id in range(num_frames)]
+        body = self._body_travels(phases)
+        swing_points = {}
+        paths = []
+        for leg_index in range(4):
+            offset = self.offsets[leg_index]
+            if offset in self.offsets[:leg_index]:  # same phase as an earlier leg (trot pairs): same path
+                paths.append(paths[self.offsets.index(offset)])
+                continue
+            b0, scale = self.b0[leg_index], 2 * stride / self.travel[leg_index]
+            points = []
+            for frame_id in range(num_frames):
+                phase = phases[frame_id]
+                leg_phase = (phase - offset) % 1.0
+                if leg_phase < swing:
+                    point = swing_points.get(leg_phase)
+                    if point is None:
+                        s = leg_phase / swing
+                        point = swing_points[leg_phase] = [stride * stroke_curve(s), 0.0, -height * height_curve(s)]
+                    points.append(point)
+                else:
+                    travel = body[frame_id] + 1.0 if phase < offset else body[frame_id]  # unwrapped past the offset
+                    points.append([stride - (travel - b0) * scale, 0.0, 0.0])
+            paths.append(points)
+        return paths
+
+    def leg_state(self, leg_index, phase):
+        """(stroke, height) of one leg at cycle phase 0..1"""
+        offset = self.offsets[leg_index]
+        leg_phase = (phase - offset) % 1.0
+        if leg_phase < self.duty_swing:
+            # lookup() inlined for both tables (leg_phase < swing keeps i below LUT_SIZE)
+            x = leg_phase * self._swing_scale
+            i = int(x)
+            f = x - i
+            stroke, height = self.swing_stroke, self.swing_height
+            a, b = stroke[i], height[i]
+            return a + (stroke[i + 1] - a) * f, b + (height[i + 1] - b) * f
+        return 1 - 2 * (self.body_travel(offset + leg_phase) - self.b0[leg_index]) / self.travel[leg_index], 0.0
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+
+def match_phase(step_id, old_len, new_len):
+    """frame of a path with new_len frames at the same cycle phase as step_id of a path with old_len frames"""
+    return int(step_id * new_len / old_len) % new_len
+
+
+class GaitTransition:
+    """
+    步态/方向切换过渡：立即进入新步态周期（相位对齐），切换瞬间的足尖偏差在num_frames帧内平滑衰减为0
+    """
+
+    def __init__(self, num_frames=8):
+        self.num_frames = num_frames
+        self.remaining = 0
+        self.start = [[0.0, 0.0, 0.0] for i in range(4)]  # world-frame tips when the switch happened
+        self.offset = [[0.0, 0.0, 0.0] for i in range(4)]  # start - first target frame of the new path
+        self.current = self.start  # last blended (or start) tips
+
+    def active(self):
+        return self.remaining > 0
+
+    def begin(self, tips_world):
+        if self.num_frames <= 0:
+            return
+        for leg_index in range(4):
+            for axis in range(3):
+                self.start[leg_index][axis] = tips_world[leg_index][axis]
+        self.current = self.start
+        self.remaining = self.num_frames
+
+    def blend(self, target_frame):
+        """next transition frame: target_frame (world-frame tips of the new path) plus the decaying switch offset"""
+        if self.remaining == self.num_frames:
+            for leg_index in range(4):
+                for axis in range(3):
+                    self.offset[leg_index][axis] = self.start[leg_index][axis] - target_frame[leg_index][axis]
+        t = (self.num_frames - self.remaining + 1) / self.num_frames
+        k = 1 - t * t * (3 - 2 * t)  # smoothstep from 1 to 0
+        self.current = [[target_frame[leg_index][axis] + self.offset[leg_index][axis] * k for axis in range(3)]
+                        for leg_index in range(4)]
+        self.remaining -= 1
+        return self.current
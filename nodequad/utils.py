@@ -1,9 +1,24 @@
+try:
+    import uos as os
+except ImportError:
+    import os
+
+
 def load_panel_html(html_dir):
     with open(html_dir, encoding='utf-8') as f:
         panel_html = f.read()
     return panel_html
     
     
+def replace_file(tmp_path, path):
+    """move a completely written tmp_path over path: a write cut off by a power loss never leaves a partial path"""
+    try:
+        os.remove(path)  # FAT does not rename over an existing file
+    except OSError:
+        pass
+    os.rename(tmp_path, path)
+
+
 def battery_monitor_loop(adc_pin, alarm_led, low_voltage=10.2):
     """a 3S LiPo battery (fully charged = 12.6V, nominal = 11.4V, discharged = 10.2V)"""
     # 4 for shunt resistance & 0.12V for offset compensate
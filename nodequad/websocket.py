@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Minimal RFC 6455 server side: handshake and single-frame send/receive (no fragmentation)."""
+import hashlib
+import binascii
+import ustruct
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+CLOSE_TOO_BIG = 1009  # close status: message too big to process
+CLOSE_INVALID_DATA = 1007  # close status: payload does not fit its message type (text frame that is no control object)
+MAX_PAYLOAD = 2048  # default recv_frame limit, the panel only sends 2-byte binary frames and small json
+
+
+def handshake_key(req):
+    """Return Sec-WebSocket-Key if the request asks for a websocket upgrade, else None."""
+    for line in req.split('\r\n'):
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'sec-websocket-key':
+            return value.strip()
+    return None
+
+
+def handshake_response(key):
+    accept = binascii.b2a_base64(hashlib.sha1((key + WS_GUID).encode()).digest()).strip().decode()
+    return ('HTTP/1.1 101 Switching Protocols\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            'Sec-WebSocket-Accept: {0}\r\n\r\n').format(accept)
+
+
+def recv_exact(conn, num):
+    buf = b''
+    while len(buf) < num:
+        chunk = conn.recv(num - len(buf))
+        if not chunk:
+            raise OSError('websocket closed')
+        buf += chunk
+    return buf
+
+
+def _payload_length(head, extended):
+    length = head[1] & 0x7F
+    if length == 126:
+        return ustruct.unpack('>H', extended)[0]
+    elif length == 127:
+        return ustruct.unpack('>Q', extended)[0]
+    return length
+
+
+def _extended_size(head):
+    length = head[1] & 0x7F
+    return 2 if length == 126 else 8 if length == 127 else 0
+
+
+def _unmask(payload, mask):
+    if mask:
+        for i in range(len(payload)):
+            payload[i] ^= mask[i & 3]
+    return payload
+
+
+def close_reply(status):
+    """(OP_CLOSE, payload) ending a session with the given close status"""
+    return OP_CLOSE, bytearray(ustruct.pack('>H', status))
+
+
+def _too_big():
+    """what recv_frame returns for a frame it does not read: a close (1009) to answer with"""
+    return close_reply(CLOSE_TOO_BIG)
+
+
+def recv_frame(conn, max_payload=MAX_PAYLOAD):
+    """
+    Read one (client, masked) frame -> (opcode, payload)
+    A fragment (FIN=0) or a payload over max_payload is not read: it comes back as a close frame with status 1009
+    """
+    head = recv_exact(conn, 2)
+    size = _extended_size(head)
+    length = _payload_length(head, recv_exact(conn, size) if size else b'')
+    if not head[0] & 0x80 or length > max_payload:
+        return _too_big()
+    mask = recv_exact(conn, 4) if head[1] & 0x80 else None
+    payload = bytearray(recv_exact(conn, length)) if length else bytearray()
+    return head[0] & 0x0F, _unmask(payload, mask)
+
+
+async def arecv_frame(reader, max_payload=MAX_PAYLOAD):
+    """recv_frame for an asyncio StreamReader"""
+    head = await reader.readexactly(2)
+    size = _extended_size(head)
+    length = _payload_length(head, await reader.readexactly(size) if size else b'')
+    if not head[0] & 0x80 or length > max_payload:
+        return _too_big()
+    mask = await reader.readexactly(4) if head[1] & 0x80 else None
+    payload = bytearray(await reader.readexactly(length)) if length else bytearray()
+    return head[0] & 0x0F, _unmask(payload, mask)
+
+
+def encode_frame(payload, opcode=OP_TEXT):
+    """Unmasked (server) frame as bytes"""
+    if isinstance(payload, str):
+        payload = payload.encode()
+    length = len(payload)
+    if length < 126:
+        header = ustruct.pack('>BB', 0x80 | opcode, length)
+    elif length < 65536:
+        header = ustruct.pack('>BBH', 0x80 | opcode, 126, length)
+    else:
+        header = ustruct.pack('>BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def send_frame(conn, payload, opcode=OP_TEXT):
+    """Send one unmasked (server) frame"""
+    conn.sendall(encode_frame(payload, opcode))
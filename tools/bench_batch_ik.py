@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Batched IK/FK (batch_kinematics, NumPy) vs. the scalar Leg.local_ik / Leg.local_fk loop:
+throughput on a workspace sweep and on whole gait paths, plus agreement with the scalar results.
+
+usage: python tools/bench_batch_ik.py [points]
+"""
+import sys
+import time
+import random
+import hoststub
+
+hoststub.install()
+
+import batch_kinematics
+from batch_kinematics import np
+from leg import Leg
+from gait import Gait, GAIT_TROT, GAIT_WALK, GAIT_GALLOP, GAIT_CREEP, MOVE_FORWARD
+
+GAITS = (('trot', GAIT_TROT), ('walk', GAIT_WALK), ('gallop', GAIT_GALLOP), ('creep', GAIT_CREEP))
+TOLERANCE_DEG = 1e-6
+TOLERANCE_MM = 1e-6
+
+
+class NoServo:
+    pass
+
+
+def best_of(fn, repeat=5):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def scalar_ik(points):
+    angles = []
+    valid = []
+    for p in points:
+        try:
+            angles.append(Leg.local_ik(p))
+            valid.append(True)
+        except ValueError:  # math domain error: out of reach
+            angles.append([0.0, 0.0, 0.0])
+            valid.append(False)
+    return angles, valid
+
+
+def workspace_sweep(n):
+    random.seed(1)
+    points = [(random.uniform(-250, 250), random.uniform(-250, 250), random.uniform(-250, 100)) for i in range(n)]
+    t_scalar, (angles_ref, valid_ref) = best_of(lambda: scalar_ik(points))
+    arr = np.array(points)
+    t_batch, (angles, valid) = best_of(lambda: batch_kinematics.local_ik(arr))
+    mask = np.array(valid_ref)
+    assert (valid == mask).all(), 'validity mask differs from the scalar solver'
+    err = np.abs(angles[mask] - np.array(angles_ref)[mask]).max()
+    assert err < TOLERANCE_DEG, err
+    tips = batch_kinematics.local_fk(angles[mask])
+    fk_err = np.abs(tips - arr[mask]).max()
+    assert fk_err < TOLERANCE_MM, fk_err
+    fk_ref = [Leg.local_fk(a)[-1] for a in angles[mask][:100].tolist()]
+    assert np.abs(np.array(fk_ref) - tips[:100]).max() < TOLERANCE_MM
+    print('workspace sweep {0} points ({1} reachable)'.format(n, int(mask.sum())))
+    print('  scalar  {0:8.2f} ms  {1:6.2f} us/point'.format(t_scalar * 1000, t_scalar * 1e6 / n))
+    print('  batch   {0:8.2f} ms  {1:6.2f} us/point  ({2:.0f}x)'.format(t_batch * 1000, t_batch * 1e6 / n,
+                                                                     t_scalar / t_batch))
+    print('  max |angle - scalar| {0:.1e} deg, max FK round trip error {1:.1e} mm'.format(err, fk_err))
+
+
+def gait_paths():
+    gait = Gait()
+    legs = [Leg(NoServo(), leg_index) for leg_index in range(4)]
+    print('whole gait paths (4 legs, world -> local -> IK)')
+    for name, gait_mode in GAITS:
+        path = gait.gen_path(gait_mode, MOVE_FORWARD)
+
+        def scalar():
+            return [[Leg.local_ik(legs[leg_index].translate2local(path[frame_id][leg_index]))
+                     for frame_id in range(len(path))] for leg_index in range(4)]
+
+        t_scalar, ref = best_of(scalar)
+        t_batch, result = best_of(lambda: batch_kinematics.path_ik(path))
+        err = max([np.abs(result[leg_index][0] - np.array(ref[leg_index])).max() for leg_index in range(4)])
+        assert err < TOLERANCE_DEG, err
+        assert all([result[leg_index][1].all() for leg_index in range(4)])
+        print('  {0:7s} {1:3d} frames  scalar {2:6.2f} ms  batch {3:6.2f} ms  max err {4:.1e} deg'.format(
+            name, len(path), t_scalar * 1000, t_batch * 1000, err))
+
+
+if __name__ == '__main__':
+    if not batch_kinematics.available():
+        print('numpy is not installed')
+        sys.exit(1)
+    workspace_sweep(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
+    gait_paths()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Boot time, power-on to the first servo frame: every run is a fresh interpreter doing what main.py does (imports,
+NodeQuad(), init()) and then one tick(), the first frame written to the servos.
+
+no store      path_store_path = None: the first frames generate their paths and compile their duty tables
+warm-up       path_store_path = None, gait_cache_warm_up: init() generates every direction of the gait (no duty tables)
+build         no paths.bin yet: init() generates the current gait's paths + duty tables and writes them
+flash         paths.bin valid: init() reads them back
+recalibrated  calibration changed since paths.bin was written: checksum mismatch, rebuilt
+per stage     spawn -> imports -> NodeQuad() -> init() -> first frame (standing), medians over the runs, then the first
+              walking frame after FORWARD; html pages (no longer read at import) for comparison
+
+calibration, gaits cache and paths.bin live in a temporary directory, nothing is left in nodequad/
+
+usage: python tools/bench_boot.py [runs]
+"""
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def child(store_path, calibration_path, gaits_cache_path, warm_up):
+    """one boot, prints the stage timestamps (time.time()) as json"""
+    stamps = {'start': time.time()}
+    sys.path.insert(0, TOOLS_DIR)
+    import hoststub
+    hoststub.install()  # chdir into nodequad/ as on the board
+    from machine import I2C
+    import nodequad
+    from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+    stamps['imports'] = time.time()
+    nodequad.path_store_path = store_path or None
+    nodequad.calibration_path = calibration_path
+    nodequad.gaits_cache_path = gaits_cache_path
+    i2c = I2C()
+    quadruped = nodequad.NodeQuad('127.0.0.1', i2c, pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    stamps['construct'] = time.time()
+    sys.stdout = open(os.devnull, 'w')  # init() prints what it loaded
+    quadruped.init(warm_up=warm_up == '1')
+    sys.stdout = sys.__stdout__
+    stamps['init'] = time.time()
+    transactions = i2c.transactions
+    quadruped.tick()
+    stamps['first_frame'] = time.time()
+    stamps['servo_writes'] = i2c.transactions - transactions
+    quadruped.web_controller.apply_control({'button': 'FORWARD'})
+    start = time.time()
+    quadruped.tick()
+    stamps['first_step_ms'] = (time.time() - start) * 1000
+    start = time.time()
+    from utils import load_panel_html
+    from setting import panel_html_dir, calib_html_dir
+    html = len(load_panel_html(panel_html_dir)) + len(load_panel_html(calib_html_dir))
+    stamps['html_ms'] = (time.time() - start) * 1000
+    stamps['html_chars'] = html
+    print(json.dumps(stamps))
+
+
+def boot(store_path, calibration_path, gaits_cache_path, warm_up=False):
+    spawn = time.time()
+    out = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child', store_path, calibration_path,
+                                   gaits_cache_path, '1' if warm_up else '0'])
+    stamps = json.loads(out.decode().strip().splitlines()[-1])
+    stamps['spawn'] = spawn
+    return stamps
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def report(name, runs):
+    stages = ('spawn', 'start', 'imports', 'construct', 'init', 'first_frame')
+    ms = [median([(run[b] - run[a]) * 1000 for run in runs]) for a, b in zip(stages, stages[1:])]
+    total = median([(run['first_frame'] - run['spawn']) * 1000 for run in runs])
+    print('{0:12s} first servo frame after {1:6.1f} ms (interpreter {2:5.1f}, imports {3:5.1f}, NodeQuad() {4:4.1f}, '
+          'init() {5:5.1f}, first tick {6:5.2f}), first walking frame {7:5.2f} ms'.format(
+              name, total, ms[0], ms[1], ms[2], ms[3], ms[4], median([run['first_step_ms'] for run in runs])))
+
+
+def main(runs):
+    tmp = tempfile.mkdtemp()
+    try:
+        calibration = os.path.join(tmp, 'calibration.json')
+        shutil.copy(os.path.join(TOOLS_DIR, '..', 'nodequad', 'calibration.json'), calibration)
+        gaits_cache = os.path.join(tmp, 'gaits.bin')
+        store = os.path.join(tmp, 'paths.bin')
+        boot(store, calibration, gaits_cache)  # gaits.bin written, os file cache warm
+        os.remove(store)
+        report('no store', [boot('', calibration, gaits_cache) for i in range(runs)])
+        report('warm-up', [boot('', calibration, gaits_cache, True) for i in range(runs)])
+        builds = []
+        for i in range(runs):
+            if os.path.exists(store):
+                os.remove(store)
+            builds.append(boot(store, calibration, gaits_cache))
+        report('build', builds)
+        report('flash', [boot(store, calibration, gaits_cache) for i in range(runs)])
+        recalibrated = []
+        for i in range(runs):
+            with open(calibration, 'w') as f:
+                json.dump({'calibration': [[i % 5, 0, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0]]}, f)
+            recalibrated.append(boot(store, calibration, gaits_cache))
+        report('recalibrated', recalibrated)
+        print('store        paths.bin {0} bytes'.format(os.path.getsize(store)))
+        print('html         both pages {0} chars, {1:.2f} ms to read (now per page request, was at import)'.format(
+            builds[0]['html_chars'], median([run['html_ms'] for run in builds])))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(*sys.argv[2:6])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 9)
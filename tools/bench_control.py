@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Request latency and bytes sent per joystick update of WebController.loop.
+
+'page' is what every 200 ms joystick poll used to receive (the whole panel page),
+'control' is the JSON acknowledgement now returned by POST /control.
+
+usage: python tools/bench_control.py [num_requests]
+"""
+import sys
+import json
+import time
+import socket
+import _thread
+import hoststub
+
+hoststub.install()
+
+from controller import WebController, CONTROL_PATH
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def request(port, method, path, body=''):
+    conn = socket.create_connection(('127.0.0.1', port))
+    conn.sendall('{0} {1} HTTP/1.1\r\nHost: nodequad\r\nContent-Type: application/json\r\nContent-Length: {2}\r\n\r\n{3}'.format(
+        method, path, len(body), body).encode())
+    received = 0
+    while True:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        received += len(chunk)
+    conn.close()
+    return received
+
+
+def run(port, method, path, body, num):
+    latencies, total_bytes = [], 0
+    for i in range(num):
+        start = time.perf_counter()
+        total_bytes += request(port, method, path, body)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {'mean_ms': sum(latencies) / num,
+            'p50_ms': latencies[num // 2],
+            'p99_ms': latencies[min(num - 1, int(num * 0.99))],
+            'bytes_per_update': total_bytes / num}
+
+
+def main():
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    port = free_port()
+    controller = WebController('127.0.0.1')
+    _thread.start_new_thread(controller.loop, (port,))
+    time.sleep(0.2)
+
+    joystick = json.dumps({'joy.x': 20, 'joy.y': -35})
+    results = {'page': run(port, 'GET', '/', '', num),
+               'control': run(port, 'POST', CONTROL_PATH, joystick, num)}
+    for name, result in results.items():
+        print('{0:8s} mean {1:.3f} ms  p50 {2:.3f} ms  p99 {3:.3f} ms  {4:.0f} bytes/update'.format(
+            name, result['mean_ms'], result['p50_ms'], result['p99_ms'], result['bytes_per_update']))
+    print('bytes reduction: {0:.1f}x'.format(results['page']['bytes_per_update'] / results['control']['bytes_per_update']))
+
+
+if __name__ == '__main__':
+    main()
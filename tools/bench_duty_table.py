@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Precompiled duty tables (nodequad/duty_table.py) vs. per-frame translate2local + IK + pulse conversion:
+compile time of every gait x direction x speed table and the memory the cache keeps of them against its budget
+(gait_cache_entries, gait_cache_frames), then playback cost per frame.
+Both paths must leave the PCA9685 registers identical after every frame.
+
+usage: python tools/bench_duty_table.py [cycles]
+"""
+import sys
+import time
+import hoststub
+
+hoststub.install()
+
+from machine import I2C
+from nodequad import NodeQuad
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+from gait import GAIT_TROT, GAIT_WALK, GAIT_GALLOP, GAIT_CREEP
+from gait import MOVE_STANDBY, MOVE_FORWARD, MOVE_BACKWARD, MOVE_LEFTSHIFT, MOVE_RIGHTSHIFT, MOVE_LEFTROTATE, \
+    MOVE_RIGHTROTATE
+
+GAITS = [GAIT_TROT, GAIT_WALK, GAIT_GALLOP, GAIT_CREEP]
+MOVES = [MOVE_STANDBY, MOVE_FORWARD, MOVE_BACKWARD, MOVE_LEFTSHIFT, MOVE_RIGHTSHIFT, MOVE_LEFTROTATE, MOVE_RIGHTROTATE]
+
+
+def make_quadruped():
+    i2c = I2C()
+    quadruped = NodeQuad('127.0.0.1', i2c, pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    quadruped.init()
+    return quadruped, i2c
+
+
+def compile_all():
+    quadruped, i2c = make_quadruped()
+    start = time.perf_counter()
+    for gait_mode in GAITS:
+        for move_status in MOVES:
+            for gait_speed in (0, 1):
+                path = quadruped.gait.gen_path(gait_mode, move_status, gait_speed)
+                quadruped.duty_tables.get((gait_mode, move_status, gait_speed), path)
+    elapsed = time.perf_counter() - start
+    duty_tables = quadruped.duty_tables
+    print('compiled {0} tables in {1:.1f} ms, kept {2} ({3} frames): {4} of {5} budget bytes of duties'.format(
+        len(GAITS) * len(MOVES) * 2, elapsed * 1000, len(duty_tables.tables), duty_tables.cached_frames(),
+        duty_tables.memory_bytes(), duty_tables.budget_bytes()))
+
+
+def playback(cycles):
+    ik, ik_i2c = make_quadruped()
+    table, table_i2c = make_quadruped()
+    ik.use_duty_tables = False
+    for quadruped in (ik, table):
+        quadruped.web_controller.rc_moving_status = MOVE_FORWARD
+        quadruped.web_controller.publish()
+    timings = {'ik': 0.0, 'table': 0.0}
+    frames = 0
+    for gait_mode in GAITS:
+        for quadruped in (ik, table):
+            quadruped.web_controller.rc_moving_status = MOVE_STANDBY
+            quadruped.web_controller.publish()
+            quadruped.tick()
+            quadruped.web_controller.rc_gait_mode = gait_mode
+            quadruped.web_controller.rc_moving_status = MOVE_FORWARD
+            quadruped.web_controller.publish()
+        for i in range(cycles * len(ik.gait.gen_path(gait_mode, MOVE_FORWARD))):
+            for name, quadruped in (('ik', ik), ('table', table)):
+                start = time.perf_counter()
+                quadruped.tick()
+                timings[name] += time.perf_counter() - start
+            assert ik_i2c.registers == table_i2c.registers
+            frames += 1
+    for name in ('ik', 'table'):
+        print('{0:6s} {1:6.1f} us host cpu/frame'.format(name, timings[name] * 1000000 / frames))
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    compile_all()
+    playback(cycles)
+
+
+if __name__ == '__main__':
+    main()
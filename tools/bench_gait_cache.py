@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Cost of a direction switch: Gait.gen_path (regenerate) vs. Gait.get_path (LRU cache hit),
+and the memory held by a warmed-up cache (tracemalloc on CPython, PATH_FRAME_BYTES estimate for MicroPython).
+
+usage: python tools/bench_gait_cache.py [switches]
+"""
+import sys
+import time
+import tracemalloc
+import hoststub
+
+hoststub.install()
+
+from gait import Gait, GAIT_TROT, GAIT_WALK, GAIT_GALLOP, GAIT_CREEP
+from gait import MOVE_FORWARD, MOVE_BACKWARD, MOVE_LEFTSHIFT, MOVE_RIGHTSHIFT, MOVE_LEFTROTATE, MOVE_RIGHTROTATE
+from setting import gait_cache_entries, gait_cache_frames, gait_path_packed
+
+MOVES = [MOVE_FORWARD, MOVE_LEFTSHIFT, MOVE_BACKWARD, MOVE_RIGHTSHIFT, MOVE_LEFTROTATE, MOVE_RIGHTROTATE]
+
+
+def switch_cost(gait, gen, gait_mode, switches):
+    start = time.perf_counter()
+    for i in range(switches):
+        gen(gait_mode, MOVES[i % len(MOVES)])
+    return (time.perf_counter() - start) * 1000000 / switches
+
+
+def main():
+    switches = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    gait = Gait(cache_entries=8, cache_frames=256)  # room for the 6 directions of any gait (creep: 216 frames)
+    for name, gait_mode in (('trot', GAIT_TROT), ('walk', GAIT_WALK), ('gallop', GAIT_GALLOP), ('creep', GAIT_CREEP)):
+        regenerate = switch_cost(gait, gait.gen_path, gait_mode, switches)
+        cached = switch_cost(gait, gait.get_path, gait_mode, switches)
+        print('{0:7s} gen_path {1:8.1f} us/switch   get_path {2:6.2f} us/switch'.format(name, regenerate, cached))
+    print('hits {0}, misses {1}'.format(gait.cache_hits, gait.cache_misses))
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    warm = Gait(cache_entries=64, cache_frames=10000)
+    warm.warm_up()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('warm-up of all gaits/directions: {0} paths, {1} frames, {2} bytes on CPython, ~{3} bytes estimated on MicroPython'.format(
+        len(warm.path_cache), warm.cached_frames(), after - before, warm.cache_memory_bytes()))
+
+    for name, gait_mode in (('trot', GAIT_TROT), ('walk', GAIT_WALK), ('gallop', GAIT_GALLOP), ('creep', GAIT_CREEP)):
+        capped = Gait(gait_cache_entries, gait_cache_frames, gait_path_packed)  # what NodeQuad.init warms up
+        capped.warm_up((gait_mode,))
+        print('setting.py limits, warm-up of {0:6s}: {1} of 7 paths, {2} frames kept, ~{3} bytes'.format(
+            name, len(capped.path_cache), capped.cached_frames(), capped.cache_memory_bytes()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Gait definitions from JSON (gait_loader.py, nodequad/gaits.json), with the compiled gaits cached in a binary file:
+
+load      load_gaits() parsing and validating gaits.json vs. reading the compiled cache (the boot path while the
+          file is unchanged); a missing json file keeps the built-in gaits
+match     largest tip difference of every gait path after loading gaits.json (json and cache) to the built-in specs
+new gait  a PACE gait added to a copy of gaits.json: registered as a new gait mode, listed by GET /gaits and
+          driven by its remote button
+invalid   error messages for broken definitions
+
+the cache is written to a temporary directory, nothing is left in nodequad/
+
+usage: python tools/bench_gait_loader.py [repeats]
+"""
+import sys
+import os
+import json
+import time
+import shutil
+import tempfile
+import hoststub
+
+hoststub.install()
+
+from machine import I2C
+import gait
+from gait import Gait, GAIT_SPECS, GAIT_NAMES, MOVE_FORWARD, MOVE_LEFTSHIFT, MOVE_RIGHTROTATE
+from gait_loader import load_gaits, compile_gait
+from nodequad import NodeQuad
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+
+BUILT_IN_SPECS = dict(GAIT_SPECS)
+BUILT_IN_NAMES = dict(GAIT_NAMES)
+PACE = {"name": "PACE", "cycle_ms": 240, "duty_factor": 0.5, "offsets": [0.0, 0.0, 0.5, 0.5], "stride": 25,
+        "swing_height": 30, "body_windows": [[0.0, 0.5], [0.5, 1.0]], "swing_profile": "cycloid",
+        "stance_profile": "cosine"}
+
+
+def restore_built_ins():
+    GAIT_SPECS.clear()
+    GAIT_SPECS.update(BUILT_IN_SPECS)
+    GAIT_NAMES.clear()
+    GAIT_NAMES.update(BUILT_IN_NAMES)
+
+
+def load_us(json_path, cache_path, repeats):
+    start = time.perf_counter()
+    for i in range(repeats):
+        loaded, source = load_gaits(json_path, cache_path)
+    return (time.perf_counter() - start) * 1e6 / repeats, source
+
+
+def load(tmp, repeats):
+    cache_path = os.path.join(tmp, 'gaits.bin')
+    json_us, source = load_us('gaits.json', None, repeats)  # no cache: parse and validate every time
+    load_gaits('gaits.json', cache_path)
+    cache_us, cache_source = load_us('gaits.json', cache_path, repeats)
+    print('load      gaits.json ({0}) {1:6.1f} us, cache ({2}, {3} bytes) {4:6.1f} us'.format(
+        source, json_us, cache_source, os.path.getsize(cache_path), cache_us))
+    print('load      missing json file: {0}'.format(load_gaits(os.path.join(tmp, 'none.json'))))
+    restore_built_ins()
+
+
+def worst_difference():
+    gait_ = Gait()
+    worst = 0.0
+    for gait_mode in BUILT_IN_SPECS:
+        for move_status in (MOVE_FORWARD, MOVE_LEFTSHIFT, MOVE_RIGHTROTATE):
+            expected = gait_.spec_path(BUILT_IN_SPECS[gait_mode], move_status)
+            path = gait_.spec_path(GAIT_SPECS[gait_mode], move_status)
+            worst = max([worst] + [abs(path[f][leg][axis] - expected[f][leg][axis])
+                                   for f in range(len(path)) for leg in range(4) for axis in range(3)])
+    return worst
+
+
+def match(tmp):
+    cache_path = os.path.join(tmp, 'gaits.bin')
+    for expected_source in ('json', 'cache'):
+        if expected_source == 'json' and os.path.exists(cache_path):
+            os.remove(cache_path)
+        loaded, source = load_gaits('gaits.json', cache_path)
+        print('match     {0:5s} {1} gaits, max |path - built-in path| {2:.1e} mm'.format(
+            source, len(loaded), worst_difference()))
+        restore_built_ins()
+
+
+def new_gait(tmp):
+    json_path = os.path.join(tmp, 'gaits.json')
+    with open('gaits.json') as f:
+        definitions = json.load(f)
+    definitions['gaits'].append(PACE)
+    with open(json_path, 'w') as f:
+        json.dump(definitions, f)
+    quadruped = NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    quadruped.load_gaits(json_path, os.path.join(tmp, 'gaits_pace.bin'))
+    controller = quadruped.web_controller
+    listed = json.loads(controller.gaits_json())
+    print('new gait  GET /gaits: {0}'.format(', '.join(['{0}={1}'.format(g['name'], g['id']) for g in listed['gaits']])))
+    controller.apply_control({'button': 'PACE'})
+    controller.apply_control({'button': 'FORWARD'})
+    for i in range(30):
+        quadruped.tick()
+    print('new gait  after the PACE button: gait mode {0} ({1}), {2} frames/cycle, legs at {3}'.format(
+        quadruped.gait_mode, GAIT_NAMES[quadruped.gait_mode], len(quadruped.gait_path),
+        [[round(v, 1) for v in leg.tip_position()] for leg in quadruped.legs][:2]))
+    restore_built_ins()
+
+
+def invalid():
+    broken = (dict(PACE, duty_factor=1.2), dict(PACE, offsets=[0, 0.5]), dict(PACE, name='FORWARD'),
+              dict(PACE, swing_profile='spline'), dict(PACE, body_windows=[[0.5, 1.0], [0.0, 0.5]]),
+              {k: v for k, v in PACE.items() if k != 'stride'})
+    for definition in broken:
+        try:
+            compile_gait(definition, 25, 35)
+            print('invalid   accepted: {0}'.format(definition))
+        except ValueError as e:
+            print('invalid   {0}'.format(e))
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tmp = tempfile.mkdtemp()
+    try:
+        load(tmp, repeats)
+        match(tmp)
+        new_gait(tmp)
+        invalid()
+    finally:
+        shutil.rmtree(tmp)
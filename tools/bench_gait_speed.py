@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime gait speed and stride (remote 'speed'/'stride' in percent): the path is resampled at a fractional
+position per frame instead of being regenerated.
+
+ramp      trot forward while the remote steps speed 100 -> 200 -> 50 % and stride 100 -> 60 %: frames per cycle
+          at each setting, paths generated during the ramp, largest tip step of any leg per frame while the
+          factors move and once settled (no jump beyond what the new speed itself needs)
+cost      tick() at the nominal speed (duty tables) and resampled (per-frame IK), vs. regenerating the path for
+          another duration (Gait.gen_path with gait_speed=1, what a speed change used to need)
+
+usage: python tools/bench_gait_speed.py
+"""
+import time
+from math import sqrt
+import hoststub
+
+hoststub.install()
+
+from machine import I2C
+from nodequad import NodeQuad
+from gait import GAIT_TROT, MOVE_FORWARD
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+
+
+def make_quadruped(continuous=False, duty_tables=True):
+    quadruped = NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    quadruped.use_phase_gait = continuous
+    quadruped.use_duty_tables = duty_tables
+    quadruped.web_controller.apply_control({'button': 'FORWARD'})
+    for i in range(20):
+        quadruped.tick()
+    return quadruped
+
+
+def largest_step(quadruped, frames):
+    """largest tip step of any leg per frame over the next 'frames' ticks"""
+    largest, previous = 0.0, [list(leg.tip_position()) for leg in quadruped.legs]
+    for i in range(frames):
+        quadruped.tick()
+        current = [list(leg.tip_position()) for leg in quadruped.legs]
+        largest = max([largest] + [sqrt(sum([(current[leg][axis] - previous[leg][axis]) ** 2 for axis in range(3)]))
+                                   for leg in range(4)])
+        previous = current
+    return largest
+
+
+def ramp(continuous):
+    quadruped = make_quadruped(continuous, duty_tables=False)  # tip positions tracked on every frame
+    controller = quadruped.web_controller
+    misses = quadruped.gait.cache_misses
+    for speed, stride in ((100, 100), (200, 100), (50, 100), (50, 60)):
+        controller.apply_control({'speed': speed, 'stride': stride})
+        changing = largest_step(quadruped, 50)  # the factors move at gait_scale_rate: 1 s covers any step
+        settled = largest_step(quadruped, 100)
+        if continuous:
+            frames_per_cycle = quadruped.phase_gait.spec.cycle_ms / quadruped.gait.frame_time_ms / quadruped.gait_cadence
+        else:
+            frames_per_cycle = len(quadruped.gait_path) / quadruped.gait_cadence
+        print('ramp  {0:10s} speed {1:3d} % stride {2:3d} %: {3:5.1f} frames/cycle, largest tip step {4:5.1f} mm/frame '
+              'while changing, {5:5.1f} settled'.format('phase gait' if continuous else 'paths', speed, stride,
+                                                       frames_per_cycle, changing, settled))
+    print('ramp  {0:10s} paths generated during the ramp: {1}'.format(
+        'phase gait' if continuous else 'paths', quadruped.gait.cache_misses - misses))
+
+
+def tick_us(quadruped, frames=2000):
+    start = time.perf_counter()
+    for i in range(frames):
+        quadruped.tick()
+    return (time.perf_counter() - start) * 1e6 / frames
+
+
+def cost():
+    quadruped = make_quadruped()
+    nominal = tick_us(quadruped)
+    quadruped.web_controller.apply_control({'speed': 150})
+    for i in range(30):
+        quadruped.tick()
+    resampled = tick_us(quadruped)
+    start = time.perf_counter()
+    for i in range(20):
+        quadruped.gait.gen_path(GAIT_TROT, MOVE_FORWARD, 1)
+    regenerate = (time.perf_counter() - start) * 1e6 / 20
+    print('cost  tick {0:5.1f} us nominal (duty tables), {1:5.1f} us resampled; regenerating a path {2:5.1f} us'.format(
+        nominal, resampled, regenerate))
+
+
+if __name__ == '__main__':
+    ramp(False)
+    ramp(True)
+    cost()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+WebController.loop with the incremental HttpRequest parser against awkward clients:
+
+fragmented   headers and body sent in 7-byte pieces 5 ms apart (a single recv(1024) used to see only the first piece)
+large        a 1.5 KB control body (more than the old 1024-byte recv)
+slow         a client that sends half a request and stalls: how long a normal request has to wait behind it
+malformed    bad Content-Length / no request line: answered with 400 instead of being guessed at
+invalid      valid json that is no control object ([], {"joy.x": "a"} in POSE mode): 400, nothing applied, and the
+             next normal request is still served; out-of-range POSE joystick values are limited to +-100
+
+plus parser cost per joystick request: HttpRequest.feed + body_json vs. the old decode/partition/json.loads.
+
+usage: python tools/bench_http_parser.py
+"""
+import json
+import time
+import socket
+import _thread
+import hoststub
+
+hoststub.install()
+
+from controller import WebController, CONTROL_PATH, HTTP_TIMEOUT_MS
+from http_request import HttpRequest
+from gait import MODE_POSE
+from bench_control import free_port, request
+
+
+def raw_request(method, path, body):
+    return '{0} {1} HTTP/1.1\r\nHost: nodequad\r\nContent-Type: application/json\r\nContent-Length: {2}\r\n\r\n{3}'.format(
+        method, path, len(body), body).encode()
+
+
+def send_pieces(port, data, piece, delay):
+    conn = socket.create_connection(('127.0.0.1', port))
+    for i in range(0, len(data), piece):
+        conn.sendall(data[i:i + piece])
+        time.sleep(delay)
+    reply = b''
+    while True:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        reply += chunk
+    conn.close()
+    return reply
+
+
+def fragmented(port, controller):
+    controller.apply_control({'button': 'POSE'})
+    body = json.dumps({'joy.x': 37, 'joy.y': -12})
+    reply = send_pieces(port, raw_request('POST', CONTROL_PATH, body), 7, 0.005)
+    ok = reply.startswith(b'HTTP/1.1 200') and controller.rc_pose[3:5] == [37, -12]
+    print('fragmented   {0}  reply {1!r}  pose {2}'.format('ok  ' if ok else 'FAIL', reply.split(b'\r\n')[0],
+                                                          controller.rc_pose))
+
+
+def large(port, controller):
+    body = json.dumps({'joy.x': -55, 'joy.y': 21, 'padding': 'x' * 1500})
+    reply = send_pieces(port, raw_request('POST', CONTROL_PATH, body), 4096, 0)
+    ok = reply.startswith(b'HTTP/1.1 200') and controller.rc_pose[3:5] == [-55, 21]
+    print('large        {0}  {1} byte body, reply {2!r}'.format('ok  ' if ok else 'FAIL', len(body),
+                                                               reply.split(b'\r\n')[0]))
+
+
+def slow(port):
+    stalled = socket.create_connection(('127.0.0.1', port))
+    stalled.sendall(raw_request('POST', CONTROL_PATH, json.dumps({'joy.x': 1}))[:40])  # and never the rest
+    time.sleep(0.05)
+    start = time.perf_counter()
+    received = request(port, 'POST', CONTROL_PATH, json.dumps({'joy.x': 2}))
+    waited = (time.perf_counter() - start) * 1000
+    reply = stalled.recv(4096)
+    stalled.close()
+    ok = received > 0 and waited < HTTP_TIMEOUT_MS + 200 and reply.startswith(b'HTTP/1.1 408')
+    print('slow         {0}  next request waited {1:.0f} ms (timeout {2} ms), stalled client got {3!r}'.format(
+        'ok  ' if ok else 'FAIL', waited, HTTP_TIMEOUT_MS, reply.split(b'\r\n')[0]))
+
+
+def malformed(port):
+    for name, data in (('bad length', b'POST /control HTTP/1.1\r\nContent-Length: abc\r\n\r\n{}'),
+                       ('no request line', b'\r\n\r\n')):
+        reply = send_pieces(port, data, 4096, 0)
+        ok = reply.startswith(b'HTTP/1.1 400')
+        print('malformed    {0}  {1}: {2!r}'.format('ok  ' if ok else 'FAIL', name, reply.split(b'\r\n')[0]))
+
+
+def invalid(port, controller):
+    controller.apply_control({'button': 'POSE'})
+    controller.apply_control({'joy.x': 10, 'joy.y': 10})
+    for name, body in (('array', '[]'), ('text joystick', '{"joy.x": "a"}'), ('button object', '{"button": {}}'),
+                       ('short calibration', '{"calibration": [1, 2]}')):
+        reply = send_pieces(port, raw_request('POST', CONTROL_PATH, body), 4096, 0)
+        ok = reply.startswith(b'HTTP/1.1 400') and controller.rc_pose[3:5] == [10, 10]
+        print('invalid      {0}  {1} {2}: {3!r}'.format('ok  ' if ok else 'FAIL', name, body, reply.split(b'\r\n')[0]))
+    reply = send_pieces(port, raw_request('POST', CONTROL_PATH, json.dumps({'joy.x': 30, 'joy.y': -30})), 4096, 0)
+    ok = reply.startswith(b'HTTP/1.1 200') and controller.rc_pose[3:5] == [30, -30]
+    print('invalid      {0}  then a normal request: {1!r}, pose {2}'.format(
+        'ok  ' if ok else 'FAIL', reply.split(b'\r\n')[0], controller.rc_pose))
+    reply = send_pieces(port, raw_request('POST', CONTROL_PATH, json.dumps({'joy.x': 500, 'joy.y': '-127'})), 4096, 0)
+    ok = reply.startswith(b'HTTP/1.1 200') and controller.rc_pose[3:5] == [100, -100]
+    print('invalid      {0}  out of range joystick: {1!r}, pose {2}'.format(
+        'ok  ' if ok else 'FAIL', reply.split(b'\r\n')[0], controller.rc_pose))
+
+
+def parse_cost(num=20000):
+    data = raw_request('POST', CONTROL_PATH, json.dumps({'joy.x': 20, 'joy.y': -35}))
+    parser = HttpRequest()
+    start = time.perf_counter()
+    for i in range(num):
+        parser.reset()
+        parser.feed(data)
+        parser.body_json()
+    new = (time.perf_counter() - start) * 1e6 / num
+    start = time.perf_counter()
+    for i in range(num):
+        header, _, json_string = data.decode().partition('\r\n\r\n')
+        json.loads(json_string)
+    old = (time.perf_counter() - start) * 1e6 / num
+    print('parse cost   HttpRequest {0:.2f} us/request, decode+partition {1:.2f} us/request (no Content-Length check)'.format(
+        new, old))
+
+
+if __name__ == '__main__':
+    port = free_port()
+    controller = WebController('127.0.0.1')
+    _thread.start_new_thread(controller.loop, (port,))
+    time.sleep(0.2)
+    fragmented(port, controller)
+    large(port, controller)
+    slow(port)
+    malformed(port)
+    invalid(port, controller)
+    parse_cost()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+I2C cost per gait frame on a transaction-counting fake bus:
+
+per-joint  each leg writes its 3 joints (Servo.set_angle -> PCA9685.duty), 12 transactions
+burst      NodeQuad.move_legs_tips -> Servo.set_angles -> PCA9685.set_all_pwm, 1 transaction
+dirty      as above, but channels whose duty did not change are not sent (PCA9685 duty cache)
+
+'no cache' runs invalidate the duty cache before every frame, i.e. every channel is rewritten.
+
+usage: python tools/bench_i2c.py [cycles]
+"""
+import sys
+import time
+import hoststub
+
+hoststub.install()
+
+from machine import I2C
+from nodequad import NodeQuad
+from setting import pca_i2c_adr, pca_i2c_freq, pulse_min, pulse_max, pulse_freq
+from gait import GAIT_TROT, MOVE_FORWARD
+
+
+def per_joint(quadruped, frame):
+    for leg_index in range(4):
+        quadruped.legs[leg_index].move_tip(frame[leg_index])
+
+
+def burst(quadruped, frame):
+    quadruped.move_legs_tips(frame, local=False)
+
+
+def run(name, move, cycles, cached=True, merge_gap=0):
+    i2c = I2C(freq=pca_i2c_freq)
+    quadruped = NodeQuad('127.0.0.1', i2c, pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    pca9685 = quadruped.servo.pca9685
+    pca9685.merge_gap = merge_gap
+    path = quadruped.gait.gen_path(GAIT_TROT, MOVE_FORWARD)
+    i2c.reset_counters()
+    pca9685.writes_skipped = 0
+    frames = 0
+    start = time.perf_counter()
+    for cycle in range(cycles):
+        for frame in path:
+            if not cached:
+                pca9685.invalidate()
+            move(quadruped, frame)
+            frames += 1
+    cpu_us = (time.perf_counter() - start) * 1000000 / frames
+    print('{0:24s} {1:5.1f} transactions/frame  {2:5.1f} bytes/frame  {3:7.1f} us bus time/frame @ {4} Hz  '
+          '{5:5.1f} writes skipped/frame  {6:6.1f} us host cpu/frame'.format(
+              name, i2c.transactions / frames, i2c.bytes_written / frames, i2c.bus_time_us() / frames, pca_i2c_freq,
+              pca9685.writes_skipped / frames, cpu_us))
+    return i2c.registers[pca_i2c_adr]
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    registers = [run('per-joint (no cache)', per_joint, cycles, cached=False),
+                 run('burst (no cache)', burst, cycles, cached=False),
+                 run('per-joint + dirty', per_joint, cycles),
+                 run('burst + dirty', burst, cycles),
+                 run('burst + dirty, gap 1', burst, cycles, merge_gap=1)]
+    assert all(regs == registers[0] for regs in registers)  # same servo outputs either way
+
+
+if __name__ == '__main__':
+    main()
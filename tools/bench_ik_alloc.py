@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+4-leg world->local transform + IK: list-returning API vs. the *_into API writing into caller-owned buffers.
+
+CPython:            us per solve and tracemalloc peak of temporaries per solve
+MicroPython (unix): us per solve and exact heap bytes allocated per solve (gc disabled, gc.mem_alloc deltas),
+                    boxed floats included; run from tools/: micropython bench_ik_alloc.py
+
+usage: python tools/bench_ik_alloc.py [solves]
+"""
+import sys
+import gc
+
+MICROPYTHON = sys.implementation.name == 'micropython'
+if MICROPYTHON:
+    import os
+    sys.path.insert(0, '../nodequad')
+    os.chdir('../nodequad')
+    from time import ticks_us, ticks_diff
+else:
+    import time
+    import tracemalloc
+    import hoststub
+    hoststub.install()
+    ticks_us = lambda: int(time.perf_counter() * 1000000)
+    ticks_diff = lambda new, old: new - old
+
+from array import array
+from leg import Leg
+from gait import Gait, GAIT_TROT, MOVE_FORWARD
+
+
+class NoServo:
+    pass
+
+
+def solve_lists(legs, frame, out):
+    for leg_index in range(4):
+        leg = legs[leg_index]
+        angles = Leg.local_ik(leg.translate2local(frame[leg_index]))
+        out[leg_index] = angles
+
+
+LOCAL_BUF = [0.0, 0.0, 0.0]
+
+
+def solve_into(legs, frame, out):
+    for leg_index in range(4):
+        Leg.local_ik_into(legs[leg_index].translate2local_into(frame[leg_index], LOCAL_BUF), out, 3 * leg_index)
+
+
+def measure(name, solve, legs, path, out, solves):
+    frames = len(path)
+    solve(legs, path[0], out)  # warm up
+    gc.collect()
+    if MICROPYTHON:
+        gc.disable()
+        before = gc.mem_alloc()
+        for i in range(frames):
+            solve(legs, path[i], out)
+        alloc = (gc.mem_alloc() - before) / frames
+        gc.enable()
+        label = 'bytes allocated/solve'
+    else:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        for i in range(frames):
+            tracemalloc.reset_peak()
+            solve(legs, path[i], out)
+        alloc = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+        label = 'bytes peak temporaries/solve'
+    start = ticks_us()
+    for i in range(solves):
+        solve(legs, path[i % frames], out)
+    elapsed = ticks_diff(ticks_us(), start)
+    print('{0:6s} {1:7.2f} us/solve  {2:7.1f} {3}'.format(name, elapsed / solves, alloc, label))
+
+
+def main():
+    solves = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    legs = [Leg(NoServo(), i) for i in range(4)]
+    path = Gait().gen_path(GAIT_TROT, MOVE_FORWARD)
+    measure('lists', solve_lists, legs, path, [None] * 4, solves)
+    measure('into', solve_into, legs, path, array('f', [0.0] * 12), solves)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Per-stage frame timing (metrics.py): tick() cost with the instrumentation off and on, then the
+/metrics report of a MOVE (per-frame IK, no duty tables) and a POSE run, fetched through WebController.
+
+usage: python tools/bench_metrics.py [frames]
+"""
+import sys
+import time
+import hoststub
+
+hoststub.install()
+
+from machine import I2C
+from nodequad import NodeQuad
+from metrics import metrics
+from gait import MOVE_FORWARD
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+
+
+def make_quadruped(pose):
+    quadruped = NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    quadruped.use_duty_tables = False
+    quadruped.pose_change_detection = False  # recompute every POSE frame so both runs do work each tick
+    controller = quadruped.web_controller
+    if pose:
+        controller.apply_control({'button': 'POSE'})
+        controller.apply_control({'joy.x': 60, 'joy.y': -40})
+    else:
+        controller.rc_moving_status = MOVE_FORWARD
+        controller.publish()
+    return quadruped
+
+
+def run(frames, pose, enabled):
+    metrics.enabled = enabled
+    metrics.reset()
+    quadruped = make_quadruped(pose)
+    for i in range(20):  # warm up (path generation, first transition)
+        quadruped.tick()
+    metrics.reset()
+    start = time.perf_counter()
+    for i in range(frames):
+        quadruped.tick()
+    elapsed = time.perf_counter() - start
+    return elapsed * 1e6 / frames, quadruped
+
+
+if __name__ == '__main__':
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for name, pose in (('MOVE', False), ('POSE', True)):
+        off, quadruped = run(frames, pose, False)
+        on, quadruped = run(frames, pose, True)
+        print('{0}: tick {1:6.1f} us/frame metrics off, {2:6.1f} us/frame on ({3:+.0f} %)'.format(
+            name, off, on, (on - off) * 100 / off))
+        chunks, upgraded = quadruped.web_controller.handle_request('GET /metrics?text HTTP/1.1\r\n\r\n')
+        print(chunks[1].decode())
+    metrics.enabled = False
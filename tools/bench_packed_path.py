@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Nested-list gait paths vs. gait.PackedPath (flat array('f')):
+heap per path (tracemalloc on CPython; on a board compare gc.mem_free() around the same calls)
+and the cost of feeding one frame to the legs (move_legs_tips vs. move_legs_tips_packed).
+
+usage: python tools/bench_packed_path.py [cycles]
+"""
+import sys
+import time
+import tracemalloc
+import hoststub
+
+hoststub.install()
+
+from machine import I2C
+from nodequad import NodeQuad
+from gait import Gait, PackedPath, GAIT_TROT, GAIT_WALK, GAIT_GALLOP, GAIT_CREEP, MOVE_FORWARD
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+
+GAITS = (('trot', GAIT_TROT), ('walk', GAIT_WALK), ('gallop', GAIT_GALLOP), ('creep', GAIT_CREEP))
+
+
+def traced(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return obj, size
+
+
+def memory():
+    gait = Gait()
+    for name, gait_mode in GAITS:
+        nested, nested_bytes = traced(lambda: gait.gen_path(gait_mode, MOVE_FORWARD))
+        packed, packed_bytes = traced(lambda: PackedPath(nested))
+        print('{0:7s} {1:3d} frames  nested {2:6d} bytes  packed {3:5d} bytes  ({4:.1f}x)'.format(
+            name, len(nested), nested_bytes, packed_bytes, nested_bytes / packed_bytes))
+
+
+def playback(cycles):
+    quadruped = NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    for name, gait_mode in GAITS:
+        nested = quadruped.gait.gen_path(gait_mode, MOVE_FORWARD)
+        packed = PackedPath(nested)
+        timings = []
+        for move in (lambda i: quadruped.move_legs_tips(nested[i], local=False),
+                     lambda i: quadruped.move_legs_tips_packed(packed, i)):
+            start = time.perf_counter()
+            for cycle in range(cycles):
+                for frame_id in range(len(nested)):
+                    move(frame_id)
+            timings.append((time.perf_counter() - start) * 1000000 / (cycles * len(nested)))
+        print('{0:7s} nested {1:6.1f} us/frame  packed {2:6.1f} us/frame'.format(name, timings[0], timings[1]))
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    memory()
+    playback(cycles)
+
+
+if __name__ == '__main__':
+    main()
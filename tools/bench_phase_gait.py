@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Phase clock gait (phase_gait.py) against the precomputed paths (gait.py):
+
+match        largest tip difference to Gait.gen_path at full stride, every gait and direction
+frame        tick() cost in MOVE mode (per-frame IK in both, no duty tables)
+direction    cost of the frame that picks up a direction change (path switch vs. new velocity) and the largest
+             tip step of any leg in the 20 frames after it, next to the largest step while walking straight
+joystick     a joystick circled once in 4 s (200 ms samples): the heading the body actually follows, and
+             out-of-range / non-numeric joystick values: the velocity command stays within +-100 %
+
+usage: python tools/bench_phase_gait.py [frames]
+"""
+import sys
+import time
+from math import atan2, cos, sin, pi, sqrt
+import hoststub
+
+hoststub.install()
+
+from machine import I2C
+from nodequad import NodeQuad
+from phase_gait import PhaseGait
+from gait import Gait, GAIT_TROT, GAIT_WALK, GAIT_GALLOP, GAIT_CREEP
+from gait import MOVE_FORWARD, MOVE_BACKWARD, MOVE_LEFTSHIFT, MOVE_RIGHTSHIFT, MOVE_RIGHTROTATE
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+
+GAITS = (('trot', GAIT_TROT), ('walk', GAIT_WALK), ('gallop', GAIT_GALLOP), ('creep', GAIT_CREEP))
+DIRECTIONS = ((MOVE_FORWARD, (1, 0, 0)), (MOVE_BACKWARD, (-1, 0, 0)), (MOVE_LEFTSHIFT, (0, -1, 0)),
+              (MOVE_RIGHTSHIFT, (0, 1, 0)), (MOVE_RIGHTROTATE, (0, 0, 1)))
+
+
+def match():
+    gait = Gait()
+    for name, gait_mode in GAITS:
+        engine = PhaseGait(gait.amplitudeX, gait.amplitudeZ, gait_mode=gait_mode)
+        worst = 0.0
+        for move_status, (ux, uy, uyaw) in DIRECTIONS:
+            path = gait.gen_path(gait_mode, move_status)
+            engine.velocity[:] = [ux * engine.max_speed(), uy * engine.max_speed(), uyaw * 10 * engine.max_yaw_rate()]
+            engine._update_stride()
+            for frame_id in range(len(path)):
+                engine.phase = frame_id / len(path)
+                tips = engine.tips()
+                worst = max([worst] + [abs(tips[leg][axis] - path[frame_id][leg][axis])
+                                       for leg in range(4) for axis in range(3)])
+        print('match      {0:7s} max |phase gait - path| {1:5.2f} mm'.format(name, worst))
+
+
+def make_quadruped(continuous):
+    quadruped = NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    quadruped.use_duty_tables = False
+    quadruped.use_phase_gait = continuous
+    quadruped.gait.clear_cache()
+    return quadruped
+
+
+def press(quadruped, button):
+    quadruped.web_controller.apply_control({'button': button})
+
+
+def frame(frames):
+    for name, continuous in (('paths', False), ('phase gait', True)):
+        quadruped = make_quadruped(continuous)
+        press(quadruped, 'FORWARD')
+        for i in range(30):
+            quadruped.tick()
+        start = time.perf_counter()
+        for i in range(frames):
+            quadruped.tick()
+        print('frame      {0:10s} tick {1:6.1f} us/frame'.format(name, (time.perf_counter() - start) * 1e6 / frames))
+
+
+def tip_step(quadruped, previous):
+    tips = [list(leg.tip_position()) for leg in quadruped.legs]
+    step = max([sqrt(sum([(tips[leg][axis] - previous[leg][axis]) ** 2 for axis in range(3)])) for leg in range(4)])
+    return step, tips
+
+
+def direction():
+    for name, continuous in (('paths', False), ('phase gait', True)):
+        quadruped = make_quadruped(continuous)
+        press(quadruped, 'FORWARD')
+        for i in range(17):
+            quadruped.tick()
+        steady, previous = 0.0, [list(leg.tip_position()) for leg in quadruped.legs]
+        for i in range(20):  # the swing's own speed, for comparison
+            quadruped.tick()
+            step, previous = tip_step(quadruped, previous)
+            steady = max(steady, step)
+        press(quadruped, 'RIGHTSHIFT')
+        previous = [list(leg.tip_position()) for leg in quadruped.legs]
+        start = time.perf_counter()
+        quadruped.tick()  # the frame that picks up the new direction
+        switch_us = (time.perf_counter() - start) * 1e6
+        largest, previous = tip_step(quadruped, previous)
+        for i in range(20):
+            quadruped.tick()
+            step, previous = tip_step(quadruped, previous)
+            largest = max(largest, step)
+        print('direction  {0:10s} switch frame {1:7.1f} us, largest tip step after it {2:5.1f} mm/frame '
+              '(straight ahead {3:5.1f})'.format(name, switch_us, largest, steady))
+
+
+def joystick():
+    """mean heading error over the circle: the paths can only go along the 4 button directions"""
+    quadruped = make_quadruped(True)
+    engine = quadruped.phase_gait
+    controller = quadruped.web_controller
+    errors = []
+    for sample in range(20):
+        angle = 2 * pi * sample / 20
+        controller.apply_control({'joy.x': int(80 * sin(angle)), 'joy.y': int(80 * cos(angle))})
+        for i in range(10):  # 200 ms of frames
+            quadruped.tick()
+        heading = atan2(engine.velocity[1], engine.velocity[0])
+        errors.append(abs((heading - angle + pi) % (2 * pi) - pi))
+    snapped = [abs((angle - round(angle / (pi / 2)) * pi / 2 + pi) % (2 * pi) - pi)
+               for angle in [2 * pi * sample / 20 for sample in range(20)]]
+    print('joystick   phase gait mean heading error {0:4.1f} deg (lags 200 ms samples by the accel limit), '
+          'nearest button direction {1:4.1f} deg'.format(sum(errors) / len(errors) * 180 / pi,
+                                                         sum(snapped) / len(snapped) * 180 / pi))
+    for ctrl_quantity, expected in (({'joy.x': 127, 'joy.y': -128}, [-100, 100, 0]),
+                                    ({'joy.x': '-60', 'joy.y': 1e9, 'joy.z': -500}, [100, -60, -100]),
+                                    ({'joy.x': 'a', 'joy.y': [], 'joy.z': 50}, [0, 0, 50])):
+        controller.apply_control(ctrl_quantity)
+        velocity = controller.command.velocity
+        print('joystick   {0}  {1} -> velocity command {2}'.format(
+            'ok  ' if list(velocity) == expected else 'FAIL', ctrl_quantity, list(velocity)))
+
+
+if __name__ == '__main__':
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    match()
+    frame(frames)
+    direction()
+    joystick()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+POSE mode CPU use of the control loop while the remote mostly holds still: the panel posts a joystick
+sample every 200 ms, the stick is held with +-1 unit of jitter and moved now and then.
+
+every frame      pose pipeline (map_rc_pose, pose_transform, IK, I2C) rerun on every frame
+change detect    rerun only when WebController.rc_pose_version changed (deadband 0)
++ deadband       the same with the default pose_deadband of setting.py
+
+CPU = time spent in NodeQuad.tick() / wall time of the real-time 50 Hz loop.
+
+usage: python tools/bench_pose_idle.py [seconds_per_run]
+"""
+import sys
+import time
+import random
+import hoststub
+
+hoststub.install()
+
+from machine import I2C
+from nodequad import NodeQuad
+from gait import MODE_POSE
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq, pose_deadband
+
+SAMPLE_FRAMES = 10  # 200 ms at 20 ms per frame
+
+
+def joystick(frame):
+    """held stick with jitter, a new position every 3 s"""
+    base = ((frame // 150) % 3 - 1) * 60
+    return {'joy.x': base + random.randint(-1, 1), 'joy.y': -base // 2 + random.randint(-1, 1)}
+
+
+def run(seconds, detection, deadband):
+    random.seed(1)
+    i2c = I2C()
+    quadruped = NodeQuad('127.0.0.1', i2c, pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    quadruped.pose_change_detection = detection
+    controller = quadruped.web_controller
+    controller.pose_deadband = deadband
+    controller.apply_control({'button': 'POSE'})
+    quadruped.tick()
+    i2c.reset_counters()
+    busy = 0.0
+    frame = 0
+    scheduler = quadruped.scheduler
+    scheduler.start()
+    start = time.perf_counter()
+    end = start + seconds
+    while time.perf_counter() < end:
+        if frame % SAMPLE_FRAMES == 0:
+            controller.apply_control(joystick(frame))
+        t0 = time.perf_counter()
+        quadruped.tick()
+        busy += time.perf_counter() - t0
+        scheduler.wait()
+        frame += 1
+    elapsed = time.perf_counter() - start
+    assert quadruped.mode == MODE_POSE
+    return frame, busy / elapsed, busy * 1e6 / frame, i2c.transactions / frame
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    for name, detection, deadband in (('every frame', False, 0), ('change detect', True, 0),
+                                      ('+ deadband {0}'.format(pose_deadband), True, pose_deadband)):
+        frames, cpu, tick_us, transactions = run(seconds, detection, deadband)
+        print('{0:14s} frames {1:4d}  CPU {2:5.2f} %  {3:6.1f} us/frame  {4:4.2f} i2c transactions/frame'.format(
+            name, frames, cpu * 100, tick_us, transactions))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+POSE mode motion from sparse remote input: the panel sends a joystick sample every 200 ms (5 Hz) while
+the control loop runs at 50 Hz. Compares the joint motion with the pose applied as it arrives (steps)
+against PoseFilter smoothing: largest joint step per frame, frames the servos actually move,
+and the summed squared joint step (a proxy for the servo current spikes).
+
+usage: python tools/bench_pose_smoothing.py [seconds]
+"""
+import sys
+import hoststub
+
+hoststub.install()
+
+from math import sin, pi
+from machine import I2C
+from nodequad import NodeQuad
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq, pose_smoothing_hz
+
+SAMPLE_FRAMES = 10  # 200 ms at 20 ms per frame
+
+
+def joystick(frame):
+    """slow circle of the stick, sampled at 5 Hz"""
+    t = frame * 0.02
+    return {'joy.x': int(90 * sin(2 * pi * 0.3 * t)), 'joy.y': int(90 * sin(2 * pi * 0.3 * t + pi / 2))}
+
+
+def run(frames, use_filter):
+    quadruped = NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    quadruped.use_pose_filter = use_filter
+    controller = quadruped.web_controller
+    controller.apply_control({'button': 'POSE'})
+    quadruped.tick()
+    previous = [list(leg.joint_angles) for leg in quadruped.legs]
+    max_step, moving, energy = 0.0, 0, 0.0
+    for frame in range(frames):
+        if frame % SAMPLE_FRAMES == 0:
+            controller.apply_control(joystick(frame))
+        quadruped.tick()
+        angles = [list(leg.joint_angles) for leg in quadruped.legs]
+        steps = [abs(angles[i][j] - previous[i][j]) for i in range(4) for j in range(3)]
+        max_step = max(max_step, max(steps))
+        moving += 1 if max(steps) > 1e-6 else 0
+        energy += sum([step * step for step in steps])
+        previous = angles
+    return max_step, moving, energy
+
+
+if __name__ == '__main__':
+    frames = int(float(sys.argv[1]) * 50) if len(sys.argv) > 1 else 500
+    for name, use_filter in (('steps (no filter)', False), ('PoseFilter {0} Hz'.format(pose_smoothing_hz), True)):
+        max_step, moving, energy = run(frames, use_filter)
+        print('{0:20s} max joint step {1:5.2f} deg/frame  moving frames {2:3d}/{3}  sum step^2 {4:8.1f}'.format(
+            name, max_step, moving, frames, energy))
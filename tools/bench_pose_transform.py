@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+POSE mode body pose -> local tip positions: fused NodeQuad.pose_transform vs. the homogeneous-matrix
+pose_transform_matrix. Checks both give the same tips over random poses, then times one call of each.
+
+usage: python tools/bench_pose_transform.py [calls]
+"""
+import sys
+import time
+import random
+import hoststub
+
+hoststub.install()
+
+from math import pi
+from machine import I2C
+from nodequad import NodeQuad
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+
+TOLERANCE_MM = 1e-9
+
+
+def random_pose():
+    # rc_pose spans -100..100, map_rc_pose scales the orientation to +-15 degree
+    pos = [random.uniform(-100, 100) for i in range(3)]
+    orn = [random.uniform(-100, 100) * 15 / 100 * pi / 180 for i in range(3)]
+    return pos, orn
+
+
+def check(quadruped, poses):
+    err = 0.0
+    for pos, orn in poses:
+        fused = quadruped.pose_transform(pos, orn)
+        reference = quadruped.pose_transform_matrix(pos, orn)
+        for leg_index in range(4):
+            for axis in range(3):
+                err = max(err, abs(fused[leg_index][axis] - reference[leg_index][axis]))
+    assert err < TOLERANCE_MM, err
+    return err
+
+
+def timed(transform, poses):
+    best = None
+    for repeat in range(5):
+        start = time.perf_counter()
+        for pos, orn in poses:
+            transform(pos, orn)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6 / len(poses)
+
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random.seed(1)
+    quadruped = NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    poses = [random_pose() for i in range(calls)]
+    poses.append(([0, 0, 0], [0, 0, 0]))
+    err = check(quadruped, poses)
+    print('equivalence: {0} poses, max |fused - matrix| {1:.1e} mm'.format(len(poses), err))
+    t_matrix = timed(quadruped.pose_transform_matrix, poses)
+    t_fused = timed(quadruped.pose_transform, poses)
+    print('pose_transform_matrix {0:7.2f} us/call'.format(t_matrix))
+    print('pose_transform        {0:7.2f} us/call  ({1:.1f}x)'.format(t_fused, t_matrix / t_fused))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Frame timing of the NodeQuad main loop on a fake I2C bus, with a busy thread competing for
+the GIL (like the web server thread does on the ESP32):
+
+legacy     tick() followed by a fixed sleep_ms(15)
+scheduler  tick() followed by FrameScheduler.wait() (absolute ticks_us deadline)
+
+usage: python tools/bench_scheduler.py [seconds_per_run]
+"""
+import sys
+import time
+import _thread
+import hoststub
+
+hoststub.install()
+
+from utime import sleep_ms
+from machine import I2C
+from nodequad import NodeQuad
+from scheduler import FrameScheduler
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+from gait import MOVE_FORWARD
+
+busy = [True]
+
+
+def load():
+    x = 0
+    while busy[0]:
+        x = (x * 31 + 7) % 1000003
+
+
+def make_quadruped():
+    quadruped = NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    quadruped.web_controller.rc_moving_status = MOVE_FORWARD
+    quadruped.web_controller.publish()
+    return quadruped
+
+
+def run_legacy(seconds):
+    quadruped = make_quadruped()
+    meter = FrameScheduler(quadruped.gait.frame_time_ms)  # only used to record periods
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        meter.frame_start()
+        quadruped.tick()
+        sleep_ms(15)
+    return meter.stats()
+
+
+def run_scheduler(seconds, catch_up=False):
+    quadruped = make_quadruped()
+    scheduler = quadruped.scheduler
+    scheduler.catch_up = catch_up
+    scheduler.start()
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        quadruped.tick()
+        scheduler.wait()
+    return scheduler.stats()
+
+
+def report(name, stats):
+    print('{0:22s} frames {1:4d}  mean period {2:7.0f} us (nominal {3} us)  max {4:6d} us  overrun {5}  skipped {6}'.format(
+        name, stats['frames'], stats['mean_period_us'], stats['period_us'], stats['max_period_us'],
+        stats['overrun'], stats['skipped']))
+    print('{0:22s} jitter histogram ({1} us bins): {2}'.format('', stats['jitter_bin_us'], stats['jitter_hist']))
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    _thread.start_new_thread(load, ())
+    report('legacy sleep_ms(15)', run_legacy(seconds))
+    report('scheduler (skip)', run_scheduler(seconds))
+    report('scheduler (catch up)', run_scheduler(seconds, catch_up=True))
+    busy[0] = False
+
+
+if __name__ == '__main__':
+    main()
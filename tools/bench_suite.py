@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Hot path benchmark suite (CPython, stub hardware) with a stored baseline.
+
+Cases: Gait.gen_path for every gait and direction, Leg.local_ik, NodeQuad.pose_transform,
+Servo.set_angle through PCA9685 (I2C bytes counted), WebController.process_panel parsing and the
+HTTP round trip of WebController.loop. Every timing is the best of several repeats and is also
+stored relative to a fixed pure-Python reference loop ('norm') timed between those repeats, so a
+slow phase of the host slows both and baselines recorded on another machine stay comparable. The
+whole suite runs --rounds times and each case keeps its median round. Gate: --tolerance, 1.3 by
+default; --noisy allows 2.0 for hosts where that is too tight. Counts (I2C bytes, response bytes)
+must match exactly.
+
+usage: python tools/bench_suite.py [--out results.json] [--baseline tools/bench_baseline.json]
+                                   [--update-baseline] [--tolerance 1.3] [--noisy] [--rounds 5]
+exit status 1 if a case is slower than tolerance x baseline (normalized) or a count changed
+"""
+import os
+import sys
+import json
+import time
+import _thread
+import hoststub
+
+START_DIR = os.getcwd()  # hoststub.install() changes into nodequad/, paths on the command line are relative to here
+hoststub.install()
+
+from math import pi
+from machine import I2C
+from leg import Leg
+from gait import Gait, GAIT_TROT, GAIT_WALK, GAIT_GALLOP, GAIT_CREEP
+from gait import MOVE_STANDBY, MOVE_FORWARD, MOVE_BACKWARD, MOVE_LEFTSHIFT, MOVE_RIGHTSHIFT, MOVE_LEFTROTATE, \
+    MOVE_RIGHTROTATE
+from nodequad import NodeQuad
+from controller import WebController, CONTROL_PATH
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq, p1_x, p1_y, p1_z
+from bench_control import free_port, request
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(TOOLS_DIR, 'bench_baseline.json')
+GAITS = (('trot', GAIT_TROT), ('walk', GAIT_WALK), ('gallop', GAIT_GALLOP), ('creep', GAIT_CREEP))
+DIRECTIONS = (('standby', MOVE_STANDBY), ('forward', MOVE_FORWARD), ('backward', MOVE_BACKWARD),
+              ('leftshift', MOVE_LEFTSHIFT), ('rightshift', MOVE_RIGHTSHIFT), ('leftrotate', MOVE_LEFTROTATE),
+              ('rightrotate', MOVE_RIGHTROTATE))
+REPEATS = 7
+ROUNDS = 5
+TOLERANCE, NOISY_TOLERANCE = 1.3, 2.0
+
+
+def timed(fn, calls, repeats=REPEATS):
+    """
+    best_us with the reference loop timed before every repeat -> {'us': us per call, 'norm': us / reference us}
+    the host's speed drifts by ~30% within a run, a reference right next to the case follows it
+    """
+    best = best_ref = None
+    for r in range(repeats):
+        ref_us = best_us(reference, 5, 1)
+        best_ref = ref_us if best_ref is None or ref_us < best_ref else best_ref
+        us = best_us(fn, calls, 1)
+        best = us if best is None or us < best else best
+    return {'us': best, 'norm': best / best_ref}
+
+
+def best_us(fn, calls, repeats=REPEATS):
+    """best of 'repeats' runs of 'calls' calls of fn, in us per call"""
+    best = None
+    for r in range(repeats):
+        start = time.perf_counter()
+        for i in range(calls):
+            fn()
+        elapsed = (time.perf_counter() - start) * 1000000 / calls
+        best = elapsed if best is None or elapsed < best else best
+    return best
+
+
+def reference():
+    x = 0
+    for i in range(1000):
+        x = (x * 31 + i) % 1000003
+    return x
+
+
+def make_quadruped():
+    return NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+
+
+def case_gen_path(results):
+    gait = Gait()
+    for gait_name, gait_mode in GAITS:
+        for direction_name, move_status in DIRECTIONS:
+            results['gen_path.{0}.{1}'.format(gait_name, direction_name)] = timed(
+                lambda: gait.gen_path(gait_mode, move_status), 20)
+
+
+def case_local_ik(results):
+    point = (p1_x - 20, p1_y + 10, p1_z + 5)
+    results['leg.local_ik'] = timed(lambda: Leg.local_ik(point), 2000)
+
+
+def case_pose_transform(results):
+    quadruped = make_quadruped()
+    pos, orn = [10, -5, 8], [9 * pi / 180, -6 * pi / 180, 3 * pi / 180]
+    results['nodequad.pose_transform'] = timed(lambda: quadruped.pose_transform(pos, orn), 1000)
+
+
+def case_set_angle(results):
+    quadruped = make_quadruped()
+    servo, i2c = quadruped.servo, quadruped.servo.pca9685.i2c
+    angles = [-20.0, 0.0, 20.0]
+    state = [0]
+
+    def sweep():
+        state[0] += 1
+        angle = angles[state[0] % 3]
+        for leg_index in range(4):
+            for part_index in range(3):
+                servo.set_angle(leg_index, part_index, angle)
+
+    calls = 200
+    sweep()
+    i2c.reset_counters()
+    result = timed(sweep, calls, 1)
+    result.update({'i2c_bytes': i2c.bytes_written // calls, 'i2c_transactions': i2c.transactions // calls})
+    results['servo.set_angle.12_joints'] = result
+
+
+def case_process_panel(results):
+    controller = WebController('127.0.0.1')
+    req = 'POST /control HTTP/1.1\r\nHost: nodequad\r\nContent-Type: application/json\r\nContent-Length: 25\r\n\r\n' \
+          '{"joy.x": 20, "joy.y": -35}'
+    results['controller.process_panel'] = timed(lambda: controller.process_panel(req), 2000)
+
+
+def case_http(results):
+    port = free_port()
+    controller = WebController('127.0.0.1')
+    _thread.start_new_thread(controller.loop, (port,))
+    time.sleep(0.2)
+    body = json.dumps({'joy.x': 20, 'joy.y': -35})
+    received = [0]
+
+    def post():
+        received[0] = request(port, 'POST', CONTROL_PATH, body)
+
+    result = timed(post, 50)
+    result['response_bytes'] = received[0]
+    results['controller.loop.http_control'] = result
+
+
+CASES = (case_gen_path, case_local_ik, case_pose_transform, case_set_angle, case_process_panel, case_http)
+
+
+def run_round():
+    """every case once -> (reference_us, results)"""
+    references = []
+    results = {}
+    for case in CASES:
+        references.append(best_us(reference, 100))  # only reported, every case has its own reference (timed)
+        case(results)
+    return min(references), results
+
+
+def run(rounds=ROUNDS):
+    """the suite 'rounds' times, per case the result of its median round (by norm)"""
+    runs = [run_round() for r in range(rounds)]
+    results = {}
+    for name in runs[0][1]:
+        results[name] = sorted([run_results[name] for ref_us, run_results in runs],
+                               key=lambda result: result['norm'])[rounds // 2]
+    ref_us = sorted([ref_us for ref_us, run_results in runs])[rounds // 2]
+    return {'python': sys.version.split()[0], 'reference_us': ref_us, 'rounds': rounds, 'results': results}
+
+
+def compare(report, baseline, tolerance):
+    """-> list of regression messages"""
+    regressions = []
+    for name, result in sorted(report['results'].items()):
+        base = baseline['results'].get(name)
+        if base is None:
+            print('{0:36s} {1:9.2f} us   (new)'.format(name, result['us']))
+            continue
+        ratio = result['norm'] / base['norm']
+        flag = ''
+        if ratio > tolerance:
+            flag = 'REGRESSION'
+            regressions.append('{0}: {1:.2f}x baseline'.format(name, ratio))
+        for key in result:
+            if key not in ('us', 'norm') and key in base and result[key] != base[key]:
+                flag = 'CHANGED'
+                regressions.append('{0}: {1} {2} -> {3}'.format(name, key, base[key], result[key]))
+        print('{0:36s} {1:9.2f} us   {2:5.2f}x baseline  {3}'.format(name, result['us'], ratio, flag))
+    return regressions
+
+
+def main(argv):
+    args = {'--out': None, '--baseline': DEFAULT_BASELINE, '--tolerance': None, '--rounds': str(ROUNDS)}
+    flags = set()
+    i = 0
+    while i < len(argv):
+        if argv[i] in args:
+            is_path = argv[i] in ('--out', '--baseline')
+            args[argv[i]] = os.path.join(START_DIR, argv[i + 1]) if is_path else argv[i + 1]
+            i += 2
+        else:
+            flags.add(argv[i])
+            i += 1
+    tolerance = args['--tolerance'] or (NOISY_TOLERANCE if '--noisy' in flags else TOLERANCE)
+    report = run(int(args['--rounds']))
+    if args['--out']:
+        with open(args['--out'], 'w') as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+    if '--update-baseline' in flags:
+        with open(args['--baseline'], 'w', newline='\r\n') as f:  # CRLF like the rest of the tree
+            json.dump(report, f, indent=1, sort_keys=True)
+        print('baseline written to {0}'.format(args['--baseline']))
+        return 0
+    if not os.path.exists(args['--baseline']):
+        print('no baseline at {0}, run with --update-baseline'.format(args['--baseline']))
+        return 0
+    with open(args['--baseline']) as f:
+        baseline = json.load(f)
+    print('reference loop {0:.1f} us (baseline {1:.1f} us)'.format(report['reference_us'], baseline['reference_us']))
+    regressions = compare(report, baseline, float(tolerance))
+    for message in regressions:
+        print(message)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
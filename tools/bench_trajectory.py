@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Trajectory lookup tables (trajectory.py) and declarative gaits (gait.GAIT_SPECS):
+
+tables    largest error of every swing/stance table (linear between LUT_SIZE samples) against its formula,
+          table memory
+profiles  touch-down behaviour of the swing curves: vertical speed at lift-off/touch-down and peak horizontal
+          speed, in units of the step per swing time
+trig      sin/cos calls per phase clock gait frame (0 expected: tables) and per generated gait path (exact curves,
+          paths are cached), largest difference of a path sampled from the tables instead
+new gait  a pace (lateral pairs) with cycloid swing, written as a GaitSpec only, generated and played
+
+usage: python tools/bench_trajectory.py
+"""
+import time
+import math
+import hoststub
+
+hoststub.install()
+
+import trajectory
+from trajectory import SWING_PROFILES, STANCE_PROFILES, LUT_SIZE, lookup, GaitCycle
+from gait import Gait, GaitSpec, GAIT_SPECS, MOVE_FORWARD, MOVE_LEFTROTATE
+from phase_gait import PhaseGait
+
+FORMULAS = {
+    'sine': (lambda s: -math.cos(math.pi * s), lambda s: math.sin(math.pi * s)),
+    'cycloid': (lambda s: 2 * (s - math.sin(2 * math.pi * s) / (2 * math.pi)) - 1,
+                lambda s: (1 - math.cos(2 * math.pi * s)) / 2),
+    'bezier': (lambda s: -1 + 2 * (10 * s ** 3 - 15 * s ** 4 + 6 * s ** 5), lambda s: 16 * s * s * (1 - s) * (1 - s)),
+    'linear': (lambda t: t,),
+    'cosine': (lambda t: (1 - math.cos(math.pi * t)) / 2,),
+}
+PACE = GaitSpec(240, 480, 0.5, (0.0, 0.0, 0.5, 0.5), 1.0, 1.0, ((0.0, 0.5), (0.5, 1.0)), 'cycloid', 'cosine')
+
+
+def tables():
+    count = 0
+    for name, tables_ in list(SWING_PROFILES.items()) + [(name, (t,)) for name, t in STANCE_PROFILES.items()]:
+        errors = []
+        for table, formula in zip(tables_, FORMULAS[name]):
+            count += 1
+            errors.append(max([abs(lookup(table, i / 1000) - formula(i / 1000)) for i in range(1001)]))
+        print('tables    {0:8s} max error {1} (of a unit stroke/height)'.format(
+            name, ', '.join(['{0:.1e}'.format(e) for e in errors])))
+    print('tables    {0} tables x {1} samples = {2} bytes (array f)'.format(count, LUT_SIZE + 1,
+                                                                           count * (LUT_SIZE + 1) * 4))
+
+
+def profiles():
+    h = 1e-4
+    for name, (stroke, height) in SWING_PROFILES.items():
+        lift_off = (lookup(height, h) - lookup(height, 0)) / h
+        touch_down = (lookup(height, 1) - lookup(height, 1 - h)) / h
+        peak = max([(lookup(stroke, (i + 1) / 200) - lookup(stroke, i / 200)) * 200 for i in range(200)])
+        print('profiles  {0:8s} vertical speed lift-off {1:+5.2f}, touch-down {2:+5.2f}, peak stroke speed {3:4.2f}'.format(
+            name, lift_off, touch_down, peak / 2))
+
+
+def trig():
+    calls = [0]
+    real_sin, real_cos = math.sin, math.cos
+
+    def counted(fn):
+        def wrapper(x):
+            calls[0] += 1
+            return fn(x)
+        return wrapper
+
+    trajectory.sin, trajectory.cos = counted(real_sin), counted(real_cos)  # nothing else in the gait modules has them
+    engine = PhaseGait()
+    engine.set_velocity(200, 50, 0.3)
+    for i in range(500):
+        engine.advance(0.02)
+        engine.tips()
+    frame_calls = calls[0]
+    gait = Gait()
+    start = time.perf_counter()
+    for gait_mode in GAIT_SPECS:
+        gait.gen_path(gait_mode, MOVE_FORWARD)
+    elapsed = (time.perf_counter() - start) * 1e6 / len(GAIT_SPECS)
+    trajectory.sin, trajectory.cos = real_sin, real_cos
+    print('trig      {0} sin/cos calls in 500 phase gait frames, {1:.0f} per gait path ({2:.0f} us/path)'.format(
+        frame_calls, (calls[0] - frame_calls) / len(GAIT_SPECS), elapsed))
+    worst = 0.0
+    for gait_mode, spec in GAIT_SPECS.items():
+        cycle = GaitCycle(spec)
+        num_frames = spec.cycle_ms // gait.frame_time_ms
+        paths = cycle.leg_paths(num_frames, 1.0, 1.0)
+        for leg in range(4):
+            for frame_id in range(num_frames):
+                stroke, height = cycle.leg_state(leg, frame_id / num_frames)
+                point = paths[leg][frame_id]
+                worst = max(worst, abs(point[0] - stroke), abs(point[2] + height))
+    print('trig      tables vs exact curves over every gait cycle: max {0:.1e} of a unit stroke/height'.format(worst))
+
+
+def new_gait():
+    path = Gait().spec_path(PACE, MOVE_LEFTROTATE)
+    cycle = GaitCycle(PACE)
+    lifted = [sum([1 for leg in range(4) if cycle.leg_state(leg, f / len(path))[1] > 0]) for f in range(len(path))]
+    print('new gait  pace (cycloid swing): {0} frames, legs lifted per frame {1}'.format(len(path), sorted(set(lifted))))
+
+
+if __name__ == '__main__':
+    tables()
+    profiles()
+    trig()
+    new_gait()
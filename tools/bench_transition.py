@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Gait/direction switches while walking: largest tip step (mm per frame, world frame) across
+the switch with a hard jump (transition frames = 0) vs. the phase-matched blend of GaitTransition.
+
+usage: python tools/bench_transition.py [blend_frames]
+"""
+import sys
+import hoststub
+
+hoststub.install()
+
+from math import sqrt
+from machine import I2C
+from nodequad import NodeQuad
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+from gait import GAIT_TROT, GAIT_WALK, GAIT_GALLOP, GAIT_CREEP
+from gait import MOVE_FORWARD, MOVE_LEFTSHIFT, MOVE_LEFTROTATE
+
+# (frame, gait, direction) commands sent by the remote
+SCRIPT = [(0, GAIT_TROT, MOVE_FORWARD), (23, GAIT_WALK, MOVE_FORWARD), (51, GAIT_CREEP, MOVE_FORWARD),
+          (97, GAIT_CREEP, MOVE_LEFTSHIFT), (130, GAIT_GALLOP, MOVE_LEFTSHIFT), (157, GAIT_TROT, MOVE_LEFTROTATE)]
+
+
+def run(blend_frames):
+    quadruped = NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    quadruped.use_duty_tables = False  # keep the legs' tip state up to date for measuring
+    quadruped.transition.num_frames = blend_frames
+    commands = dict([(frame, (gait_mode, move_status)) for frame, gait_mode, move_status in SCRIPT])
+    previous, steady_max, switch_max = None, 0.0, 0.0
+    switching = 0
+    for frame in range(190):
+        if frame in commands:
+            quadruped.web_controller.rc_gait_mode, quadruped.web_controller.rc_moving_status = commands[frame]
+            quadruped.web_controller.publish()
+            switching = max(blend_frames, 1) + 1
+        quadruped.tick()
+        tips = [list(leg.tip_position()) for leg in quadruped.legs]
+        if previous is not None:
+            step = max([sqrt(sum([(tips[i][a] - previous[i][a]) ** 2 for a in range(3)])) for i in range(4)])
+            if switching:
+                switch_max = max(switch_max, step)
+            else:
+                steady_max = max(steady_max, step)
+        switching = max(0, switching - 1)
+        previous = tips
+    return steady_max, switch_max
+
+
+def main():
+    blend_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    for name, frames in (('jump', 0), ('blend {0}'.format(blend_frames), blend_frames)):
+        steady_max, switch_max = run(frames)
+        print('{0:9s} max tip step: {1:5.1f} mm/frame while walking, {2:5.1f} mm/frame across switches'.format(
+            name, steady_max, switch_max))
+
+
+if __name__ == '__main__':
+    main()
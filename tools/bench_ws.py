@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Load generator for the persistent websocket control channel of WebController.loop.
+
+Sends compact joystick frames over one connection and reports command-to-state latency
+(frame sent -> status ack received) and the maximum sustained update rate, next to the
+same numbers for one HTTP POST /control per update.
+
+invalid    text frames that are no control object ([1], {"joy.x": "a"} in POSE mode) close that session with 1007,
+           a new session is still served
+
+usage: python tools/bench_ws.py [seconds_per_run]
+"""
+import os
+import sys
+import time
+import json
+import socket
+import struct
+import _thread
+import hoststub
+
+hoststub.install()
+
+import websocket
+from controller import WebController, CONTROL_PATH, WS_PATH
+from setting import pose_deadband
+from bench_control import free_port, request
+
+
+STEP = pose_deadband + 1  # joystick change per update, beyond the controller's jitter deadband
+
+
+class WsClient:
+    def __init__(self, port):
+        self.conn = socket.create_connection(('127.0.0.1', port))
+        self.conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.conn.sendall(('GET {0} HTTP/1.1\r\nHost: nodequad\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                           'Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n').format(WS_PATH).encode())
+        reply = b''
+        while not reply.endswith(b'\r\n\r\n'):
+            reply += self.conn.recv(1)
+        assert reply.startswith(b'HTTP/1.1 101'), reply
+
+    def send(self, payload, opcode=websocket.OP_BINARY):
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i & 3] for i, b in enumerate(payload))
+        self.conn.sendall(struct.pack('>BB', 0x80 | opcode, 0x80 | len(payload)) + mask + masked)
+
+    def recv(self):
+        return websocket.recv_frame(self.conn)
+
+    def close(self):
+        self.send(b'', websocket.OP_CLOSE)
+        self.recv()
+        self.conn.close()
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def report(name, latencies, elapsed):
+    latencies.sort()
+    print('{0:10s} p50 {1:.3f} ms  p99 {2:.3f} ms  {3:.0f} updates/s'.format(
+        name, percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000, len(latencies) / elapsed))
+
+
+def run_ws(port, seconds):
+    client = WsClient(port)
+    latencies, x = [], 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        x = (x + STEP) % 100
+        sent = time.perf_counter()
+        client.send(struct.pack('bb', x, -x))
+        opcode, payload = client.recv()
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - start
+    assert json.loads(payload)['pose'][3:5] == [x, -x]  # the ack reflects the last frame
+    client.close()
+    report('websocket', latencies, elapsed)
+
+
+def run_http(port, seconds):
+    latencies, x = [], 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        x = (x + STEP) % 100
+        sent = time.perf_counter()
+        request(port, 'POST', CONTROL_PATH, json.dumps({'joy.x': x, 'joy.y': -x}))
+        latencies.append(time.perf_counter() - sent)
+    report('http', latencies, time.perf_counter() - start)
+
+
+def invalid(port, controller):
+    for name, frames in (('array', [b'[1]']), ('text joystick', [b'{"button": "POSE"}', b'{"joy.x": "a"}'])):
+        client = WsClient(port)
+        for frame in frames:
+            client.send(frame, websocket.OP_TEXT)
+            opcode, payload = client.recv()
+        client.conn.close()
+        ok = opcode == websocket.OP_CLOSE and struct.unpack('>H', payload)[0] == websocket.CLOSE_INVALID_DATA
+        print('invalid    {0}  {1}: {2} {3!r}'.format('ok  ' if ok else 'FAIL', name, opcode, bytes(payload)))
+    client = WsClient(port)
+    client.send(struct.pack('bb', -50, 50))  # run_ws left x >= 0, y <= 0: far outside the deadband
+    opcode, payload = client.recv()
+    client.close()
+    ok = opcode == websocket.OP_TEXT and json.loads(payload)['pose'][3:5] == [-50, 50]
+    print('invalid    {0}  then a new session: {1}'.format('ok  ' if ok else 'FAIL', controller.rc_pose))
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    port = free_port()
+    controller = WebController('127.0.0.1')
+    _thread.start_new_thread(controller.loop, (port,))
+    time.sleep(0.2)
+    controller.apply_control({'button': 'POSE'})  # joystick only drives the state in POSE mode
+
+    run_http(port, seconds)
+    run_ws(port, seconds)
+    invalid(port, controller)
+
+
+if __name__ == '__main__':
+    main()
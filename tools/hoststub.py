@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Host-side (CPython) stand-ins for the MicroPython-only modules used by the firmware,
+so the modules under nodequad/ can be imported and measured on a PC.
+"""
+import os
+import sys
+import time
+import struct
+import types
+
+NODEQUAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'nodequad')
+
+
+def _make_utime():
+    utime = types.ModuleType('utime')
+    utime.sleep = time.sleep
+    utime.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    utime.sleep_us = lambda us: time.sleep(us / 1000000)
+    utime.ticks_ms = lambda: int(time.perf_counter() * 1000)
+    utime.ticks_us = lambda: int(time.perf_counter() * 1000000)
+    utime.ticks_add = lambda ticks, delta: ticks + delta
+    utime.ticks_diff = lambda new, old: new - old
+    utime.time = time.time
+    return utime
+
+
+class FakeI2C:
+    """Register-file I2C bus: writeto_mem/readfrom_mem with auto-increment, one 256-byte map per address."""
+
+    def __init__(self, *args, **kwargs):
+        self.freq = kwargs.get('freq', 100000)
+        self.registers = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.bytes_written = 0
+        self.bits = 0  # SCL clocks on the wire: 9 per byte (8 + ACK) plus start/stop conditions
+
+    def _regs(self, addr):
+        if addr not in self.registers:
+            self.registers[addr] = bytearray(256)
+        return self.registers[addr]
+
+    def writeto_mem(self, addr, memaddr, buf):
+        self.transactions += 1
+        self.bytes_written += len(buf)
+        self.bits += 9 * (2 + len(buf)) + 2  # S, addr+W, register, data..., P
+        regs = self._regs(addr)
+        for i, value in enumerate(buf):
+            regs[(memaddr + i) & 0xFF] = value
+
+    def readfrom_mem(self, addr, memaddr, nbytes):
+        self.transactions += 1
+        self.bits += 9 * (3 + nbytes) + 3  # S, addr+W, register, Sr, addr+R, data..., P
+        regs = self._regs(addr)
+        return bytes(regs[(memaddr + i) & 0xFF] for i in range(nbytes))
+
+
+    def bus_time_us(self):
+        return self.bits * 1000000 / self.freq
+
+
+class FakePin:
+    OUT = 1
+    IN = 0
+
+    def __init__(self, pin_id, mode=None):
+        self.pin_id = pin_id
+        self._value = 0
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = value
+
+
+class FakeADC:
+    ATTN_11DB = 3
+    WIDTH_12BIT = 3
+
+    def __init__(self, pin, raw=2700):
+        self.raw = raw
+
+    def atten(self, atten):
+        pass
+
+    def width(self, width):
+        pass
+
+    def read(self):
+        return self.raw
+
+
+class FakeTimer:
+    PERIODIC = 1
+    ONE_SHOT = 0
+
+    def __init__(self, timer_id):
+        pass
+
+    def init(self, **kwargs):
+        pass
+
+    def deinit(self):
+        pass
+
+
+def _make_machine():
+    machine = types.ModuleType('machine')
+    machine.I2C = FakeI2C
+    machine.Pin = FakePin
+    machine.ADC = FakeADC
+    machine.Timer = FakeTimer
+    return machine
+
+
+def install(clock=None):
+    """
+    Register the stub modules and make nodequad/ importable (html/json files are opened relative to it).
+    clock: object with sleep_ms/sleep_us/ticks_ms/ticks_us (sim.VirtualClock) backing utime instead of the wall clock,
+    must be given before the first nodequad import.
+    """
+    if clock is not None:
+        utime = _make_utime()
+        for name in ('sleep_ms', 'sleep_us', 'ticks_ms', 'ticks_us'):
+            setattr(utime, name, getattr(clock, name))
+        utime.sleep = lambda s: clock.sleep_us(int(s * 1000000))
+        sys.modules['utime'] = utime
+    sys.modules.setdefault('utime', _make_utime())
+    sys.modules.setdefault('ustruct', struct)
+    sys.modules.setdefault('machine', _make_machine())
+    if NODEQUAD_DIR not in sys.path:
+        sys.path.insert(0, NODEQUAD_DIR)
+    os.chdir(NODEQUAD_DIR)
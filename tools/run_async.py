@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Run the asyncio runtime (nodequad/async_runtime.py) on CPython with stubbed machine/utime:
+a NodeQuad on a fake I2C bus, the web server on 127.0.0.1 and a client posting joystick
+updates, then report the achieved frame rate.
+
+usage: python tools/run_async.py [seconds]
+"""
+import sys
+import json
+import time
+import asyncio
+import hoststub
+
+hoststub.install()
+
+from machine import I2C, ADC, Pin
+from nodequad import NodeQuad
+from async_runtime import AsyncRuntime
+from controller import CONTROL_PATH
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq, low_voltage
+from bench_control import free_port
+
+
+async def client(port, seconds):
+    """POST /control every 200 ms like panel_http.html does, walking forward"""
+    sent = 0
+    for body in [{'button': 'FORWARD'}] + [{'joy.x': 10, 'joy.y': -10}] * int(seconds * 5):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        payload = json.dumps(body)
+        writer.write('POST {0} HTTP/1.1\r\nContent-Length: {1}\r\n\r\n{2}'.format(CONTROL_PATH, len(payload), payload).encode())
+        await writer.drain()
+        await reader.read()
+        writer.close()
+        sent += 1
+        await asyncio.sleep(0.2)
+    return sent
+
+
+async def main(seconds):
+    i2c = I2C()
+    quadruped = NodeQuad('127.0.0.1', i2c, pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    quadruped.init()
+    runtime = AsyncRuntime(quadruped, '127.0.0.1', free_port())
+    task = asyncio.create_task(runtime.main(ADC(Pin(34)), Pin(26, Pin.OUT), low_voltage))
+    await asyncio.sleep(0.1)
+    start, start_frames = time.perf_counter(), runtime.scheduler.frame_cnt
+    sent = await client(runtime.port, seconds)
+    elapsed, frames = time.perf_counter() - start, runtime.scheduler.frame_cnt - start_frames
+    task.cancel()
+    print('{0} control requests, {1} frames in {2:.1f} s = {3:.1f} Hz (nominal {4:.0f} Hz), {5} I2C transactions'.format(
+        sent, frames, elapsed, frames / elapsed, 1000000 / runtime.scheduler.period_us, i2c.transactions))
+    print('moving status: {0}, scheduler: {1}'.format(quadruped.moving_status, runtime.scheduler.stats()))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0))
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Simulation backend: the unmodified NodeQuad.main_loop on CPython, faster than real time.
+
+VirtualClock    utime (sleep_*/ticks_*) on virtual time: sleeping just advances the clock, so a 20 ms frame
+                costs only the host CPU time of the frame; compute_scale > 0 also charges host CPU time
+                (x scale) to the virtual clock to emulate a slower target
+PCA9685Bus      hoststub.FakeI2C that decodes PCA9685 register writes into per-channel pulse timelines
+                [(t_us, pulse_us), ...] (channel = 3 * leg_index + part_index)
+ScriptedInput   remote control script [(t_ms, {'button': ..., 'joy.x': ...}), ...] posted through
+                WebController.process_panel at the given virtual times (as if the web thread received it)
+
+Import this module before anything from nodequad/: it installs the stubs with the virtual clock.
+
+usage: python tools/sim.py [seconds] [timeline.csv]
+"""
+import sys
+import json
+import time
+import hoststub
+
+
+class StopSimulation(Exception):
+    pass
+
+
+class VirtualClock:
+    def __init__(self, compute_scale=0.0):
+        self.now_us = 0
+        self.compute_scale = compute_scale
+        self.end_us = None  # sleeping past this raises StopSimulation
+        self.events = []  # [(t_us, seq, callback)], kept sorted
+        self._seq = 0
+        self._mark = time.perf_counter()
+
+    def _charge_compute(self):
+        now = time.perf_counter()
+        if self.compute_scale > 0:
+            self.now_us += int((now - self._mark) * self.compute_scale * 1000000)
+        self._mark = now
+
+    def ticks_us(self):
+        self._charge_compute()
+        return self.now_us
+
+    def ticks_ms(self):
+        return self.ticks_us() // 1000
+
+    def at(self, t_ms, callback):
+        """run callback once the virtual time reaches t_ms (during a sleep)"""
+        self._seq += 1
+        self.events.append((int(t_ms * 1000), self._seq, callback))
+        self.events.sort()
+
+    def sleep_us(self, us):
+        self._charge_compute()
+        target = self.now_us + max(int(us), 0)
+        while self.events and self.events[0][0] <= target:
+            t_us, seq, callback = self.events.pop(0)
+            self.now_us = max(self.now_us, t_us)
+            callback()
+        self.now_us = target
+        self._mark = time.perf_counter()  # event callbacks are not frame time
+        if self.end_us is not None and self.now_us >= self.end_us:
+            raise StopSimulation()
+
+    def sleep_ms(self, ms):
+        self.sleep_us(ms * 1000)
+
+
+CLOCK = VirtualClock()
+hoststub.install(CLOCK)
+
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq  # noqa: E402
+from pca9685 import LED0_ON_L, NUM_CHANNELS  # noqa: E402
+
+PCA_OSC_HZ = 25000000
+PRESCALE_REG = 0xfe
+
+
+class PCA9685Bus(hoststub.FakeI2C):
+    """fake I2C bus recording the output pulse of every PCA9685 channel whenever a write changes it"""
+
+    def __init__(self, clock, address=pca_i2c_adr, *args, **kwargs):
+        hoststub.FakeI2C.__init__(self, *args, **kwargs)
+        self.clock = clock
+        self.address = address
+        self.timelines = [[] for i in range(NUM_CHANNELS)]
+
+    def period_us(self):
+        prescale = self._regs(self.address)[PRESCALE_REG]
+        return 4096 * (prescale + 1) * 1000000 / PCA_OSC_HZ
+
+    def pulse_us(self, channel):
+        regs = self._regs(self.address)
+        base = LED0_ON_L + 4 * channel
+        on = regs[base] | regs[base + 1] << 8
+        off = regs[base + 2] | regs[base + 3] << 8
+        if on & 0x1000:  # full on
+            return self.period_us()
+        if off & 0x1000:  # full off
+            return 0.0
+        return ((off - on) % 4096) * self.period_us() / 4096
+
+    def writeto_mem(self, addr, memaddr, buf):
+        hoststub.FakeI2C.writeto_mem(self, addr, memaddr, buf)
+        if addr != self.address:
+            return
+        first = max(memaddr, LED0_ON_L)
+        last = min(memaddr + len(buf), LED0_ON_L + 4 * NUM_CHANNELS) - 1
+        if first > last:
+            return
+        t_us = self.clock.ticks_us()
+        for channel in range((first - LED0_ON_L) // 4, (last - LED0_ON_L) // 4 + 1):
+            pulse = self.pulse_us(channel)
+            timeline = self.timelines[channel]
+            if timeline and timeline[-1][0] == t_us:
+                timeline[-1] = (t_us, pulse)  # several writes within one instant: keep the final state
+            elif not timeline or timeline[-1][1] != pulse:
+                timeline.append((t_us, pulse))
+
+    def write_csv(self, path, channels=12):
+        with open(path, 'w') as f:
+            f.write('t_us,channel,pulse_us\n')
+            for channel in range(channels):
+                for t_us, pulse in self.timelines[channel]:
+                    f.write('{0},{1},{2:.1f}\n'.format(t_us, channel, pulse))
+
+
+class ScriptedInput:
+    """feeds the control script to a WebController as http control requests at virtual times"""
+
+    def __init__(self, clock, web_controller, script):
+        self.web_controller = web_controller
+        self.sent = 0
+        for t_ms, ctrl_quantity in script:
+            clock.at(t_ms, self._poster(ctrl_quantity))
+
+    def _poster(self, ctrl_quantity):
+        def post():
+            self.web_controller.process_panel('POST /control HTTP/1.1\r\n\r\n' + json.dumps(ctrl_quantity))
+            self.sent += 1
+        return post
+
+
+class Simulation:
+    def __init__(self, script, clock=CLOCK):
+        from nodequad import NodeQuad
+        self.clock = clock
+        self.i2c = PCA9685Bus(clock)
+        self.quadruped = NodeQuad('127.0.0.1', self.i2c, pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+        self.quadruped.init()
+        self.input = ScriptedInput(clock, self.quadruped.web_controller, script)
+
+    def run(self, seconds):
+        """run NodeQuad.main_loop for 'seconds' of virtual time -> wall seconds it took"""
+        self.clock.end_us = self.clock.now_us + int(seconds * 1000000)
+        start = time.perf_counter()
+        try:
+            self.quadruped.main_loop()
+        except StopSimulation:
+            pass
+        return time.perf_counter() - start
+
+
+def demo_script():
+    """trot forward, switch gait and direction, pose the body with the joystick, walk again"""
+    script = [(100, {'button': 'FORWARD'}), (2000, {'button': 'WALK'}), (4000, {'button': 'LEFTSHIFT'}),
+              (6000, {'button': 'POSE'})]
+    for i in range(15):  # 3 s of joystick at the panel's 200 ms interval
+        script.append((6200 + 200 * i, {'joy.x': (i * 13) % 100 - 50, 'joy.y': 40 - (i * 7) % 80}))
+    script += [(9500, {'button': 'MOVE'}), (9600, {'button': 'RIGHTTURN'})]
+    return script
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 12.0
+    simulation = Simulation(demo_script())
+    wall = simulation.run(seconds)
+    stats = simulation.quadruped.scheduler.stats()
+    print('{0:.1f} s simulated in {1:.2f} s wall ({2:.0f}x real time), {3} frames, {4} control requests'.format(
+        seconds, wall, seconds / wall, stats['frames'], simulation.input.sent))
+    print('i2c: {0} transactions, {1} bytes, {2:.0f} us bus time'.format(
+        simulation.i2c.transactions, simulation.i2c.bytes_written, simulation.i2c.bus_time_us()))
+    for channel in range(12):
+        timeline = simulation.i2c.timelines[channel]
+        pulses = [pulse for t_us, pulse in timeline]
+        print('channel {0:2d} (leg {1} joint {2}): {3:4d} pulse changes, {4:6.1f} .. {5:6.1f} us'.format(
+            channel, channel // 3, channel % 3, len(timeline), min(pulses), max(pulses)))
+    if len(sys.argv) > 2:
+        simulation.i2c.write_csv(sys.argv[2])
+        print('timelines written to {0}'.format(sys.argv[2]))
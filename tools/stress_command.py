@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Stress test of the remote command hand-over between the web thread and the control loop.
+
+A writer thread hammers WebController.apply_control with random buttons and joystick samples while the
+main thread reads the remote state the way the control loop does, and checks invariants every
+consistent state satisfies:
+  MOVE mode -> pose is all zero (leaving POSE resets it)
+  POSE mode -> gait TROT and status STANDBY (entering POSE resets them, POSE ignores gait buttons)
+  seq never goes backwards
+A third thread runs NodeQuad.tick() on the snapshots concurrently, it must never raise.
+
+fields    rc_mode, rc_pose, rc_gait_mode, rc_moving_status read one by one (the old update_* pattern)
+snapshot  one read of WebController.command
+
+usage: python tools/stress_command.py [seconds]
+"""
+import sys
+import time
+import random
+import _thread
+import hoststub
+
+hoststub.install()
+
+from machine import I2C
+from nodequad import NodeQuad
+from gait import MODE_MOVE, MODE_POSE, GAIT_TROT, MOVE_STANDBY
+from setting import pca_i2c_adr, pulse_min, pulse_max, pulse_freq
+
+BUTTONS = ['POSE', 'MOVE', 'STANDBY', 'FORWARD', 'BACKWARD', 'LEFTSHIFT', 'RIGHTSHIFT', 'LEFTTURN', 'RIGHTTURN',
+           'TROT', 'WALK', 'GALLOP', 'CREEP']
+ZERO_POSE = (0, 0, 0, 0, 0, 0)
+
+running = [True]
+counters = {'updates': 0, 'ticks': 0, 'tick_errors': 0}
+
+
+def writer(controller):
+    rng = random.Random(1)
+    while running[0]:
+        ctrl = {'joy.x': rng.randint(-100, 100), 'joy.y': rng.randint(-100, 100)}
+        if rng.random() < 0.5:
+            ctrl['button'] = rng.choice(BUTTONS)
+        controller.apply_control(ctrl)
+        counters['updates'] += 1
+
+
+def ticker(quadruped):
+    while running[0]:
+        try:
+            quadruped.tick()
+        except Exception as e:
+            counters['tick_errors'] += 1
+            print('tick raised {0!r}'.format(e))
+        counters['ticks'] += 1
+        time.sleep(0.001)
+
+
+def consistent(mode, pose, gait_mode, moving_status):
+    if mode == MODE_MOVE:
+        return tuple(pose) == ZERO_POSE
+    if mode == MODE_POSE:
+        return gait_mode == GAIT_TROT and moving_status == MOVE_STANDBY
+    return False
+
+
+def read_fields(controller):
+    return controller.rc_mode, list(controller.rc_pose), controller.rc_gait_mode, controller.rc_moving_status
+
+
+def read_snapshot(controller):
+    command = controller.command
+    return command.mode, command.pose, command.gait_mode, command.moving_status
+
+
+def run(seconds, read):
+    quadruped = NodeQuad('127.0.0.1', I2C(), pca_i2c_adr, pulse_min, pulse_max, pulse_freq)
+    controller = quadruped.web_controller
+    running[0] = True
+    for key in counters:
+        counters[key] = 0
+    _thread.start_new_thread(writer, (controller,))
+    _thread.start_new_thread(ticker, (quadruped,))
+    reads, violations, backwards, last_seq = 0, 0, 0, -1
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        seq = controller.command.seq
+        if seq < last_seq:
+            backwards += 1
+        last_seq = seq
+        if not consistent(*read(controller)):
+            violations += 1
+        reads += 1
+    running[0] = False
+    time.sleep(0.05)
+    return reads, violations, backwards
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    results = {}
+    for name, read in (('fields', read_fields), ('snapshot', read_snapshot)):
+        reads, violations, backwards = run(seconds, read)
+        results[name] = violations
+        print('{0:8s} reads {1:8d}  inconsistent {2:6d}  seq backwards {3}  updates {4:7d}  ticks {5:5d}  tick errors {6}'.format(
+            name, reads, violations, backwards, counters['updates'], counters['ticks'], counters['tick_errors']))
+    if results['snapshot'] or counters['tick_errors']:
+        print('FAIL')
+        sys.exit(1)